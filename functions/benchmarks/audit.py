@@ -0,0 +1,111 @@
+# Request-path cost of the decision audit log
+#
+#   python benchmarks/audit.py                              # in-memory sink, 20 ms simulated commits
+#   python benchmarks/audit.py --latency 0.05 -n 5000
+#   FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/audit.py --emulator
+#
+# Times the evaluate_credit decision step per call three ways over the same
+# seeded applications (decision cache off, so every call decides):
+#
+#   decision        the decision alone, no audit
+#   audit_async     plus AuditWriter.submit(), the queued write evaluate_credit uses
+#   audit_sync      plus a write of the one document before returning
+#
+# plus submit on its own (the only audit work on the request thread)
+# and checks that every submitted record reached the sink once the writer
+# was flushed; the run exits 1 otherwise.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, Any
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FUNCTIONS_DIR)
+
+from benchmarks.hot_paths import measure
+from benchmarks.synthetic import generate_applications
+
+def _overhead(result: Dict[str, float], base: Dict[str, float]) -> Dict[str, float]:
+    return {key: round(result[key] - base[key], 3) for key in ('mean_us', 'p50_us', 'p99_us')}
+
+def run(n: int = 2000, seed: int = 42, warmup: int = 200, latency: float = 0.02,
+        batch_size: int = 200, emulator: bool = False) -> Dict[str, Any]:
+    import main
+    from utils.audit import AuditWriter, FirestoreSink, MemorySink, decision_document
+
+    if emulator:
+        if not os.environ.get('FIRESTORE_EMULATOR_HOST'):
+            raise SystemExit("--emulator needs FIRESTORE_EMULATOR_HOST")
+        sink = FirestoreSink(collection='decisionAuditBenchmark', app_factory=main.get_firebase_app)
+    else:
+        sink = MemorySink(latency=latency)
+
+    applications = generate_applications(n, seed)
+    cache = main.DECISION_CACHE
+    main.DECISION_CACHE = None
+    try:
+        def decide(application):
+            return main._encoded_decision(application)
+
+        writer = AuditWriter(sink, batch_size=batch_size, max_queue=max(n, 1) * 2)
+
+        def decide_async(application):
+            body, cache_hit = main._encoded_decision(application)
+            writer.submit((time.time(), application, body, cache_hit))
+
+        def decide_sync(application):
+            body, cache_hit = main._encoded_decision(application)
+            sink.write([decision_document((time.time(), application, body, cache_hit))])
+
+        # One untimed pass first, so the baseline does not pay for warming the engine
+        for application in applications:
+            decide(application)
+        results = {'decision': measure(decide, applications, warmup)}
+        results['audit_async'] = measure(decide_async, applications, warmup)
+        started = time.perf_counter()
+        flushed = writer.flush(timeout=60)
+        drain_seconds = time.perf_counter() - started
+        stats = writer.close()
+
+        entries = [(time.time(), application, decide(application)[0], False) for application in applications]
+        submit_writer = AuditWriter(MemorySink(latency=latency), batch_size=batch_size, max_queue=max(n, 1) * 2)
+        results['submit'] = measure(submit_writer.submit, entries, warmup)
+        submit_writer.close()
+        results['audit_sync'] = measure(decide_sync, applications[:max(warmup + 1, n // 10)], warmup)
+    finally:
+        main.DECISION_CACHE = cache
+
+    for name in ('audit_async', 'audit_sync'):
+        results[name]['overhead_us'] = _overhead(results[name], results['decision'])
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'applications': n,
+            'seed': seed,
+            'sink': 'firestore-emulator' if emulator else 'memory',
+            'simulated_latency_s': None if emulator else latency,
+            'batch_size': batch_size
+        },
+        'ok': flushed and stats['written'] == stats['submitted'] and not stats['dropped'],
+        'benchmarks': results,
+        'writer': {**stats, 'drain_seconds': round(drain_seconds, 3),
+                   'mean_batch': round(stats['written'] / stats['batches'], 1) if stats['batches'] else 0.0}
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Request-path overhead of the decision audit log")
+    parser.add_argument('-n', type=int, default=2000, help="Synthetic applications")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02, help="Simulated commit latency of the in-memory sink (s)")
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--emulator', action='store_true', help="Write to the Firestore emulator instead")
+    args = parser.parse_args()
+
+    results = run(args.n, args.seed, args.warmup, args.latency, args.batch_size, args.emulator)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    sys.exit(0 if results['ok'] else 1)
@@ -0,0 +1,121 @@
+# Cold-start benchmark: import time and time-to-first-response per function
+#
+#   python benchmarks/cold_start.py --runs 10
+#
+# Every function is deployed as its own service, so each (function, run)
+# pair starts a fresh interpreter, imports main, and calls the function
+# twice: the first call is the cold response, the second a warm one.
+# Needs the deploy dependencies (firebase-functions brings werkzeug).
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Any
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_APPLICATION = {
+    "loan_amount": 150000,
+    "loan_term_months": 36,
+    "monthly_income": 22000,
+    "additional_income": 3000,
+    "expenses": 12000,
+    "rent_payment": 2500,
+    "age": 34,
+    "employment_type": "Özel Sektör",
+    "work_experience": 6,
+    "debt_to_income_ratio": 0.2,
+    "existing_loans": 25000,
+    "credit_card_limit": 30000,
+    "credit_card_debt": 4000,
+    "bank_balance": 35000,
+    "investments": 75000,
+    "real_estate_value": 450000,
+    "kkb_score": 720,
+    "payment_delays": 0,
+    "home_ownership": "owner",
+    "residence_duration": 48,
+    "customer_segment": "mass"
+}
+
+# (function, method, body)
+CALLS = {
+    'evaluate_credit': ('POST', json.dumps(SAMPLE_APPLICATION)),
+    'evaluate_credit_batch': ('POST', '\n'.join(json.dumps(SAMPLE_APPLICATION) for _ in range(10))),
+    'health_check': ('GET', ''),
+    'system_info': ('GET', ''),
+}
+
+# Runs inside the fresh interpreter; prints one JSON line of timings in ms
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {functions_dir!r})
+import main
+imported = time.perf_counter()
+
+from firebase_functions import https_fn
+from werkzeug.test import EnvironBuilder
+
+def call():
+    request = https_fn.Request(EnvironBuilder(method={method!r}, data={body!r},
+                                              content_type='application/json').get_environ())
+    response = getattr(main, {function!r})(request)
+    response.get_data()  # Drain streamed bodies
+    return response.status_code
+
+t0 = time.perf_counter()
+status = call()
+t1 = time.perf_counter()
+call()
+t2 = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_call_ms': (t1 - t0) * 1000,
+    'time_to_first_response_ms': (t1 - started) * 1000,
+    'warm_call_ms': (t2 - t1) * 1000,
+    'numpy_loaded': 'numpy' in sys.modules,
+    'firebase_admin_loaded': 'firebase_admin' in sys.modules,
+    'status': status
+}}))
+'''
+
+def run_once(function: str, env: Dict[str, str]) -> Dict[str, Any]:
+    method, body = CALLS[function]
+    code = CHILD.format(functions_dir=FUNCTIONS_DIR, method=method, body=body, function=function)
+    result = subprocess.run([sys.executable, '-c', code], cwd=FUNCTIONS_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {}
+    for key in ('import_ms', 'first_call_ms', 'time_to_first_response_ms', 'warm_call_ms'):
+        values = sorted(s[key] for s in samples)
+        summary[key] = {
+            'median': round(statistics.median(values), 3),
+            'max': round(values[-1], 3)
+        }
+    summary['numpy_loaded'] = any(s['numpy_loaded'] for s in samples)
+    summary['firebase_admin_loaded'] = any(s['firebase_admin_loaded'] for s in samples)
+    summary['status'] = samples[-1]['status']
+    return summary
+
+def run(runs: int, functions: List[str] = None) -> Dict[str, Any]:
+    env = dict(os.environ)
+    results = {}
+    for function in functions or list(CALLS):
+        results[function] = summarize([run_once(function, env) for _ in range(runs)])
+    return {
+        'python': sys.version.split()[0],
+        'runs': runs,
+        'functions': results
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-response per function")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per function")
+    parser.add_argument('--function', action='append', choices=sorted(CALLS), help="Limit to these functions")
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs, args.function), indent=2))
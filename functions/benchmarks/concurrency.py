@@ -0,0 +1,156 @@
+# Concurrency stress test: many request threads against one engine
+#
+#   python benchmarks/concurrency.py                       # 16 threads, exit 1 on any mismatch
+#   python benchmarks/concurrency.py --threads 64 --rounds 5
+#
+# Every check runs the same seeded applications serially first and then
+# from --threads threads at once (released together by a barrier, with a
+# very short switch interval so threads interleave inside the hot paths):
+#
+#   engine_init    concurrent first calls to get_decision_engine build one engine
+#   decisions      make_decision results equal the serial ones (timestamps aside)
+#   encoded        cached/encoded response bodies equal the serial ones
+#   counters       shared counters (metrics, decision cache) lose no update
+#   rate_limit     every client gets exactly max_per_minute requests through
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FUNCTIONS_DIR)
+
+from benchmarks.synthetic import generate_applications
+
+def _without_timestamps(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _without_timestamps(item) for key, item in value.items() if key != 'timestamp'}
+    if isinstance(value, list):
+        return [_without_timestamps(item) for item in value]
+    return value
+
+def run_threads(threads: int, fn: Callable[[int], Any], items: int) -> List[Any]:
+    """fn(i) for every i in range(items), spread over threads that start together; results in item order"""
+    barrier = threading.Barrier(threads)
+    results = [None] * items
+
+    def worker(offset: int):
+        barrier.wait()
+        for i in range(offset, items, threads):
+            results[i] = fn(i)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(worker, offset) for offset in range(threads)]:
+            future.result()
+    return results
+
+def _counter_total(registry: Any, name: str) -> float:
+    with registry.lock:
+        return sum(value for (counter, _), value in registry.counters.items() if counter == name)
+
+def check_engine_init(main: Any, threads: int) -> Dict[str, Any]:
+    main._decision_engine = None
+    engines = run_threads(threads, lambda i: id(main.get_decision_engine()), threads)
+    return {'ok': len(set(engines)) == 1, 'threads': threads, 'distinct_engines': len(set(engines))}
+
+def check_decisions(main: Any, applications: List[Dict[str, Any]], threads: int, rounds: int) -> Dict[str, Any]:
+    from utils.metrics import METRICS
+
+    engine = main.get_decision_engine()
+    serial = [_without_timestamps(engine.make_decision(application)) for application in applications]
+
+    # Counter increments of one serial pass, to compare with the concurrent passes
+    decisions_before = _counter_total(METRICS, 'finis_decisions_total')
+    for application in applications:
+        engine.make_decision(application)
+    decisions_per_pass = _counter_total(METRICS, 'finis_decisions_total') - decisions_before
+
+    decisions_before = _counter_total(METRICS, 'finis_decisions_total')
+    size = len(applications)
+    started = time.perf_counter()
+    results = run_threads(threads, lambda i: engine.make_decision(applications[i % size]), size * rounds)
+    elapsed = time.perf_counter() - started
+
+    mismatches = [i for i, result in enumerate(results) if _without_timestamps(result) != serial[i % size]]
+    decisions = _counter_total(METRICS, 'finis_decisions_total') - decisions_before
+    return {
+        'ok': not mismatches and decisions == decisions_per_pass * rounds,
+        'calls': len(results),
+        'mismatches': len(mismatches),
+        'decisions_counted': {'expected': decisions_per_pass * rounds, 'counted': decisions},
+        'calls_per_second': round(len(results) / elapsed, 1)
+    }
+
+def check_encoded(main: Any, applications: List[Dict[str, Any]], threads: int, rounds: int) -> Dict[str, Any]:
+    cache = main.DECISION_CACHE
+    if cache is not None:
+        cache.clear()
+    serial = [_without_timestamps(json.loads(main._encoded_decision(application)[0])) for application in applications]
+    if cache is not None:
+        cache.clear()
+    before = cache.stats() if cache is not None else None
+
+    size = len(applications)
+    results = run_threads(threads, lambda i: main._encoded_decision(applications[i % size]), size * rounds)
+    mismatches = [i for i, (body, _) in enumerate(results)
+                  if _without_timestamps(json.loads(body)) != serial[i % size]]
+    result = {'ok': not mismatches, 'calls': len(results), 'mismatches': len(mismatches)}
+    if cache is not None:
+        after = cache.stats()
+        lookups = (after['hits'] + after['misses']) - (before['hits'] + before['misses'])
+        result['cache_lookups'] = {'expected': len(results), 'counted': lookups}
+        result['cache_hits'] = sum(1 for _, hit in results if hit)
+        result['ok'] = result['ok'] and lookups == len(results)
+    return result
+
+def check_rate_limit(threads: int, requests: int, clients: int = 4) -> Dict[str, Any]:
+    from utils.security import SecurityValidator
+
+    validator = SecurityValidator()
+    limit = validator.rate_limiter.max_per_minute
+    ips = [f'203.0.113.{i + 1}' for i in range(clients)]
+    results = run_threads(threads, lambda i: validator.check_rate_limit(ips[i % clients])['allowed'], requests)
+    allowed = [sum(results[i::clients]) for i in range(clients)]
+    return {'ok': all(count == limit for count in allowed), 'requests': requests, 'clients': clients,
+            'allowed_per_client': allowed, 'limit': limit}
+
+def run(n: int = 500, seed: int = 42, threads: int = 16, rounds: int = 3,
+        switch_interval: float = 1e-6) -> Dict[str, Any]:
+    import main
+
+    applications = generate_applications(n, seed)
+    previous_interval = sys.getswitchinterval()
+    sys.setswitchinterval(switch_interval)
+    try:
+        checks = {
+            'engine_init': check_engine_init(main, threads),
+            'decisions': check_decisions(main, applications, threads, rounds),
+            'encoded': check_encoded(main, applications, threads, rounds),
+            'rate_limit': check_rate_limit(threads, threads * 40)
+        }
+    finally:
+        sys.setswitchinterval(previous_interval)
+    return {
+        'meta': {'applications': n, 'seed': seed, 'threads': threads, 'rounds': rounds,
+                 'switch_interval': switch_interval, 'gil_enabled': getattr(sys, '_is_gil_enabled', lambda: True)()},
+        'ok': all(check['ok'] for check in checks.values()),
+        'checks': checks
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concurrent requests against one engine must match serial results")
+    parser.add_argument('-n', type=int, default=500, help="Synthetic applications")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=3, help="Passes over the applications per check")
+    parser.add_argument('--switch-interval', type=float, default=1e-6,
+                        help="sys.setswitchinterval during the run; smaller interleaves threads more")
+    args = parser.parse_args()
+
+    results = run(args.n, args.seed, args.threads, args.rounds, args.switch_interval)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    sys.exit(0 if results['ok'] else 1)
@@ -0,0 +1,148 @@
+# Benchmarks for the scoring and decision hot paths
+#
+#   python benchmarks/hot_paths.py                          # print results
+#   python benchmarks/hot_paths.py --save-baseline          # record benchmarks/baseline.json
+#   python benchmarks/hot_paths.py --baseline               # compare, exit 1 on regression
+#
+# Every benchmark runs over the same seeded synthetic applications and
+# times each call individually, reporting throughput, mean, p50 and p99
+# of the fastest of --repeat passes.
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Any, Callable, Tuple
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FUNCTIONS_DIR)
+
+from benchmarks.synthetic import generate_applications
+
+DEFAULT_BASELINE = os.path.join(FUNCTIONS_DIR, 'benchmarks', 'baseline.json')
+
+def _percentile(sorted_ns: List[int], q: float) -> float:
+    return sorted_ns[min(len(sorted_ns) - 1, int(q * len(sorted_ns)))]
+
+def measure(fn: Callable[[Any], Any], inputs: List[Any], warmup: int) -> Dict[str, float]:
+    """Time fn over inputs one call at a time (after warmup calls)"""
+    for item in inputs[:warmup]:
+        fn(item)
+    timings = []
+    clock = time.perf_counter_ns
+    for item in inputs:
+        start = clock()
+        fn(item)
+        timings.append(clock() - start)
+    timings.sort()
+    total = sum(timings)
+    return {
+        'calls': len(timings),
+        'ops_per_sec': round(len(timings) / (total / 1e9), 1) if total else 0.0,
+        'mean_us': round(total / len(timings) / 1000, 3),
+        'p50_us': round(_percentile(timings, 0.50) / 1000, 3),
+        'p99_us': round(_percentile(timings, 0.99) / 1000, 3),
+    }
+
+def build_benchmarks(applications: List[Dict[str, Any]]) -> List[Tuple[str, Callable[[Any], Any], List[Any]]]:
+    """(name, function, inputs) for every hot path"""
+    import main
+    from utils.security import SecurityValidator
+
+    engine = main.CreditDecisionEngine()
+    scoring = engine.advanced_scoring
+    validator = SecurityValidator()
+
+    # Inputs for _calculate_limits come from a full scoring pass
+    limit_args = []
+    for application in applications:
+        result = scoring.score_application(application)
+        calc = result['calculations']
+        limit_args.append((calc['net_income'], float(application['loan_amount']),
+                           int(application['loan_term_months']), calc['new_dti'], result['decision']))
+    decisions = [engine.make_decision(application) for application in applications]
+    clients = [f'10.0.{i // 256 % 256}.{i % 256}' for i in range(len(applications))]
+
+    return [
+        ('score_application', scoring.score_application, applications),
+        ('calculate_limits', lambda args: scoring._calculate_limits(*args), limit_args),
+        ('make_decision', engine.make_decision, applications),
+        ('calculate_credit_score', engine.calculate_credit_score, applications),
+        ('ml_prediction', engine._ml_prediction, applications),
+        ('check_rate_limit', validator.check_rate_limit, clients),
+        ('json_encode_response', lambda result: json.dumps(result, ensure_ascii=False), decisions),
+    ]
+
+def run(n: int = 2000, seed: int = 42, warmup: int = 200, repeat: int = 3,
+        only: List[str] = None) -> Dict[str, Any]:
+    applications = generate_applications(n, seed)
+    results = {}
+    for name, fn, inputs in build_benchmarks(applications):
+        if only and name not in only:
+            continue
+        # Best of several passes: scheduler noise only ever makes a pass slower
+        runs = [measure(fn, inputs, warmup) for _ in range(max(1, repeat))]
+        results[name] = max(runs, key=lambda r: r['ops_per_sec'])
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'applications': n,
+            'seed': seed,
+            'repeat': repeat,
+            'timestamp': datetime.datetime.now().isoformat()
+        },
+        'benchmarks': results
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+            p99_tolerance: float) -> List[Dict[str, Any]]:
+    """Benchmarks whose p50 or p99 latency grew beyond the allowed ratio"""
+    regressions = []
+    for name, result in current['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if not base:
+            continue
+        for metric, allowed in (('p50_us', tolerance), ('p99_us', p99_tolerance)):
+            if base[metric] and result[metric] > base[metric] * (1 + allowed):
+                regressions.append({
+                    'benchmark': name,
+                    'metric': metric,
+                    'baseline': base[metric],
+                    'current': result[metric],
+                    'ratio': round(result[metric] / base[metric], 3)
+                })
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the scoring and decision hot paths")
+    parser.add_argument('-n', type=int, default=2000, help="Synthetic applications per benchmark")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3, help="Passes per benchmark, best one is reported")
+    parser.add_argument('--only', action='append', help="Run only these benchmarks")
+    parser.add_argument('--output', help="Also write results to this JSON file")
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, help="Compare against a saved baseline")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help="Save results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.20, help="Allowed p50 slowdown (0.20 = 20%%)")
+    parser.add_argument('--p99-tolerance', type=float, default=0.50, help="Allowed p99 slowdown")
+    args = parser.parse_args()
+
+    results = run(args.n, args.seed, args.warmup, args.repeat, args.only)
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        results['regressions'] = compare(results, baseline, args.tolerance, args.p99_tolerance)
+        exit_code = 1 if results['regressions'] else 0
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+    print(text)
+    sys.exit(exit_code)
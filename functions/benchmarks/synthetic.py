@@ -0,0 +1,62 @@
+# Seeded synthetic credit applications for benchmarks
+import math
+import random
+from typing import Dict, List, Any
+
+TERMS = (12, 24, 36, 48, 60, 84, 120)
+TERM_WEIGHTS = (20, 25, 25, 10, 10, 6, 4)
+EMPLOYMENT_TYPES = ('Özel Sektör', 'Kamu', 'Doktor', 'Mühendis', 'Serbest Meslek', 'Emekli')
+EMPLOYMENT_WEIGHTS = (45, 25, 5, 10, 10, 5)
+
+def _clip(x: float, lo: float, hi: float) -> float:
+    return max(lo, min(hi, x))
+
+def _lognormal(rnd: random.Random, median: float, sigma: float) -> float:
+    return rnd.lognormvariate(math.log(median), sigma)
+
+def generate_application(rnd: random.Random) -> Dict[str, Any]:
+    """One applicant; every value stays inside the ranges make_decision accepts"""
+    age = int(_clip(rnd.gauss(40, 11), 18, 80))
+    monthly_income = round(_clip(_lognormal(rnd, 25000, 0.6), 5000, 1000000), -2)
+    term = rnd.choices(TERMS, TERM_WEIGHTS)[0]
+    # Requested installment mostly between 10% and 50% of income
+    loan_amount = round(_clip(monthly_income * rnd.uniform(0.1, 0.5) * term * 0.85, 1000, 2000000), -3)
+    credit_card_limit = rnd.choice((0, 10000, 25000, 50000, 100000))
+    home_ownership = rnd.choices(('owner', 'tenant', 'family'), (35, 45, 20))[0]
+
+    application = {
+        'loan_amount': loan_amount,
+        'loan_term_months': term,
+        'monthly_income': monthly_income,
+        'additional_income': round(_lognormal(rnd, 3000, 0.8), -2) if rnd.random() < 0.3 else 0,
+        'expenses': round(monthly_income * rnd.uniform(0.2, 0.6), -2),
+        'rent_payment': round(rnd.uniform(3000, 15000), -2) if home_ownership == 'tenant' else 0,
+        'existing_loans': round(_lognormal(rnd, 50000, 1.0), -3) if rnd.random() < 0.5 else 0,
+        'credit_card_limit': credit_card_limit,
+        'credit_card_debt': round(credit_card_limit * rnd.betavariate(2, 5), -2),
+        'bank_balance': round(_lognormal(rnd, 20000, 1.2), -2),
+        'investments': round(_lognormal(rnd, 50000, 1.3), -2) if rnd.random() < 0.4 else 0,
+        'real_estate_value': round(_lognormal(rnd, 2000000, 0.5), -4) if home_ownership == 'owner' else 0,
+        'age': age,
+        'employment_type': rnd.choices(EMPLOYMENT_TYPES, EMPLOYMENT_WEIGHTS)[0],
+        'work_experience': round(_clip((age - 20) * rnd.uniform(0.2, 1.0), 0, 50), 1),
+        'kkb_score': round(_clip(rnd.gauss(680, 90), 300, 900)),
+        'payment_delays': rnd.choices((0, 1, 2, 3, 5), (80, 10, 5, 3, 2))[0],
+        'home_ownership': home_ownership,
+        'residence_duration': rnd.randint(0, 240),
+        'existing_relationship': rnd.randint(0, 240),
+        'total_banking_products': rnd.randint(0, 8),
+        'customer_segment': rnd.choices(('mass', 'private'), (85, 15))[0],
+        'defaulted_loans': rnd.random() < 0.03,
+        'legal_issues': rnd.random() < 0.01,
+        'job_stability': 'stable' if rnd.random() < 0.85 else 'unstable',
+    }
+    # Half of the callers send a DTI, the rest leave it to the heuristic
+    if rnd.random() < 0.5:
+        application['debt_to_income_ratio'] = round(rnd.uniform(0, 0.6), 3)
+    return application
+
+def generate_applications(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """n applications, identical for the same seed"""
+    rnd = random.Random(seed)
+    return [generate_application(rnd) for _ in range(n)]
@@ -0,0 +1,137 @@
+# Thread scaling of in-process batch scoring, 1 to N threads
+#
+#   python benchmarks/thread_scaling.py                     # 1, 2, 4, ... CPU count threads
+#   python benchmarks/thread_scaling.py --max-threads 16 -n 4000
+#   PYTHON_GIL=0 python3.13t benchmarks/thread_scaling.py   # free-threaded build
+#
+# Each workload runs the same seeded applications at every thread count
+# and reports the best of --repeat passes, the speedup over one thread and
+# the parallel efficiency (speedup / threads). Results at every thread
+# count must equal the single-thread results (timestamps aside); the run
+# exits 1 otherwise. On GIL builds make_decisions should stay near 1x;
+# score_applications can gain a little where NumPy releases the GIL.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Any, Callable
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FUNCTIONS_DIR)
+
+from benchmarks.concurrency import _without_timestamps
+from benchmarks.synthetic import generate_applications
+from utils.parallel import available_cpus, free_threaded_build, gil_enabled
+
+def thread_counts(max_threads: int) -> List[int]:
+    """Powers of two up to max_threads, plus max_threads itself"""
+    counts = []
+    threads = 1
+    while threads < max_threads:
+        counts.append(threads)
+        threads *= 2
+    return counts + [max_threads]
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _same_columns(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    import numpy as np
+
+    for key, value in a.items():
+        if isinstance(value, dict):
+            if not _same_columns(value, b[key]):
+                return False
+        elif isinstance(value, np.ndarray):
+            if not np.array_equal(value, b[key]):
+                return False
+        elif value != b[key]:
+            return False
+    return True
+
+def scale(name: str, run_with: Callable[[int], Any], same: Callable[[Any, Any], bool], items: int,
+          counts: List[int], repeat: int) -> Dict[str, Any]:
+    """Time run_with(threads) at every thread count against the single-thread run"""
+    expected = run_with(1)
+    rows = []
+    single = None
+    ok = True
+    for threads in counts:
+        matches = same(run_with(threads), expected)
+        ok = ok and matches
+        seconds = _best_of(lambda: run_with(threads), repeat)
+        single = seconds if single is None else single
+        speedup = single / seconds if seconds else 0.0
+        rows.append({
+            'threads': threads,
+            'seconds': round(seconds, 4),
+            'items_per_sec': round(items / seconds, 1) if seconds else 0.0,
+            'speedup': round(speedup, 2),
+            'efficiency': round(speedup / threads, 2),
+            'matches_serial': matches
+        })
+    return {'name': name, 'items': items, 'ok': ok, 'scaling': rows}
+
+def run(n: int = 2000, seed: int = 42, max_threads: int = None, repeat: int = 3,
+        rows: int = 100_000) -> Dict[str, Any]:
+    import main
+    from models.batch_scoring import to_columns
+
+    max_threads = max_threads or available_cpus()
+    counts = thread_counts(max_threads)
+    applications = generate_applications(n, seed)
+    engine = main.CreditDecisionEngine()
+    scoring = engine.advanced_scoring
+    records = generate_applications(rows, seed)
+    columns = to_columns(records)
+
+    results = [
+        scale('make_decisions', lambda threads: engine.make_decisions(applications, threads=threads),
+              lambda a, b: _without_timestamps(a) == _without_timestamps(b), n, counts, repeat),
+        scale('score_applications.records', lambda threads: scoring.score_applications(records, threads=threads),
+              _same_columns, rows, counts, repeat),
+        scale('score_applications.columns', lambda threads: scoring.score_applications(columns, threads=threads),
+              _same_columns, rows, counts, repeat)
+    ]
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'free_threaded_build': free_threaded_build(),
+            'gil_enabled': gil_enabled(),
+            'cpus': available_cpus(),
+            'applications': n,
+            'column_rows': rows,
+            'seed': seed,
+            'repeat': repeat
+        },
+        'ok': all(result['ok'] for result in results),
+        'benchmarks': {result.pop('name'): result for result in results}
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scaling of thread-pool batch scoring from 1 to N threads")
+    parser.add_argument('-n', type=int, default=2000, help="Synthetic applications for make_decisions")
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows of the score_applications batches")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-threads', type=int, default=None, help="Largest thread count (default: CPU count)")
+    parser.add_argument('--repeat', type=int, default=3, help="Passes per thread count, best one is reported")
+    parser.add_argument('--output', help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.n, args.seed, args.max_threads, args.repeat, args.rows)
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    sys.exit(0 if results['ok'] else 1)
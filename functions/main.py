@@ -1,49 +1,157 @@
 from firebase_functions import https_fn
 from firebase_functions.options import set_global_options
-from firebase_admin import initialize_app
+import atexit
 import json
 import math
+import os
 import datetime
+import functools
 import logging
-from typing import Dict, List, Tuple, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Any, Callable, FrozenSet, Iterable, Iterator, Optional
 
+import numpy as np
   
-from models.advanced_scoring import AdvancedCreditScoringEngine
+from models.advanced_scoring import AdvancedCreditScoringEngine, DEFAULT_OFFER_TERMS, OPTIONAL_OUTPUTS
+from models.annuity import amortization_schedule, effective_annual_rate, schedule_totals
+from models.application import APPLICATION_SCHEMA, ApplicationRecord, ApplicationSchema, to_int
+from models.shadow import ShadowScorer, build_challengers, file_log
+from models.tiers import TierTables, load_tier_tables
+from utils.audit import AuditWriter, create_sink
+from utils.decision_cache import DecisionCache, application_key
+from utils.metrics import METRICS, NULL_TIMER
+from utils.parallel import map_ranges, resolve_threads
 from utils.security import SecurityValidator, DataEncryption
 
-initialize_app()
+# Requests served in parallel threads by one instance. Shared state (the
+# engine, caches, rate limits, metrics) is either read-only after startup
+# or guarded by a lock; see benchmarks/concurrency.py.
+INSTANCE_CONCURRENCY = 16
 
-set_global_options(max_instances=10)
+# Concurrency above 1 needs a full vCPU
+set_global_options(max_instances=10, concurrency=INSTANCE_CONCURRENCY, cpu=1)
+
+# Directory of a memory-mapped reference store (built with models/reference_index.py).
+# When unset, the small JSON reference set in data/ is used.
+REFERENCE_STORE_ENV = 'FINIS_REFERENCE_STORE'
+# Seconds a decision is served again for an identical application; 0 turns the cache off
+DECISION_CACHE_TTL_ENV = 'FINIS_DECISION_CACHE_TTL'
+# Shadow scoring: comma-separated challengers (legacy, risk_scoring), 1-in-N sampling
+# and an optional JSON-lines file for disagreements (default: the finis.shadow logger)
+SHADOW_CHALLENGERS_ENV = 'FINIS_SHADOW_CHALLENGERS'
+SHADOW_SAMPLE_EVERY_ENV = 'FINIS_SHADOW_SAMPLE_EVERY'
+SHADOW_LOG_ENV = 'FINIS_SHADOW_LOG'
+# Threads deciding one batch request; unset uses every CPU on free-threaded
+# builds and none with the GIL (utils/parallel.py)
+BATCH_THREADS_ENV = 'FINIS_BATCH_THREADS'
+# Where evaluate_credit decisions are audited: firestore (default), memory or off
+AUDIT_SINK_ENV = 'FINIS_AUDIT_SINK'
+
+# Top-level make_decision response fields, and the parts of advanced_analysis
+RESPONSE_FIELDS = ("decision", "decision_reason", "credit_score", "risk_factors", "customer_segment",
+                   "segment_description", "interest_rates", "loan_details", "processing_info",
+                   "advanced_analysis", "timestamp", "engine_version")
+ANALYSIS_FIELDS = ("explainability", "calculations", "assumptions", "policy_flags", "limits")
+# Only returned when asked for by name, never part of a preset
+OPT_IN_FIELDS = ("counterfactuals",)
+# ?detail= presets; decision and timestamp are always returned
+DETAIL_LEVELS = {
+    "minimal": ("decision", "credit_score"),
+    "summary": ("decision", "decision_reason", "credit_score", "customer_segment", "interest_rates", "loan_details"),
+    "full": RESPONSE_FIELDS
+}
+
+def parse_field_selection(fields: str = None, detail: str = None) -> Optional[FrozenSet[str]]:
+    """Response fields from ?fields=a,b,advanced_analysis.limits and/or ?detail=<level>
+    
+    Returns None for the full response; unknown names raise ValueError.
+    OPT_IN_FIELDS are only included when named in fields.
+    """
+    if detail and detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unknown detail level '{detail}' (use one of: {', '.join(DETAIL_LEVELS)})")
+    if not fields and detail in (None, "", "full"):
+        return None
+    
+    selected = {"decision", "timestamp"}
+    selected.update(DETAIL_LEVELS.get(detail) or ())
+    unknown = []
+    for name in (fields or "").split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name in RESPONSE_FIELDS or name in OPT_IN_FIELDS or (name.startswith("advanced_analysis.")
+                                       and name[len("advanced_analysis."):] in ANALYSIS_FIELDS):
+            selected.add(name)
+        else:
+            unknown.append(name)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    
+    analysis_parts = [f"advanced_analysis.{part}" for part in ANALYSIS_FIELDS]
+    if "advanced_analysis" in selected:
+        selected.update(analysis_parts)
+    elif selected.intersection(analysis_parts):
+        # A selected part implies its parent block
+        selected.add("advanced_analysis")
+    if (selected.issuperset(RESPONSE_FIELDS) and selected.issuperset(analysis_parts)
+            and not selected.intersection(OPT_IN_FIELDS)):
+        return None
+    return frozenset(selected)
+
+_firebase_app = None
+_firebase_app_lock = threading.Lock()
+
+def get_firebase_app():
+    """Firebase Admin app, initialized on first use to keep firebase_admin off the cold start"""
+    global _firebase_app
+    if _firebase_app is None:
+        with _firebase_app_lock:
+            # initialize_app raises when called twice, so only the first thread may run it
+            if _firebase_app is None:
+                import firebase_admin
+                _firebase_app = firebase_admin.initialize_app()
+    return _firebase_app
+
+def _load_reference_model(reference_path: str = None):
+    # NumPy-backed models are imported here, on first use, not at cold start
+    store_path = os.environ.get(REFERENCE_STORE_ENV)
+    if store_path:
+        from models.reference_index import ReferenceIndex
+        return ReferenceIndex.open(store_path)
+    from models.reference_set import ReferenceSet
+    return ReferenceSet.load(reference_path) if reference_path else ReferenceSet.load()
 
 class CreditDecisionEngine:
-    def __init__(self):
+    def __init__(self, reference_set: Any = None, advanced_scoring: AdvancedCreditScoringEngine = None,
+                 reference_path: str = None, tiers: TierTables = None, shadow: ShadowScorer = None):
         self.base_rate = 4.09  # Fixed rate as requested
-        self.advanced_scoring = AdvancedCreditScoringEngine()
+        self.advanced_scoring = advanced_scoring if advanced_scoring is not None else AdvancedCreditScoringEngine()
+        # Score bands for calculate_credit_score (data/score_tiers.json)
+        self.tiers = tiers if tiers is not None else load_tier_tables()
+        self._income_tiers = self.tiers['credit_score.income']
+        self._debt_tiers = self.tiers['credit_score.debt_ratio']
+        self._asset_tiers = self.tiers['credit_score.assets']
+        self._kkb_tiers = self.tiers['credit_score.kkb']
+        self._loan_to_income_tiers = self.tiers['credit_score.loan_to_income']
+        self._term_tiers = self.tiers['credit_score.loan_term']
+        # Challenger models compared against live decisions in the background
+        self.shadow = shadow
         self.security_validator = SecurityValidator()
+        # Historical decisions for the similarity model, compiled once on first use
+        self._reference_set = reference_set
+        self.reference_path = reference_path
+        self._reference_lock = threading.Lock()
     
-    def _initialize_training_data(self) -> List[Dict]:
-        return [
-            {'age': 25, 'monthly_income': 5000, 'employment_years': 2, 'debt_ratio': 0.2, 'kkb_score': 650, 'approved': 0},
-            {'age': 35, 'monthly_income': 12000, 'employment_years': 8, 'debt_ratio': 0.3, 'kkb_score': 750, 'approved': 1},
-            {'age': 45, 'monthly_income': 8000, 'employment_years': 15, 'debt_ratio': 0.15, 'kkb_score': 720, 'approved': 1},
-            {'age': 30, 'monthly_income': 15000, 'employment_years': 5, 'debt_ratio': 0.4, 'kkb_score': 680, 'approved': 1},
-            {'age': 50, 'monthly_income': 20000, 'employment_years': 20, 'debt_ratio': 0.1, 'kkb_score': 800, 'approved': 1},
-            {'age': 28, 'monthly_income': 6000, 'employment_years': 3, 'debt_ratio': 0.35, 'kkb_score': 640, 'approved': 0},
-            {'age': 40, 'monthly_income': 18000, 'employment_years': 12, 'debt_ratio': 0.25, 'kkb_score': 780, 'approved': 1},
-            {'age': 55, 'monthly_income': 25000, 'employment_years': 25, 'debt_ratio': 0.05, 'kkb_score': 820, 'approved': 1},
-            {'age': 32, 'monthly_income': 7000, 'employment_years': 4, 'debt_ratio': 0.45, 'kkb_score': 620, 'approved': 0},
-            {'age': 38, 'monthly_income': 14000, 'employment_years': 10, 'debt_ratio': 0.2, 'kkb_score': 740, 'approved': 1},
-            {'age': 42, 'monthly_income': 22000, 'employment_years': 18, 'debt_ratio': 0.18, 'kkb_score': 785, 'approved': 1},
-            {'age': 29, 'monthly_income': 9000, 'employment_years': 6, 'debt_ratio': 0.32, 'kkb_score': 665, 'approved': 0},
-            {'age': 46, 'monthly_income': 16000, 'employment_years': 14, 'debt_ratio': 0.22, 'kkb_score': 735, 'approved': 1},
-            {'age': 33, 'monthly_income': 11000, 'employment_years': 7, 'debt_ratio': 0.38, 'kkb_score': 695, 'approved': 1},
-            {'age': 52, 'monthly_income': 24000, 'employment_years': 22, 'debt_ratio': 0.12, 'kkb_score': 810, 'approved': 1},
-            {'age': 27, 'monthly_income': 8500, 'employment_years': 5, 'debt_ratio': 0.28, 'kkb_score': 675, 'approved': 0},
-            {'age': 41, 'monthly_income': 19000, 'employment_years': 13, 'debt_ratio': 0.24, 'kkb_score': 755, 'approved': 1},
-            {'age': 56, 'monthly_income': 26000, 'employment_years': 27, 'debt_ratio': 0.08, 'kkb_score': 825, 'approved': 1},
-            {'age': 31, 'monthly_income': 10000, 'employment_years': 8, 'debt_ratio': 0.41, 'kkb_score': 655, 'approved': 0},
-            {'age': 39, 'monthly_income': 17000, 'employment_years': 11, 'debt_ratio': 0.19, 'kkb_score': 745, 'approved': 1}
-        ]
+    @property
+    def reference_set(self):
+        if self._reference_set is None:
+            with self._reference_lock:
+                # Concurrent first requests load it once
+                if self._reference_set is None:
+                    self._reference_set = _load_reference_model(self.reference_path)
+        return self._reference_set
     
     def _calculate_similarity_score(self, applicant: Dict, reference: Dict) -> float:
         age_diff = abs(applicant.get('age', 35) - reference['age']) / 30
@@ -67,43 +175,31 @@ class CreditDecisionEngine:
         return total_debt / max(total_income, 1)
     
 
+    def _reference_features(self, data: Dict) -> List[float]:
+        """Applicant features in reference set order"""
+        return [
+            data.get('age', 35),
+            data.get('monthly_income', 0),
+            data.get('work_experience', 0),
+            self._calculate_debt_ratio(data),
+            data.get('kkb_score', 500)
+        ]
+
     def _ml_prediction(self, data: Dict) -> float:
         """Advanced ML prediction using mathematical analysis"""
-        similarities = []
-        approvals = []
-        
-        # Calculate similarities with all training data points
-        for ref_data in self._initialize_training_data():
-            # Multi-dimensional similarity calculation
-            age_sim = max(0, 1 - abs(data.get('age', 35) - ref_data['age']) / 30)
-            income_sim = max(0, 1 - abs(data.get('monthly_income', 0) - ref_data['monthly_income']) / 20000)
-            exp_sim = max(0, 1 - abs(data.get('work_experience', 0) - ref_data['employment_years']) / 15)
-            debt_sim = max(0, 1 - abs(self._calculate_debt_ratio(data) - ref_data['debt_ratio']) / 0.5)
-            kkb_sim = max(0, 1 - abs(data.get('kkb_score', 500) - ref_data['kkb_score']) / 200)
-            
-            # Combined similarity with weighted factors
-            combined_similarity = (age_sim * 0.15 + income_sim * 0.30 + exp_sim * 0.20 + 
-                                 debt_sim * 0.25 + kkb_sim * 0.10)
-            
-            if combined_similarity > 0.1:  # Threshold for relevance
-                similarities.append(combined_similarity)
-                approvals.append(ref_data['approved'])
-        
-        if not similarities:
-            return 0.5  # Neutral if no similar cases
-        
-        # Weighted prediction using similarity scores
-        weighted_sum = sum(sim * app for sim, app in zip(similarities, approvals))
-        total_weight = sum(similarities)
-        
-        # Add confidence boost based on number of similar cases
-        confidence_factor = min(1.0, len(similarities) / 10)
-        base_prediction = weighted_sum / total_weight if total_weight > 0 else 0.5
-        
-        return base_prediction * confidence_factor + 0.5 * (1 - confidence_factor)
+        # Weighted similarity to every reference in one vectorized pass
+        return self.reference_set.predict(self._reference_features(data))
+    
+    def _ml_prediction_batch(self, applications: List[Dict]) -> List[float]:
+        """ML predictions for many applicants against the reference set in one pass"""
+        queries = [self._reference_features(data) for data in applications]
+        return self.reference_set.predict_batch(queries).tolist()
     
-    def calculate_credit_score(self, data: Dict) -> Tuple[float, List[str]]:
-        """Calculate comprehensive credit score based on 25+ factors"""
+    def calculate_credit_score(self, data: Dict, ml_prediction: float = None) -> Tuple[float, List[str]]:
+        """Calculate comprehensive credit score based on 25+ factors
+        
+        ml_prediction can be passed in when it was already computed (e.g. for a whole batch).
+        """
         score = 0
         factors = []
         
@@ -121,21 +217,7 @@ class CreditDecisionEngine:
         additional_income = data.get('additional_income', 0)
         total_income = monthly_income + additional_income
         
-        if total_income >= 35000:
-            income_score = 100
-        elif total_income >= 20000:
-            income_score = 90
-        elif total_income >= 15000:
-            income_score = 85
-        elif total_income >= 10000:
-            income_score = 75
-        elif total_income >= 7500:
-            income_score = 65
-        elif total_income >= 5000:
-            income_score = 55
-        else:
-            income_score = max(30, total_income / 200)
-        
+        income_score = self._income_tiers.lookup(total_income)
         score += income_score * 0.25
         factors.append(f"Gelir Skoru: {income_score:.0f}/100 (₺{total_income:,.0f})")
         
@@ -159,19 +241,7 @@ class CreditDecisionEngine:
         # 4. Debt Analysis (20%)
         debt_ratio = self._calculate_debt_ratio(data)
         
-        if debt_ratio <= 0.1:
-            debt_score = 100
-        elif debt_ratio <= 0.2:
-            debt_score = 95
-        elif debt_ratio <= 0.3:
-            debt_score = 85
-        elif debt_ratio <= 0.4:
-            debt_score = 75
-        elif debt_ratio <= 0.5:
-            debt_score = 60
-        else:
-            debt_score = max(0, 20 - (debt_ratio - 0.5) * 40)
-        
+        debt_score = self._debt_tiers.lookup(debt_ratio)
         score += debt_score * 0.20
         factors.append(f"Borç Skoru: {debt_score:.0f}/100 (Oran: %{debt_ratio*100:.1f})")
         
@@ -181,19 +251,7 @@ class CreditDecisionEngine:
         real_estate_value = data.get('real_estate_value', 0)
         total_assets = bank_balance + investments + real_estate_value
         
-        if total_assets >= 1000000:
-            asset_score = 100
-        elif total_assets >= 500000:
-            asset_score = 90
-        elif total_assets >= 250000:
-            asset_score = 80
-        elif total_assets >= 100000:
-            asset_score = 70
-        elif total_assets >= 50000:
-            asset_score = 60
-        else:
-            asset_score = max(30, total_assets / 2000)
-        
+        asset_score = self._asset_tiers.lookup(total_assets)
         score += asset_score * 0.15
         factors.append(f"Varlık Skoru: {asset_score:.0f}/100 (₺{total_assets:,.0f})")
         
@@ -201,16 +259,7 @@ class CreditDecisionEngine:
         kkb_score = data.get('kkb_score', 500)
         payment_delays = data.get('payment_delays', 0)
         
-        if kkb_score >= 800:
-            credit_history_score = 100
-        elif kkb_score >= 700:
-            credit_history_score = 85
-        elif kkb_score >= 600:
-            credit_history_score = 70
-        elif kkb_score >= 500:
-            credit_history_score = 55
-        else:
-            credit_history_score = 30
+        credit_history_score = self._kkb_tiers.lookup(kkb_score)
         
         # Payment delays penalty
         delay_penalty = min(30, payment_delays * 5)
@@ -234,51 +283,74 @@ class CreditDecisionEngine:
         loan_amount = data.get('loan_amount', 0)
         loan_to_income_ratio = loan_amount / max(total_income * 12, 1)  # Yıllık gelire göre
         
-        if loan_to_income_ratio <= 2:
-            loan_risk_score = 100
-        elif loan_to_income_ratio <= 3:
-            loan_risk_score = 85
-        elif loan_to_income_ratio <= 4:
-            loan_risk_score = 70
-        elif loan_to_income_ratio <= 5:
-            loan_risk_score = 55
-        elif loan_to_income_ratio <= 6:
-            loan_risk_score = 40
-        else:
-            loan_risk_score = max(20, 100 - (loan_to_income_ratio - 6) * 10)
-        
+        loan_risk_score = self._loan_to_income_tiers.lookup(loan_to_income_ratio)
         score += loan_risk_score * 0.04
         factors.append(f"Kredi/Gelir Riski: {loan_risk_score:.0f}/100 (Oran: {loan_to_income_ratio:.1f})")
         
         # 9. Loan Term Risk (3%)
         loan_term = data.get('loan_term_months', 12)
         
-        if loan_term <= 12:
-            term_risk_score = 100
-        elif loan_term <= 24:
-            term_risk_score = 90
-        elif loan_term <= 36:
-            term_risk_score = 80
-        elif loan_term <= 48:
-            term_risk_score = 70
-        elif loan_term <= 60:
-            term_risk_score = 60
-        elif loan_term <= 84:
-            term_risk_score = 50
-        else:
-            term_risk_score = max(30, 100 - (loan_term - 84) * 2)
-        
+        term_risk_score = self._term_tiers.lookup(loan_term)
         score += term_risk_score * 0.03
         factors.append(f"Vade Riski: {term_risk_score:.0f}/100 ({loan_term} ay)")
         
         # 9. AI/ML Component (5%)
-        ml_prediction = self._ml_prediction(data)
+        if ml_prediction is None:
+            ml_prediction = self._ml_prediction(data)
         ml_score = ml_prediction * 100
         score += ml_score * 0.05
         factors.append(f"AI Tahmin: {ml_score:.0f}/100 (Risk: %{(1-ml_prediction)*100:.1f})")
         
         return min(100, max(0, score)), factors
     
+    def calculate_credit_scores(self, applications: List[Dict], ml_predictions: List[float] = None) -> np.ndarray:
+        """calculate_credit_score for many applications at once, scores only
+
+        Same arithmetic in the same order, one column at a time, with the tier
+        tables looked up by searchsorted; the results equal the scalar scores.
+        """
+        def column(field: str, default: float = 0) -> np.ndarray:
+            return np.array([data.get(field, default) for data in applications], dtype=np.float64)
+
+        if ml_predictions is None:
+            ml_predictions = self._ml_prediction_batch(applications)
+
+        age = column('age', 35)
+        age_score = np.where((age >= 25) & (age <= 65), np.minimum(100, (age - 20) * 2),
+                             np.maximum(0, 100 - np.abs(age - 45) * 2))
+        score = age_score * 0.05
+
+        total_income = column('monthly_income') + column('additional_income')
+        score = score + self._income_tiers.lookup_many(total_income) * 0.25
+
+        employment_score = np.minimum(100, column('work_experience') * 12 + 20)
+        bonus = np.array([1.2 if 'Doktor' in kind or 'Mühendis' in kind else 1.1 if 'Özel Sektör' in kind
+                          else 1.15 if 'Kamu' in kind else 1.0
+                          for kind in (data.get('employment_type', '') for data in applications)])
+        employment_score = np.minimum(100, employment_score * bonus)
+        score = score + employment_score * 0.15
+
+        debt_ratio = (column('existing_loans') + column('credit_card_debt')) / np.maximum(total_income, 1)
+        score = score + self._debt_tiers.lookup_many(debt_ratio) * 0.20
+
+        total_assets = column('bank_balance') + column('investments') + column('real_estate_value')
+        score = score + self._asset_tiers.lookup_many(total_assets) * 0.15
+
+        delay_penalty = np.minimum(30, column('payment_delays') * 5)
+        credit_history_score = np.maximum(0, self._kkb_tiers.lookup_many(column('kkb_score', 500)) - delay_penalty)
+        score = score + credit_history_score * 0.10
+
+        relationship_score = np.minimum(100, column('existing_relationship') * 2)
+        product_bonus = np.minimum(20, column('total_banking_products') * 5)
+        score = score + np.minimum(100, relationship_score + product_bonus) * 0.05
+
+        loan_to_income_ratio = column('loan_amount') / np.maximum(total_income * 12, 1)
+        score = score + self._loan_to_income_tiers.lookup_many(loan_to_income_ratio) * 0.04
+        score = score + self._term_tiers.lookup_many(column('loan_term_months', 12)) * 0.03
+
+        score = score + np.asarray(ml_predictions, dtype=np.float64) * 100 * 0.05
+        return np.clip(score, 0, 100)
+    
     def determine_customer_segment(self, data: Dict) -> Tuple[str, str]:
         """Determine customer segment based on comprehensive profile"""
         monthly_income = data.get('monthly_income', 0)
@@ -341,19 +413,51 @@ class CreditDecisionEngine:
             'annual_rate': final_rate * 12
         }
     
-    def make_decision(self, data: Dict) -> Dict:
-        """Make comprehensive credit decision using Advanced Scoring Engine (4.09% Fixed)"""
+    @METRICS.request_scope
+    def make_decision(self, data: Any, fields: Optional[FrozenSet[str]] = None) -> Dict:
+        """Make comprehensive credit decision using Advanced Scoring Engine (4.09% Fixed)
+        
+        fields (see parse_field_selection) limits the response, and the work
+        done, to the requested fields; None returns everything.
+        """
+        timer = METRICS.timer()
+        wanted = (lambda name: True) if fields is None else fields.__contains__
         try:
             # Basic data validation
-            if not data or not isinstance(data, dict):
+            if isinstance(data, ApplicationRecord):
+                # Already decoded and range-checked by the caller
+                record, errors = data, []
+            elif not data or not isinstance(data, dict):
                 return {
                     "decision": "ERROR",
                     "error": "Geçersiz veri formatı",
                     "timestamp": datetime.datetime.now().isoformat()
                 }
+            else:
+                # Decode into a typed record with range checks, once for the whole pipeline
+                record, errors = APPLICATION_SCHEMA.validate(data)
+            if errors:
+                return {
+                    "decision": "ERROR",
+                    "error": "Geçersiz başvuru verisi: " + "; ".join(errors),
+                    "errors": errors,
+                    "timestamp": datetime.datetime.now().isoformat()
+                }
+            
+            timer.lap('decision.validate')
+            
+            # Only compute limits and explanations that end up in the response
+            include = [part for part in OPTIONAL_OUTPUTS if wanted(f"advanced_analysis.{part}")]
+            if wanted("risk_factors") and "explainability" not in include:
+                include.append("explainability")
             
             # Use new advanced scoring system with 4.09% fixed rate
-            scoring_result = self.advanced_scoring.score_application(data)
+            scoring_result = self.advanced_scoring.score_application(record, include)
+            timer.skip()
+            
+            if self.shadow is not None:
+                # Only enqueues: challengers run on the shadow worker thread
+                self.shadow.submit(record, scoring_result['score'], scoring_result['decision'])
             
             # Convert decision format to match frontend expectations
             decision_mapping = {
@@ -364,51 +468,72 @@ class CreditDecisionEngine:
             
             turkish_decision = decision_mapping.get(scoring_result['decision'], "CONDITIONAL")
             
-            # Generate Turkish decision reason
+            response = {"decision": turkish_decision}
             score = scoring_result['score']
-            if turkish_decision == "ONAYLANDI":
-                decision_reason = f"Kredi onaylandı - Risk skoru: {score}/100. Güçlü finansal profil."
-            elif turkish_decision == "CONDITIONAL":
-                decision_reason = f"Koşullu onay - Risk skoru: {score}/100. Ek şartlar gerekli."
-            else:
-                decision_reason = f"Kredi reddedildi - Risk skoru: {score}/100. Risk kriterleri karşılanmadı."
-            
-            # Create detailed risk factors from advanced scoring
-            risk_factors = []
             calc = scoring_result.get('calculations', {})
             expl = scoring_result.get('explainability', {})
             
-            # Add detailed financial metrics
-            risk_factors.append(f"Net Gelir: {calc.get('net_income', 0):,.0f} TL")
-            risk_factors.append(f"Yeni DTI Oranı: %{calc.get('new_dti', 0)*100:.1f}")
-            risk_factors.append(f"Aylık Taksit: {calc.get('new_installment', 0):,.0f} TL")
-            risk_factors.append(f"Kredi Kartı Kullanım: %{calc.get('credit_utilization', 0)*100:.1f}")
-            risk_factors.append(f"Likidite Oranı: {calc.get('liquidity_ratio', 0):.2f}")
+            # Generate Turkish decision reason
+            if wanted("decision_reason"):
+                if turkish_decision == "ONAYLANDI":
+                    decision_reason = f"Kredi onaylandı - Risk skoru: {score}/100. Güçlü finansal profil."
+                elif turkish_decision == "CONDITIONAL":
+                    decision_reason = f"Koşullu onay - Risk skoru: {score}/100. Ek şartlar gerekli."
+                else:
+                    decision_reason = f"Kredi reddedildi - Risk skoru: {score}/100. Risk kriterleri karşılanmadı."
+                response["decision_reason"] = decision_reason
             
-            # Add top contributing factors
-            for feature in expl.get('top_five_features', [])[:3]:  # Top 3 only
-                risk_factors.append(f"{feature['feature']}: {feature['contribution']:.1f} puan")
+            if wanted("credit_score"):
+                response["credit_score"] = score
             
-            return {
-                "decision": turkish_decision,
-                "decision_reason": decision_reason,
-                "credit_score": score,
-                "risk_factors": risk_factors,
-                "customer_segment": self._determine_segment_from_score(score),
-                "segment_description": self._get_segment_description(score),
-                "interest_rates": self._calculate_simple_rates(scoring_result),
-                "loan_details": self._calculate_loan_details(data, scoring_result),
-                "processing_info": self._get_processing_info(turkish_decision, score),
-                "advanced_analysis": {
+            # Create detailed risk factors from advanced scoring
+            if wanted("risk_factors"):
+                risk_factors = []
+                
+                # Add detailed financial metrics
+                risk_factors.append(f"Net Gelir: {calc.get('net_income', 0):,.0f} TL")
+                risk_factors.append(f"Yeni DTI Oranı: %{calc.get('new_dti', 0)*100:.1f}")
+                risk_factors.append(f"Aylık Taksit: {calc.get('new_installment', 0):,.0f} TL")
+                risk_factors.append(f"Kredi Kartı Kullanım: %{calc.get('credit_utilization', 0)*100:.1f}")
+                risk_factors.append(f"Likidite Oranı: {calc.get('liquidity_ratio', 0):.2f}")
+                
+                # Add top contributing factors
+                for feature in expl.get('top_five_features', [])[:3]:  # Top 3 only
+                    risk_factors.append(f"{feature['feature']}: {feature['contribution']:.1f} puan")
+                response["risk_factors"] = risk_factors
+                timer.lap('decision.risk_factors')
+            
+            if wanted("customer_segment"):
+                response["customer_segment"] = self._determine_segment_from_score(score)
+            if wanted("segment_description"):
+                response["segment_description"] = self._get_segment_description(score)
+            if wanted("interest_rates"):
+                response["interest_rates"] = self._calculate_simple_rates(scoring_result)
+            if wanted("loan_details"):
+                response["loan_details"] = self._calculate_loan_details(record, scoring_result)
+            if wanted("processing_info"):
+                response["processing_info"] = self._get_processing_info(turkish_decision, score)
+            if wanted("advanced_analysis"):
+                analysis = {
                     "explainability": expl,
                     "calculations": calc,
                     "assumptions": scoring_result.get('assumptions', {}),
                     "policy_flags": scoring_result.get('policy_flags', {}),
                     "limits": scoring_result.get('limits', {})
-                },
-                "timestamp": scoring_result.get('timestamp'),
-                "engine_version": scoring_result.get('engine_version')
-            }
+                }
+                response["advanced_analysis"] = {part: analysis[part] for part in ANALYSIS_FIELDS
+                                                 if wanted(f"advanced_analysis.{part}")}
+            if fields is not None and "counterfactuals" in fields and scoring_result['decision'] != "APPROVE":
+                # Smallest single-input changes reaching the next decision level
+                from models.counterfactual import counterfactual_options
+                response["counterfactuals"] = counterfactual_options(self.advanced_scoring, record)
+                timer.lap('decision.counterfactuals')
+            response["timestamp"] = scoring_result.get('timestamp')
+            if wanted("engine_version"):
+                response["engine_version"] = scoring_result.get('engine_version')
+            timer.total('make_decision')
+            METRICS.inc('finis_decisions_total', decision=turkish_decision)
+            return response
             
         except Exception as e:
             return {
@@ -417,6 +542,24 @@ class CreditDecisionEngine:
                 "timestamp": datetime.datetime.now().isoformat()
             }
     
+    def make_decisions(self, applications: List[Any], fields: Optional[FrozenSet[str]] = None,
+                       threads: Optional[int] = None) -> List[Dict]:
+        """make_decision for every application, in order, on a thread pool
+        
+        The threads share this engine and its reference set. threads=None
+        uses every CPU on free-threaded builds and the calling thread with
+        the GIL, where decisions would only take turns.
+        """
+        def decide(start: int, stop: int) -> List[Dict]:
+            return [self.make_decision(data, fields) for data in applications[start:stop]]
+        
+        if not isinstance(applications, (list, tuple)):
+            applications = list(applications)
+        # Load the reference set once before the threads need it
+        self.reference_set
+        return [decision for part in map_ranges(decide, len(applications), threads, MIN_THREAD_DECISIONS)
+                for decision in part]
+    
     def _determine_segment_from_score(self, score: float) -> str:
         """Determine customer segment from score"""
         if score >= 75:
@@ -454,10 +597,10 @@ class CreditDecisionEngine:
         """Calculate loan details using fixed rate"""
         loan_amount = data.get('loan_amount', 0)
         loan_term = data.get('loan_term_months', 12)
-        monthly_installment = scoring_result.get('calculations', {}).get('new_installment', 0)
-        
-        total_payment = monthly_installment * loan_term
-        total_interest = total_payment - loan_amount
+        monthly_installment = round(self.advanced_scoring.annuity.payment(float(loan_amount), int(loan_term)), 2)
+        # Totals follow the amortization schedule, last-month settlement included
+        total_payment, total_interest = schedule_totals(float(loan_amount), self.advanced_scoring.monthly_rate,
+                                                        int(loan_term))
         
         return {
             "requested_amount": loan_amount,
@@ -465,7 +608,8 @@ class CreditDecisionEngine:
             "monthly_payment": round(monthly_installment, 2),
             "total_payment": round(total_payment, 2),
             "total_interest": round(total_interest, 2),
-            "effective_annual_rate": 4.09
+            # Product rate compounded monthly, in percent
+            "effective_annual_rate": round(effective_annual_rate(self.advanced_scoring.monthly_rate) * 100, 2)
         }
     
     def _get_processing_info(self, decision: str, score: float) -> Dict:
@@ -490,21 +634,237 @@ class CreditDecisionEngine:
     
 
 # Initialize the decision engine
-decision_engine = CreditDecisionEngine()
+_decision_engine = None
+_decision_engine_lock = threading.Lock()
 
-@https_fn.on_request()
-def evaluate_credit(req: https_fn.Request) -> https_fn.Response:
-    """Firebase Cloud Function for AI credit evaluation"""
+def get_decision_engine() -> CreditDecisionEngine:
+    """Shared engine, built on first use
     
-    # Comprehensive CORS headers
-    headers = {
+    The engine is only read after construction, so requests on any thread
+    can use it without locking; building it is serialized so concurrent
+    first requests share one instance.
+    """
+    global _decision_engine
+    engine = _decision_engine
+    if engine is None:
+        with _decision_engine_lock:
+            engine = _decision_engine
+            if engine is None:
+                engine = CreditDecisionEngine()
+                engine.shadow = _build_shadow_scorer(engine)
+                # Published only once complete, so the unlocked check above never sees a half-built engine
+                _decision_engine = engine
+    return engine
+
+def _build_shadow_scorer(engine: CreditDecisionEngine) -> Optional[ShadowScorer]:
+    """Shadow scorer configured from the environment, or None when no challengers are set"""
+    names = [name for name in os.environ.get(SHADOW_CHALLENGERS_ENV, '').split(',') if name.strip()]
+    if not names:
+        return None
+    log_path = os.environ.get(SHADOW_LOG_ENV)
+    return ShadowScorer(build_challengers(names, legacy_engine=engine),
+                        sample_every=int(os.environ.get(SHADOW_SAMPLE_EVERY_ENV, '1')),
+                        log=file_log(log_path) if log_path else None)
+
+_decision_cache_ttl = float(os.environ.get(DECISION_CACHE_TTL_ENV, '300'))
+DECISION_CACHE = DecisionCache(ttl_seconds=_decision_cache_ttl) if _decision_cache_ttl > 0 else None
+
+_audit_sink_kind = os.environ.get(AUDIT_SINK_ENV, 'firestore')
+_audit_writer = None
+_audit_writer_lock = threading.Lock()
+
+def get_audit_writer() -> Optional[AuditWriter]:
+    """Shared decision audit writer, started on first use; None when auditing is off"""
+    global _audit_writer
+    if _audit_sink_kind == 'off':
+        return None
+    writer = _audit_writer
+    if writer is None:
+        with _audit_writer_lock:
+            writer = _audit_writer
+            if writer is None:
+                writer = AuditWriter(create_sink(_audit_sink_kind, app_factory=get_firebase_app))
+                # The functions runtime stops workers with a normal interpreter exit, which runs atexit
+                atexit.register(writer.close)
+                _audit_writer = writer
+    return writer
+
+def _audit_decision(data: Any, body: str, cache_hit: bool):
+    """Queue one evaluate_credit decision for the audit log; never fails the request"""
+    try:
+        writer = get_audit_writer()
+        if writer is not None:
+            writer.submit((time.time(), data, body, cache_hit))
+    except Exception:
+        logging.exception("Decision audit failed")
+
+_TIMESTAMP_KEY = '"timestamp": '
+
+def _split_timestamp(body: str, timestamp: Any) -> Tuple[str, str]:
+    """Encoded decision split around its top-level timestamp value"""
+    # The top-level timestamp follows advanced_analysis, so it is the last occurrence
+    marker = _TIMESTAMP_KEY + json.dumps(timestamp)
+    position = body.rfind(marker)
+    return body[:position + len(_TIMESTAMP_KEY)], body[position + len(marker):]
+
+def _encoded_decision(data: Any, fields: Optional[FrozenSet[str]] = None,
+                      timer=NULL_TIMER) -> Tuple[str, bool]:
+    """JSON body of the decision for one application and whether it came from the cache
+    
+    Retries of the same application (and field selection) are answered from
+    DECISION_CACHE with a fresh timestamp; ERROR results are never cached.
+    """
+    engine = get_decision_engine()
+    record = None
+    if DECISION_CACHE is not None and isinstance(data, dict):
+        record, errors = APPLICATION_SCHEMA.validate(data)
+    if record is None:
+        result = engine.make_decision(data, fields)
+        timer.skip()
+        body = json.dumps(result, ensure_ascii=False)
+        timer.lap('decision.json_encode')
+        return body, False
+    
+    key = application_key(record, ",".join(sorted(fields)) if fields else "")
+    cached = DECISION_CACHE.get(key)
+    if cached is not None:
+        head, tail = cached
+        body = head + json.dumps(datetime.datetime.now().isoformat()) + tail
+        timer.lap('decision.cache_hit')
+        return body, True
+    timer.lap('decision.cache_lookup')
+    
+    result = engine.make_decision(record, fields)
+    timer.skip()
+    body = json.dumps(result, ensure_ascii=False)
+    timer.lap('decision.json_encode')
+    if result.get('decision') != 'ERROR':
+        DECISION_CACHE.put(key, _split_timestamp(body, result.get('timestamp')))
+    return body, False
+
+# Upper bound on applications accepted by a single evaluate_credit_batch call
+MAX_BATCH_SIZE = 5000
+# Smallest batch split across threads
+MIN_THREAD_DECISIONS = 16
+BATCH_THREADS = resolve_threads(int(os.environ[BATCH_THREADS_ENV]) if os.environ.get(BATCH_THREADS_ENV) else None)
+# Upper bound on amount x term cells in one loan_offers call
+MAX_OFFER_CELLS = 2000
+
+# loan_schedule only needs the amount and the term
+SCHEDULE_SCHEMA = ApplicationSchema(required=('loan_amount', 'loan_term_months'))
+
+def _cors_headers(content_type: str = 'application/json; charset=utf-8') -> Dict[str, str]:
+    """CORS headers shared by the HTTP functions"""
+    return {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'GET, POST, OPTIONS, PUT, DELETE',
         'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With, Accept, Origin',
         'Access-Control-Max-Age': '86400',
-        'Content-Type': 'application/json; charset=utf-8',
+        'Content-Type': content_type,
         'Vary': 'Origin'
     }
+
+def _parse_batch_body(body: str) -> List[Tuple[Any, str]]:
+    """Split a batch body into items: a JSON array, or one JSON document per line (NDJSON)
+    
+    NDJSON lines are decoded lazily by _decode_batch_item so that a malformed
+    line only fails that item.
+    """
+    stripped = body.lstrip()
+    if stripped.startswith('['):
+        items = json.loads(stripped)
+        return [(item, None) for item in items]
+    return [(None, line) for line in body.splitlines() if line.strip()]
+
+def _decode_batch_item(item: Any, line: str) -> Any:
+    """Return the application for a parsed batch entry"""
+    return json.loads(line) if line is not None else item
+
+def _batch_line(index: int, item: Any, line: str, fields: Optional[FrozenSet[str]] = None) -> str:
+    """NDJSON line for one batch item"""
+    try:
+        application = _decode_batch_item(item, line)
+    except ValueError as json_error:
+        result = {
+            "decision": "ERROR",
+            "error": f"Invalid JSON: {str(json_error)}",
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+        return json.dumps({"index": index, **result}, ensure_ascii=False) + "\n"
+    body, _ = _encoded_decision(application, fields)
+    # Splice the index in front of the decision's own keys
+    return f'{{"index": {index}, {body[1:]}\n'
+
+def _stream_batch_decisions(items: List[Tuple[Any, str]],
+                            fields: Optional[FrozenSet[str]] = None) -> Iterator[str]:
+    """Yield one NDJSON line per application as soon as its decision is ready"""
+    if BATCH_THREADS <= 1 or len(items) < MIN_THREAD_DECISIONS:
+        for index, (item, line) in enumerate(items):
+            yield _batch_line(index, item, line, fields)
+        return
+    # Decided on a pool, written in order as each line's turn comes
+    with ThreadPoolExecutor(max_workers=BATCH_THREADS) as pool:
+        yield from pool.map(lambda index: _batch_line(index, *items[index], fields), range(len(items)))
+
+def _parse_offer_axis(values: Any, field: str, convert: Callable[[Any], Any] = float) -> List[Any]:
+    """Amounts or terms for loan_offers, converted and range-checked like the application field"""
+    if not isinstance(values, list) or not values:
+        raise ValueError(f"'{field}' must be a non-empty list")
+    lo, hi = APPLICATION_SCHEMA.ranges[field]
+    parsed = []
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"'{field}' values must be numbers")
+        try:
+            value = convert(value)
+        except ValueError:
+            raise ValueError(f"'{field}' values must be whole numbers")
+        if not lo <= value <= hi:
+            raise ValueError(f"'{field}' values must be between {lo} and {hi}")
+        parsed.append(value)
+    return parsed
+
+def _stream_schedule(loan_amount: float, term: int, monthly_rate: float) -> Iterator[str]:
+    """One NDJSON line per month, produced as the response is written"""
+    for row in amortization_schedule(loan_amount, monthly_rate, term):
+        yield json.dumps(row) + "\n"
+
+def _metrics_response() -> https_fn.Response:
+    return https_fn.Response(
+        METRICS.render_prometheus(),
+        status=200,
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
+
+def _instrumented(handler):
+    """Count requests by status and time the whole handler
+    
+    Each function is deployed as its own service, so GET ?metrics on an
+    instrumented function returns the metrics of the instance serving it.
+    """
+    name = handler.__name__
+    
+    @functools.wraps(handler)
+    @METRICS.request_scope
+    def wrapper(req: https_fn.Request) -> https_fn.Response:
+        if req.method == 'GET' and 'metrics' in req.args:
+            return _metrics_response()
+        timer = METRICS.timer()
+        response = handler(req)
+        # Streamed responses are timed until the body starts
+        timer.total(name)
+        METRICS.inc('finis_requests_total', function=name, status=str(response.status_code))
+        return response
+    
+    return wrapper
+
+@https_fn.on_request()
+@_instrumented
+def evaluate_credit(req: https_fn.Request) -> https_fn.Response:
+    """Firebase Cloud Function for AI credit evaluation"""
+    
+    # Comprehensive CORS headers
+    headers = _cors_headers()
     
     # Handle preflight OPTIONS request
     if req.method == 'OPTIONS':
@@ -518,7 +878,17 @@ def evaluate_credit(req: https_fn.Request) -> https_fn.Response:
                 headers=headers
             )
         
+        try:
+            fields = parse_field_selection(req.args.get('fields'), req.args.get('detail'))
+        except ValueError as field_error:
+            return https_fn.Response(
+                json.dumps({"error": str(field_error)}, ensure_ascii=False),
+                status=400,
+                headers=headers
+            )
+        
         # Parse request data with better error handling
+        timer = METRICS.timer()
         try:
             data = req.get_json()
         except Exception as json_error:
@@ -535,14 +905,15 @@ def evaluate_credit(req: https_fn.Request) -> https_fn.Response:
                 headers=headers
             )
         
-        # Make credit decision using AI engine  
-        result = decision_engine.make_decision(data)
+        timer.lap('evaluate_credit.parse_body')
         
-        return https_fn.Response(
-            json.dumps(result, ensure_ascii=False),
-            status=200,
-            headers=headers
-        )
+        # Make credit decision using AI engine (or replay it for a retried application)
+        body, cache_hit = _encoded_decision(data, fields, timer)
+        timer.total('evaluate_credit.body')
+        # Written to Firestore in batches by the audit worker, not on this thread
+        _audit_decision(data, body, cache_hit)
+        headers['X-Decision-Cache'] = 'HIT' if cache_hit else 'MISS'
+        return https_fn.Response(body, status=200, headers=headers)
         
     except Exception as e:
         error_response = {
@@ -556,6 +927,173 @@ def evaluate_credit(req: https_fn.Request) -> https_fn.Response:
             headers=headers
         )
 
+@https_fn.on_request()
+@_instrumented
+def evaluate_credit_batch(req: https_fn.Request) -> https_fn.Response:
+    """Evaluate many applications in one call: JSON array or NDJSON in, NDJSON out"""
+    
+    headers = _cors_headers('application/x-ndjson; charset=utf-8')
+    
+    if req.method == 'OPTIONS':
+        return https_fn.Response('', status=200, headers=headers)
+    
+    if req.method != 'POST':
+        return https_fn.Response(
+            json.dumps({"error": "Only POST method allowed"}, ensure_ascii=False),
+            status=405,
+            headers=_cors_headers()
+        )
+    
+    try:
+        fields = parse_field_selection(req.args.get('fields'), req.args.get('detail'))
+    except ValueError as field_error:
+        return https_fn.Response(
+            json.dumps({"error": str(field_error)}, ensure_ascii=False),
+            status=400,
+            headers=_cors_headers()
+        )
+    
+    try:
+        items = _parse_batch_body(req.get_data(as_text=True))
+    except ValueError as json_error:
+        return https_fn.Response(
+            json.dumps({"error": f"Invalid JSON: {str(json_error)}"}, ensure_ascii=False),
+            status=400,
+            headers=_cors_headers()
+        )
+    
+    if not items:
+        return https_fn.Response(
+            json.dumps({"error": "No data provided"}, ensure_ascii=False),
+            status=400,
+            headers=_cors_headers()
+        )
+    
+    if len(items) > MAX_BATCH_SIZE:
+        return https_fn.Response(
+            json.dumps({"error": f"Batch too large: max {MAX_BATCH_SIZE} applications"}, ensure_ascii=False),
+            status=413,
+            headers=_cors_headers()
+        )
+    
+    # Results are streamed line by line; per-item failures become ERROR lines
+    return https_fn.Response(_stream_batch_decisions(items, fields), status=200, headers=headers)
+
+@https_fn.on_request()
+@_instrumented
+def loan_offers(req: https_fn.Request) -> https_fn.Response:
+    """Offer matrix for one application: every term (and optionally several amounts) in one call
+    
+    Body: {"application": {...}, "terms": [12, 24, ...], "amounts": [...]}, or
+    the bare application for the default terms at the requested amount.
+    """
+    
+    headers = _cors_headers()
+    
+    if req.method == 'OPTIONS':
+        return https_fn.Response('', status=200, headers=headers)
+    
+    if req.method != 'POST':
+        return https_fn.Response(
+            json.dumps({"error": "Only POST method allowed"}, ensure_ascii=False),
+            status=405,
+            headers=headers
+        )
+    
+    try:
+        body = req.get_json()
+    except Exception as json_error:
+        return https_fn.Response(
+            json.dumps({"error": f"Invalid JSON: {str(json_error)}"}, ensure_ascii=False),
+            status=400,
+            headers=headers
+        )
+    
+    if not body or not isinstance(body, dict):
+        return https_fn.Response(
+            json.dumps({"error": "No data provided"}, ensure_ascii=False),
+            status=400,
+            headers=headers
+        )
+    
+    application = body.get('application', body)
+    record, errors = APPLICATION_SCHEMA.validate(application)
+    try:
+        terms = _parse_offer_axis(body['terms'], 'loan_term_months', to_int) if 'terms' in body else None
+        amounts = _parse_offer_axis(body['amounts'], 'loan_amount') if 'amounts' in body else None
+    except ValueError as axis_error:
+        errors = errors + [str(axis_error)]
+    if errors:
+        return https_fn.Response(
+            json.dumps({"error": "Geçersiz başvuru verisi: " + "; ".join(errors), "errors": errors},
+                       ensure_ascii=False),
+            status=400,
+            headers=headers
+        )
+    
+    cells = (len(terms) if terms else len(DEFAULT_OFFER_TERMS)) * (len(amounts) if amounts else 1)
+    if cells > MAX_OFFER_CELLS:
+        return https_fn.Response(
+            json.dumps({"error": f"Offer matrix too large: max {MAX_OFFER_CELLS} amount x term cells"},
+                       ensure_ascii=False),
+            status=413,
+            headers=headers
+        )
+    
+    try:
+        result = get_decision_engine().advanced_scoring.offer_matrix(record, terms, amounts)
+        result["timestamp"] = datetime.datetime.now().isoformat()
+        return https_fn.Response(json.dumps(result, ensure_ascii=False), status=200, headers=headers)
+    except Exception as e:
+        return https_fn.Response(
+            json.dumps({"error": "Offer calculation failed", "message": str(e),
+                        "timestamp": datetime.datetime.now().isoformat()}, ensure_ascii=False),
+            status=500,
+            headers=headers
+        )
+
+@https_fn.on_request()
+@_instrumented
+def loan_schedule(req: https_fn.Request) -> https_fn.Response:
+    """Month-by-month amortization schedule, streamed as NDJSON
+    
+    Body: {"loan_amount": ..., "loan_term_months": ...} at the product rate.
+    """
+    
+    headers = _cors_headers('application/x-ndjson; charset=utf-8')
+    
+    if req.method == 'OPTIONS':
+        return https_fn.Response('', status=200, headers=headers)
+    
+    if req.method != 'POST':
+        return https_fn.Response(
+            json.dumps({"error": "Only POST method allowed"}, ensure_ascii=False),
+            status=405,
+            headers=_cors_headers()
+        )
+    
+    try:
+        body = req.get_json()
+    except Exception as json_error:
+        return https_fn.Response(
+            json.dumps({"error": f"Invalid JSON: {str(json_error)}"}, ensure_ascii=False),
+            status=400,
+            headers=_cors_headers()
+        )
+    
+    record, errors = SCHEDULE_SCHEMA.validate(body)
+    if errors:
+        return https_fn.Response(
+            json.dumps({"error": "Geçersiz başvuru verisi: " + "; ".join(errors), "errors": errors},
+                       ensure_ascii=False),
+            status=400,
+            headers=_cors_headers()
+        )
+    
+    monthly_rate = get_decision_engine().advanced_scoring.monthly_rate
+    return https_fn.Response(_stream_schedule(record.loan_amount, record.loan_term_months, monthly_rate),
+                             status=200, headers=headers)
+
 @https_fn.on_request()
 def health_check(req: https_fn.Request) -> https_fn.Response:
     """Health check endpoint for monitoring"""
@@ -579,6 +1117,12 @@ def system_info(req: https_fn.Request) -> https_fn.Response:
             "Benzerlik tabanlı risk değerlendirmesi"
         ],
         "status": "active",
+        "annuity_table": get_decision_engine().advanced_scoring.annuity.stats(),
+        "score_tiers": get_decision_engine().tiers.stats(),
+        "shadow_scoring": get_decision_engine().shadow.stats() if get_decision_engine().shadow else None,
+        "decision_cache": DECISION_CACHE.stats() if DECISION_CACHE is not None else None,
+        "decision_audit": _audit_writer.stats() if _audit_writer is not None else None,
+        "stage_latency": METRICS.summary(),
         "timestamp": datetime.datetime.now().isoformat(),
         "runtime": "Python 3.13 (Firebase Functions)"
     }
@@ -587,4 +1131,9 @@ def system_info(req: https_fn.Request) -> https_fn.Response:
         json.dumps(info, ensure_ascii=False),
         status=200,
         headers={'Content-Type': 'application/json; charset=utf-8'}
-    )
\ No newline at end of file
+    )
+
+@https_fn.on_request()
+def metrics(req: https_fn.Request) -> https_fn.Response:
+    """Prometheus metrics: stage latency histograms and request/decision counters"""
+    return _metrics_response()
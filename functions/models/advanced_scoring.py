@@ -1,22 +1,34 @@
-from typing import Dict, Any, List, Literal
+from typing import Dict, Any, List, Literal, Iterable, Mapping, Optional
 import datetime
+import math
+
+from models.annuity import AnnuityFactorTable, annuity_payment
+from models.application import APPLICATION_SCHEMA, ApplicationRecord, to_int
+from utils.metrics import METRICS
 
 Decision = Literal["APPROVE", "CONDITIONAL", "REJECT"]
 
+# Parts of the scoring result that cost extra work and can be left out
+OPTIONAL_OUTPUTS = ("limits", "explainability")
+
+# Terms offered by offer_matrix when the caller does not pick them
+DEFAULT_OFFER_TERMS = (3, 6, 9, 12, 18, 24, 36, 48, 60, 72, 84, 96, 120, 180, 240)
+
+# Score cap for applicants with defaulted loans or legal issues
+HARD_BLOCK_CAP = 60.0
+
+# Smallest slice worth handing to a scoring thread; below it pool overhead outweighs the work
+MIN_THREAD_ROWS = 2048
+
 def clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
 
-def annuity_payment(P: float, r: float, n: int) -> float:
-    if r <= 0 or n <= 0:
-        return P / max(n, 1)
-    a = (r * (1 + r) ** n) / ((1 + r) ** n - 1)
-    return P * a
-
 class AdvancedCreditScoringEngine:
     
     def __init__(self):
         self.annual_rate = 4.09
         self.monthly_rate = 4.09 / 100 / 12  # 0.003408
+        self.annuity = AnnuityFactorTable(self.monthly_rate)
         
         self.weights = {
             'kkb_credit_history': 25,
@@ -32,62 +44,74 @@ class AdvancedCreditScoringEngine:
         
         self.approve_threshold = 75
         self.conditional_threshold = 60
+        
+        # Limit policy: target 35% payment ratio for safe lending, never above 1.5x the request
+        self.target_payment_ratio = 0.35
+        self.max_amount_multiplier = 1.5
     
-    def score_application(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def score_application(self, data: Dict[str, Any], include: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Score one application
+        
+        include limits the OPTIONAL_OUTPUTS that are computed and returned
+        (default: all of them); score and decision never depend on them.
+        """
+        timer = METRICS.timer()
+        include = OPTIONAL_OUTPUTS if include is None else frozenset(include)
+        
+        # Typed record: raw dicts are decoded once, validated records are used as they are
+        record = data if isinstance(data, ApplicationRecord) else APPLICATION_SCHEMA.convert(data)
         
         # Extract and organize input data
-        loan_amount = float(data.get('loan_amount', 0))
-        loan_term_months = int(data.get('loan_term_months', 12))
+        loan_amount = record.loan_amount
+        loan_term_months = record.loan_term_months
         
         # Financial data
-        monthly_income = float(data.get('monthly_income', 0))
-        additional_income = float(data.get('additional_income', 0))
-        expenses = float(data.get('expenses', 0))
-        rent_payment = float(data.get('rent_payment', 0))
-        existing_loans = float(data.get('existing_loans', 0))
-        credit_card_debt = float(data.get('credit_card_debt', 0))
-        credit_card_limit = float(data.get('credit_card_limit', 0))
-        bank_balance = float(data.get('bank_balance', 0))
-        investments = float(data.get('investments', 0))
-        real_estate_value = float(data.get('real_estate_value', 0))
+        monthly_income = record.monthly_income
+        additional_income = record.additional_income
+        expenses = record.expenses
+        rent_payment = record.rent_payment
+        existing_loans = record.existing_loans
+        credit_card_debt = record.credit_card_debt
+        credit_card_limit = record.credit_card_limit
+        bank_balance = record.bank_balance
+        investments = record.investments
+        real_estate_value = record.real_estate_value
         
         # Personal data
-        age = int(data.get('age', 30))
-        employment_type = str(data.get('employment_type', '')).lower()
-        work_experience = float(data.get('work_experience', 0))
-        kkb_score = float(data.get('kkb_score', 500))
-        payment_delays = int(data.get('payment_delays', 0))
-        home_ownership = str(data.get('home_ownership', '')).lower()
-        residence_duration = float(data.get('residence_duration', 0))
+        employment_type = record.employment_type
+        work_experience = record.work_experience
+        kkb_score = record.kkb_score
+        payment_delays = record.payment_delays
+        home_ownership = record.home_ownership
+        residence_duration = record.residence_duration
         
         # Banking relationship
-        existing_relationship = float(data.get('existing_relationship', 0))
-        total_products = int(data.get('total_banking_products', 0))
-        customer_segment = str(data.get('customer_segment', 'mass')).lower()
+        existing_relationship = record.existing_relationship
+        total_products = record.total_banking_products
+        customer_segment = record.customer_segment
         
         # Risk factors
-        defaulted_loans = bool(data.get('defaulted_loans', False))
-        legal_issues = bool(data.get('legal_issues', False))
-        has_insurance = bool(data.get('has_insurance', False))
-        job_stability = str(data.get('job_stability', 'stable')).lower()
+        defaulted_loans = record.defaulted_loans
+        legal_issues = record.legal_issues
+        job_stability = record.job_stability
         
         # Calculate derived variables
         net_income = max(0, monthly_income + additional_income - expenses - rent_payment)
         
         # Calculate current debt payments
-        dti = data.get('debt_to_income_ratio')
+        dti = record.debt_to_income_ratio
         if dti is not None:
-            current_monthly_debt = float(dti) * net_income if net_income > 0 else 0.0
+            current_monthly_debt = dti * net_income if net_income > 0 else 0.0
             dti_note = "DTI girdiden alındı"
         else:
             # Heuristic calculation
             cc_min = 0.04 * credit_card_debt  # 4% minimum payment
-            loan_payment = annuity_payment(existing_loans, self.monthly_rate, 24) if existing_loans > 0 else 0.0
+            loan_payment = self.annuity.payment(existing_loans, 24) if existing_loans > 0 else 0.0
             current_monthly_debt = cc_min + loan_payment
             dti_note = "DTI hesaplandı (CC=%4, krediler=24ay)"
         
         # New loan installment
-        new_installment = annuity_payment(loan_amount, self.monthly_rate, loan_term_months)
+        new_installment = self.annuity.payment(loan_amount, loan_term_months)
         
         # New DTI ratio
         new_dti = (current_monthly_debt + new_installment) / net_income if net_income > 0 else 1.0
@@ -96,6 +120,7 @@ class AdvancedCreditScoringEngine:
         credit_util = credit_card_debt / credit_card_limit if credit_card_limit > 0 else 0.0
         liquidity_ratio = (bank_balance + 0.8 * investments) / loan_amount if loan_amount > 0 else 0.0
         collateral_factor = (real_estate_value / loan_amount) if (loan_amount > 0 and home_ownership == "owner") else 0.0
+        timer.lap('score.features')
         
         # Calculate individual scores (0-1 scale)
         scores = self._calculate_component_scores(
@@ -126,7 +151,7 @@ class AdvancedCreditScoringEngine:
         hard_block = False
         policy_reasons = []
         if defaulted_loans or legal_issues:
-            total_score = min(total_score, 60.0)
+            total_score = min(total_score, HARD_BLOCK_CAP)
             hard_block = True
             if defaulted_loans:
                 policy_reasons.append("Geçmiş temerrüt")
@@ -141,44 +166,126 @@ class AdvancedCreditScoringEngine:
         else:
             decision = "REJECT"
         
+        timer.lap('score.components')
+        
+        result = {
+            "score": round(total_score, 2),
+            "decision": decision
+        }
+        
         # Calculate limits and recommendations
-        limits = self._calculate_limits(net_income, loan_amount, loan_term_months, new_dti, decision)
+        if "limits" in include:
+            result["limits"] = self._calculate_limits(net_income, loan_amount, loan_term_months, new_dti, decision)
+            timer.lap('score.limits')
+        
+        result["assumptions"] = {
+            "monthly_interest_rate_used": self.monthly_rate,
+            "annual_rate": self.annual_rate,
+            "notes": [
+                dti_note,
+                "Annüite formülü kullanıldı",
+                f"Sabit faiz oranı: %{self.annual_rate}",
+                "Yatırımlar %80 ağırlıkla likidite hesabında"
+            ]
+        }
         
         # Generate explanations
-        explanations = self._generate_explanations(scores, contributions, penalty_points)
-        
+        if "explainability" in include:
+            result["explainability"] = self._generate_explanations(scores, contributions, penalty_points)
+            timer.lap('score.explanations')
+        timer.total('score_application')
+        
+        result["calculations"] = {
+            "net_income": round(net_income, 2),
+            "current_monthly_debt_payment": round(current_monthly_debt, 2),
+            "new_installment": round(new_installment, 2),
+            "new_dti": round(new_dti, 4),
+            "credit_utilization": round(credit_util, 4),
+            "liquidity_ratio": round(liquidity_ratio, 4),
+            "collateral_factor": round(collateral_factor, 4)
+        }
+        result["policy_flags"] = {
+            "hard_block": hard_block,
+            "reasons": policy_reasons
+        }
+        result["timestamp"] = datetime.datetime.now().isoformat()
+        result["engine_version"] = "Finiş Bankası Advanced Scoring v3.0 (Fixed 4.09%)"
+        return result
+    
+    def score_applications(self, batch, threads: Optional[int] = None) -> Dict[str, Any]:
+        """Score a batch of applications as NumPy columns
+        
+        Accepts a list of application dicts or a mapping of field -> column
+        (lists or NumPy arrays). Scores, decisions and calculations match
+        score_application row for row, returned as arrays.
+        
+        threads splits the batch into contiguous slices scored on a thread
+        pool (see utils/parallel.py); None uses every CPU on free-threaded
+        builds and the calling thread otherwise.
+        """
+        # NumPy is only needed for batch scoring, keep it off the single-request import path
+        from models.batch_scoring import to_columns, score_columns, batch_size, slice_batch, concat_results
+        from utils.parallel import map_ranges
+        
+        if not isinstance(batch, (list, tuple, Mapping)):
+            batch = list(batch)
+        parts = map_ranges(lambda start, stop: score_columns(self, to_columns(slice_batch(batch, start, stop))),
+                           batch_size(batch), threads, MIN_THREAD_ROWS)
+        result = parts[0] if len(parts) == 1 else concat_results(parts)
+        result["engine_version"] = "Finiş Bankası Advanced Scoring v3.0 (Fixed 4.09%)"
+        return result
+    
+    def offer_matrix(self, data: Dict[str, Any], terms: Iterable[int] = None,
+                     amounts: Iterable[float] = None) -> Dict[str, Any]:
+        """Installment, new DTI, score, decision and max amount for every (amount, term) pair
+        
+        The application is decoded once and the whole grid is scored in one
+        vectorized pass. Terms default to DEFAULT_OFFER_TERMS and amounts to
+        the requested loan amount; offers are listed amount by amount, each
+        with all terms in order.
+        """
+        from models.batch_scoring import score_offer_grid
+        
+        record = data if isinstance(data, ApplicationRecord) else APPLICATION_SCHEMA.convert(data)
+        # 12.0 is term 12; a fractional term is an error rather than truncated
+        terms = [to_int(term) for term in (DEFAULT_OFFER_TERMS if terms is None else terms)]
+        amounts = [record.loan_amount] if amounts is None else [float(amount) for amount in amounts]
+        
+        grid = score_offer_grid(self, record, amounts, terms)
+        calc = grid["calculations"]
+        offers = [
+            {
+                "loan_amount": amount,
+                "term_months": term,
+                "monthly_installment": installment,
+                "new_dti": new_dti,
+                "score": score,
+                "decision": decision,
+                "max_approved_amount": max_amount
+            }
+            for amount, term, installment, new_dti, score, decision, max_amount in zip(
+                (amount for amount in amounts for _ in terms), terms * len(amounts),
+                calc["new_installment"].tolist(), calc["new_dti"].tolist(), grid["score"].tolist(),
+                grid["decision"].tolist(), grid["limits"]["max_approved_amount"].tolist()
+            )
+        ]
         return {
-            "score": round(total_score, 2),
-            "decision": decision,
-            "limits": limits,
-            "assumptions": {
-                "monthly_interest_rate_used": self.monthly_rate,
-                "annual_rate": self.annual_rate,
-                "notes": [
-                    dti_note,
-                    "Annüite formülü kullanıldı",
-                    f"Sabit faiz oranı: %{self.annual_rate}",
-                    "Yatırımlar %80 ağırlıkla likidite hesabında"
-                ]
-            },
-            "explainability": explanations,
-            "calculations": {
-                "net_income": round(net_income, 2),
-                "current_monthly_debt_payment": round(current_monthly_debt, 2),
-                "new_installment": round(new_installment, 2),
-                "new_dti": round(new_dti, 4),
-                "credit_utilization": round(credit_util, 4),
-                "liquidity_ratio": round(liquidity_ratio, 4),
-                "collateral_factor": round(collateral_factor, 4)
-            },
-            "policy_flags": {
-                "hard_block": hard_block,
-                "reasons": policy_reasons
-            },
-            "timestamp": datetime.datetime.now().isoformat(),
+            "terms": terms,
+            "amounts": amounts,
+            "offers": offers,
             "engine_version": "Finiş Bankası Advanced Scoring v3.0 (Fixed 4.09%)"
         }
     
+    def counterfactuals(self, batch, target: Optional[str] = None) -> Dict[str, Any]:
+        """Smallest change to the loan amount, term, card debt or savings reaching a threshold
+        
+        target is 'CONDITIONAL' or 'APPROVE' (default: one level above each
+        application's decision); see models/counterfactual.py.
+        """
+        from models.counterfactual import solve_counterfactuals
+        
+        return solve_counterfactuals(self, batch, target)
+    
     def _calculate_component_scores(self, kkb_score: float, new_dti: float, new_installment: float,
                                   net_income: float, credit_util: float, liquidity_ratio: float,
                                   collateral_factor: float, work_experience: float, residence_duration: float,
@@ -259,26 +366,15 @@ class AdvancedCreditScoringEngine:
                          new_dti: float, decision: Decision) -> Dict[str, Any]:
         """Calculate recommended limits and terms"""
         
-        # Target 35% payment ratio for safe lending
-        target_payment_ratio = 0.35
-        
         if net_income > 0 and self.monthly_rate > 0:
-            target_installment = net_income * target_payment_ratio
-            
-            # Find maximum amount for target installment
-            max_amount = 0.0
-            step = max(loan_amount / 50.0, 1000.0)
-            test_amount = step
+            target_installment = net_income * self.target_payment_ratio
             
-            while test_amount <= loan_amount * 1.5:
-                payment = annuity_payment(test_amount, self.monthly_rate, loan_term_months)
-                if payment <= target_installment:
-                    max_amount = test_amount
-                    test_amount += step
-                else:
-                    break
+            # Largest principal whose installment fits the target (inverse annuity),
+            # capped at 1.5x the requested amount
+            max_amount = target_installment / self.annuity.payment(1.0, loan_term_months)
+            max_amount = max(0.0, min(max_amount, loan_amount * self.max_amount_multiplier))
             
-            max_approved_amount = round(max_amount, -3)  # Round to nearest 1000
+            max_approved_amount = math.floor(max_amount / 1000.0) * 1000.0  # Round down to 1000
         else:
             max_approved_amount = 0.0
         
@@ -0,0 +1,128 @@
+# Vectorized amortization schedules for many loans, written to a columnar store
+#
+#   python -m models.amortization loans.csv data/schedules --rate 0.0034083
+#
+# Loans are read in chunks (CSV or NDJSON with loan_amount and
+# loan_term_months, as for score_portfolio.py) and each chunk's schedules
+# are computed month by month across all its loans at once. Rows are
+# appended to a column store (models/column_store.py), so memory is bounded
+# by the chunk size, not the portfolio. Read the result back with
+# open_schedule_store().
+import json
+from typing import Dict, Any, Iterable, Sequence
+import numpy as np
+
+from models.annuity import annuity_factor
+from models.batch_scoring import round_like_python
+from models.column_store import ColumnStoreWriter, open_column_store
+
+STORE_VERSION = 1
+DEFAULT_CHUNK_SIZE = 10_000
+
+# (column, dtype); rows are grouped by loan, months in order
+COLUMNS = (
+    ('loan', np.int64),
+    ('month', np.int16),
+    ('payment', np.float64),
+    ('interest', np.float64),
+    ('principal', np.float64),
+    ('balance', np.float64),
+)
+
+def schedule_columns(P: Sequence[float], r: float, n: Sequence[int]) -> Dict[str, np.ndarray]:
+    """Schedules for every loan, identical to annuity.amortization_schedule row for row
+
+    The recurrence runs once per month over all loans still being repaid,
+    so the Python loop is max(n) steps long whatever the number of loans.
+    """
+    P = np.asarray(P, dtype=np.float64)
+    n = np.asarray(n, dtype=np.int64)
+    offsets = np.cumsum(n) - n
+    size = int(n.sum())
+    out = {name: np.empty(size, dtype=dtype) for name, dtype in COLUMNS}
+    out['loan'] = np.repeat(np.arange(n.size), n)
+    if not size:
+        return out
+
+    if r > 0:
+        terms, inverse = np.unique(n, return_inverse=True)
+        factors = np.array([annuity_factor(r, int(t)) for t in terms])
+        payment = round_like_python(P * factors[inverse], 2)
+    else:
+        payment = round_like_python(P / np.maximum(n, 1), 2)
+    balance = round_like_python(P, 2)
+
+    for month in range(1, int(n.max()) + 1):
+        active = np.flatnonzero(n >= month)
+        b = balance[active]
+        interest = round_like_python(b * r, 2) if r > 0 else np.zeros(active.size)
+        last = n[active] == month
+        principal = np.where(last, b, round_like_python(payment[active] - interest, 2))
+        installment = np.where(last, round_like_python(principal + interest, 2), payment[active])
+        balance[active] = round_like_python(b - principal, 2)
+
+        rows = offsets[active] + month - 1
+        out['month'][rows] = month
+        out['payment'][rows] = installment
+        out['interest'][rows] = interest
+        out['principal'][rows] = principal
+        out['balance'][rows] = balance[active]
+    return out
+
+class ScheduleStoreWriter:
+    """Appends schedule chunks to a column store"""
+
+    def __init__(self, path: str, monthly_rate: float):
+        self.monthly_rate = monthly_rate
+        self.loans = 0
+        self.store = ColumnStoreWriter(path, COLUMNS)
+
+    @property
+    def rows(self) -> int:
+        return self.store.rows
+
+    def write(self, P: Sequence[float], n: Sequence[int]):
+        columns = schedule_columns(P, self.monthly_rate, n)
+        # Loan numbers continue across chunks
+        columns['loan'] += self.loans
+        self.store.write(columns)
+        self.loans += len(n)
+
+    def close(self):
+        self.store.close(STORE_VERSION, monthly_rate=self.monthly_rate, loans=self.loans)
+
+def open_schedule_store(path: str) -> Dict[str, np.ndarray]:
+    """Memory-mapped columns of a store written by ScheduleStoreWriter"""
+    return open_column_store(path, STORE_VERSION)[1]
+
+def write_schedules(loans: Iterable[Dict[str, Any]], path: str, monthly_rate: float,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Stream loans (dicts with loan_amount and loan_term_months) into a schedule store"""
+    writer = ScheduleStoreWriter(path, monthly_rate)
+    amounts, terms = [], []
+    for loan in loans:
+        amounts.append(float(loan.get('loan_amount', 0)))
+        terms.append(int(float(loan.get('loan_term_months', 12))))
+        if len(amounts) >= chunk_size:
+            writer.write(amounts, terms)
+            amounts, terms = [], []
+    if amounts:
+        writer.write(amounts, terms)
+    writer.close()
+    return {'path': path, 'loans': writer.loans, 'rows': writer.rows}
+
+if __name__ == '__main__':
+    import argparse
+
+    from models.advanced_scoring import AdvancedCreditScoringEngine
+    from score_portfolio import read_records
+
+    parser = argparse.ArgumentParser(description="Write amortization schedules for a loan portfolio")
+    parser.add_argument('input', help="CSV (header row) or NDJSON with loan_amount and loan_term_months")
+    parser.add_argument('output', help="Schedule store directory")
+    parser.add_argument('--rate', type=float, default=None, help="Monthly rate (default: the product rate)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    rate = args.rate if args.rate is not None else AdvancedCreditScoringEngine().monthly_rate
+    print(json.dumps(write_schedules(read_records(args.input), args.output, rate, args.chunk_size)))
@@ -0,0 +1,138 @@
+# Annuity math shared by the scoring engines
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Iterator, Tuple
+
+# Term range accepted by SecurityValidator (loan_term_months 3-240)
+MIN_TERM_MONTHS = 3
+MAX_TERM_MONTHS = 240
+
+def _annuity_factor(r: float, n: int) -> float:
+    if r <= 0 or n <= 0:
+        return 1.0 / max(n, 1)
+    return (r * (1 + r) ** n) / ((1 + r) ** n - 1)
+
+@lru_cache(maxsize=4096)
+def annuity_factor(r: float, n: int) -> float:
+    """Installment per unit of principal for monthly rate r over n months (memoized)"""
+    return _annuity_factor(r, n)
+
+def annuity_payment(P: float, r: float, n: int) -> float:
+    if r <= 0 or n <= 0:
+        return P / max(n, 1)
+    return P * annuity_factor(r, n)
+
+def effective_annual_rate(r: float) -> float:
+    """Yearly rate equivalent to monthly rate r compounded: (1 + r)^12 - 1"""
+    return (1 + r) ** 12 - 1
+
+def amortization_schedule(P: float, r: float, n: int, payment: float = None) -> Iterator[Dict[str, Any]]:
+    """Month-by-month repayment rows, generated lazily
+
+    Amounts are in kuruş precision: the installment is annuity_payment
+    rounded to 2 decimals (unless given), interest is charged on the
+    remaining balance each month and the last installment absorbs the
+    rounding so the balance ends at exactly 0.
+    """
+    if payment is None:
+        payment = round(annuity_payment(P, r, n), 2)
+    balance = round(P, 2)
+    for month in range(1, n + 1):
+        interest = round(balance * r, 2) if r > 0 else 0.0
+        if month == n:
+            principal = balance
+            installment = round(principal + interest, 2)
+        else:
+            principal = round(payment - interest, 2)
+            installment = payment
+        balance = round(balance - principal, 2)
+        yield {
+            "month": month,
+            "payment": installment,
+            "interest": interest,
+            "principal": principal,
+            "balance": balance
+        }
+
+@lru_cache(maxsize=4096)
+def schedule_totals(P: float, r: float, n: int) -> Tuple[float, float]:
+    """(total payment, total interest) of amortization_schedule(P, r, n), without building its rows
+
+    Runs the same kuruş recurrence, so the totals equal the sums over the
+    streamed schedule, final-month settlement included.
+    """
+    if n <= 0:
+        return 0.0, 0.0
+    payment = round(annuity_payment(P, r, n), 2)
+    balance = round(P, 2)
+    if r > 0:
+        for _ in range(n - 1):
+            balance = round(balance - round(payment - round(balance * r, 2), 2), 2)
+        last = round(balance + round(balance * r, 2), 2)
+    else:
+        for _ in range(n - 1):
+            balance = round(balance - payment, 2)
+        last = balance
+    total = round(payment * (n - 1) + last, 2)
+    return total, round(total - round(P, 2), 2)
+
+class AnnuityFactorTable:
+    """Precomputed annuity factors for a fixed-rate product
+
+    Factors for the product rate and every term in [min_term, max_term] are
+    built once. Other rates or terms fall back to the LRU-memoized
+    annuity_factor. Table hits are a plain list index with no shared state
+    to update, so concurrent requests never wait on each other; only the
+    fallbacks are counted, under a lock.
+    """
+
+    def __init__(self, monthly_rate: float, min_term: int = MIN_TERM_MONTHS, max_term: int = MAX_TERM_MONTHS):
+        self.monthly_rate = monthly_rate
+        self.min_term = min_term
+        self.max_term = max_term
+        self.factors = [_annuity_factor(monthly_rate, n) for n in range(min_term, max_term + 1)]
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks cannot be pickled (process pools); the counter restarts at 0
+        state = self.__dict__.copy()
+        del state['lock']
+        state['misses'] = 0
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def factor(self, n: int, r: float = None) -> float:
+        """Installment per unit of principal; r defaults to the product rate"""
+        if (r is None or r == self.monthly_rate) and self.min_term <= n <= self.max_term:
+            return self.factors[n - self.min_term]
+        with self.lock:
+            self.misses += 1
+        return annuity_factor(self.monthly_rate if r is None else r, n)
+
+    def payment(self, P: float, n: int, r: float = None) -> float:
+        """Same result as annuity_payment(P, r, n), served from the table when possible"""
+        rate = self.monthly_rate if r is None else r
+        if rate <= 0 or n <= 0:
+            return P / max(n, 1)
+        return P * self.factor(n, r)
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookups that missed the table and the state of the fallback cache"""
+        with self.lock:
+            misses = self.misses
+        cache = annuity_factor.cache_info()
+        return {
+            "monthly_rate": self.monthly_rate,
+            "terms": [self.min_term, self.max_term],
+            "misses": misses,
+            "fallback_cache": {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "size": cache.currsize,
+                "max_size": cache.maxsize
+            }
+        }
@@ -0,0 +1,161 @@
+# Compiled application schema: typed decoding and range checks in one pass
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+
+# (field, kind, default, min, max); min/max apply only to values that are present
+FIELDS = (
+    ('loan_amount', 'float', 0.0, 1000, 2000000),
+    ('loan_term_months', 'int', 12, 3, 240),
+    ('monthly_income', 'float', 0.0, 0, 1000000),
+    ('additional_income', 'float', 0.0, None, None),
+    ('expenses', 'float', 0.0, None, None),
+    ('rent_payment', 'float', 0.0, None, None),
+    ('existing_loans', 'float', 0.0, None, None),
+    ('credit_card_debt', 'float', 0.0, None, None),
+    ('credit_card_limit', 'float', 0.0, None, None),
+    ('bank_balance', 'float', 0.0, None, None),
+    ('investments', 'float', 0.0, None, None),
+    ('real_estate_value', 'float', 0.0, None, None),
+    ('age', 'int', 30, 18, 80),
+    ('employment_type', 'str', '', None, None),
+    ('work_experience', 'float', 0.0, 0, 50),
+    ('kkb_score', 'float', 500.0, 300, 900),
+    ('payment_delays', 'int', 0, None, None),
+    ('home_ownership', 'str', '', None, None),
+    ('residence_duration', 'float', 0.0, None, None),
+    ('existing_relationship', 'float', 0.0, None, None),
+    ('total_banking_products', 'int', 0, None, None),
+    ('customer_segment', 'str', 'mass', None, None),
+    ('defaulted_loans', 'bool', False, None, None),
+    ('legal_issues', 'bool', False, None, None),
+    ('has_insurance', 'bool', False, None, None),
+    ('job_stability', 'str', 'stable', None, None),
+    ('debt_to_income_ratio', 'float', None, 0, 5),
+)
+
+FIELD_NAMES = tuple(spec[0] for spec in FIELDS)
+MAX_STRING_LENGTH = 100  # Prevent overly long strings
+
+def normalize_category(value: Any) -> str:
+    # Categorical fields are compared in lower case by the engines
+    return str(value).strip()[:MAX_STRING_LENGTH].lower()
+
+def to_int(value: Any) -> int:
+    # JSON clients send 12.0 or "12.0" for whole numbers; 12.5 is an error, not 12
+    if isinstance(value, int):
+        return int(value)
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"{value!r} is not a whole number")
+    return int(number)
+
+CONVERTERS = {'float': float, 'int': to_int, 'bool': bool, 'str': normalize_category}
+
+class ApplicationValidationError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+class ApplicationRecord:
+    """Typed application: one attribute per schema field, defaults for missing ones
+
+    source is the mapping the record was decoded from, for consumers that
+    need the request values as sent.
+    """
+
+    __slots__ = FIELD_NAMES + ('provided', 'source')
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """dict.get-style access for code written against raw request dicts"""
+        return getattr(self, field) if field in self.provided else default
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.provided
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields present in the request, decoded"""
+        return {field: getattr(self, field) for field in FIELD_NAMES if field in self.provided}
+
+    def __repr__(self) -> str:
+        return f"ApplicationRecord({self.to_dict()})"
+
+class ApplicationSchema:
+    """Field table compiled into a flat list of converters and bounds"""
+
+    def __init__(self, fields=FIELDS, required: Tuple[str, ...] = ()):
+        self.required = tuple(required)
+        self.compiled = [(field, CONVERTERS[kind], default, lo, hi) for field, kind, default, lo, hi in fields]
+        self.ranges = {field: (lo, hi) for field, _, _, lo, hi in fields if lo is not None}
+
+    def _decode(self, data: Mapping[str, Any], errors: Optional[List[str]]) -> ApplicationRecord:
+        record = ApplicationRecord()
+        provided = set()
+        for field, convert, default, lo, hi in self.compiled:
+            value = data.get(field)
+            if value is None:
+                setattr(record, field, default)
+                continue
+            if errors is None:
+                # Unchecked: conversion errors propagate, as with float()/int() on the raw dict
+                setattr(record, field, convert(value))
+                provided.add(field)
+                continue
+            try:
+                value = convert(value)
+            except (ValueError, TypeError, OverflowError):
+                errors.append(f'{field} must be a valid number')
+                setattr(record, field, default)
+                continue
+            if lo is not None and not lo <= value <= hi:
+                errors.append(f'{field} must be between {lo} and {hi}')
+            setattr(record, field, value)
+            provided.add(field)
+        record.provided = frozenset(provided)
+        record.source = data
+        return record
+
+    def convert(self, data: Mapping[str, Any]) -> ApplicationRecord:
+        """Typed record without range checks (engine input from trusted callers)"""
+        return self._decode(data, None)
+
+    def validate(self, data: Any) -> Tuple[Optional[ApplicationRecord], List[str]]:
+        """Decode and check in one pass; returns (record, errors), record is None on errors"""
+        if not isinstance(data, Mapping):
+            return None, ['Request body must be a JSON object']
+        errors = [f'Missing required field: {field}' for field in self.required if field not in data]
+        if errors:
+            return None, errors
+        record = self._decode(data, errors)
+        return (None if errors else record), errors
+
+    def decode(self, data: Any) -> ApplicationRecord:
+        """Like validate, raising ApplicationValidationError on any error"""
+        record, errors = self.validate(data)
+        if errors:
+            raise ApplicationValidationError(errors)
+        return record
+
+    def validate_columns(self, columns: Mapping[str, Any]) -> Dict[str, Any]:
+        """Range-check a whole batch of field -> column values at once
+
+        Pass the columns as received, before defaults are filled in, since
+        defaults (e.g. loan_amount 0) are not range-checked on the record
+        path either. Returns a per-row 'valid' mask and, for each failing
+        field, the indices of offending rows. NaN (missing) values pass.
+        """
+        import numpy as np
+
+        size = len(next(iter(columns.values()))) if columns else 0
+        valid = np.ones(size, dtype=bool)
+        errors = {}
+        for field, (lo, hi) in self.ranges.items():
+            if field not in columns:
+                continue
+            values = np.asarray(columns[field], dtype=np.float64)
+            bad = ~((values >= lo) & (values <= hi)) & ~np.isnan(values)
+            if bad.any():
+                errors[field] = np.flatnonzero(bad)
+                valid &= ~bad
+        return {'valid': valid, 'errors': errors}
+
+# Engine schema: every field optional, ranges checked when present
+APPLICATION_SCHEMA = ApplicationSchema()
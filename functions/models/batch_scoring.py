@@ -0,0 +1,326 @@
+# Columnar (NumPy) implementation of the advanced scoring engine
+from typing import Dict, Any, Mapping, Sequence, Union
+import numpy as np
+
+from models.advanced_scoring import HARD_BLOCK_CAP
+from models.annuity import AnnuityFactorTable
+from models.application import ApplicationRecord, normalize_category
+
+Batch = Union[Sequence[Dict[str, Any]], Mapping[str, Sequence[Any]]]
+
+# Fields consumed by the batch scorer: (field, default, kind)
+# Defaults and conversions mirror the data.get(...) calls in score_application
+FIELDS = (
+    ('loan_amount', 0, 'float'),
+    ('loan_term_months', 12, 'int'),
+    ('monthly_income', 0, 'float'),
+    ('additional_income', 0, 'float'),
+    ('expenses', 0, 'float'),
+    ('rent_payment', 0, 'float'),
+    ('existing_loans', 0, 'float'),
+    ('credit_card_debt', 0, 'float'),
+    ('credit_card_limit', 0, 'float'),
+    ('bank_balance', 0, 'float'),
+    ('investments', 0, 'float'),
+    ('real_estate_value', 0, 'float'),
+    ('employment_type', '', 'str'),
+    ('work_experience', 0, 'float'),
+    ('kkb_score', 500, 'float'),
+    ('payment_delays', 0, 'int'),
+    ('home_ownership', '', 'str'),
+    ('residence_duration', 0, 'float'),
+    ('existing_relationship', 0, 'float'),
+    ('total_banking_products', 0, 'int'),
+    ('customer_segment', 'mass', 'str'),
+    ('defaulted_loans', False, 'bool'),
+    ('legal_issues', False, 'bool'),
+    ('job_stability', 'stable', 'str'),
+    ('debt_to_income_ratio', None, 'optional_float'),
+)
+
+def _fill_missing(values: Any, default: Any) -> Any:
+    """None means missing, as in ApplicationSchema: replace it with the field default"""
+    return [default if v is None else v for v in values]
+
+def _normalize_categories(values: Sequence[Any]) -> np.ndarray:
+    # Categorical columns hold a handful of distinct strings: normalize each once
+    if set(map(type, values)) <= {str}:
+        normalized = {value: normalize_category(value) for value in set(values)}
+        return np.array([normalized[value] for value in values], dtype=str)
+    return np.array([normalize_category(v) for v in values], dtype=str)
+
+def _whole_numbers(array: np.ndarray) -> np.ndarray:
+    """int64 copy of a float column; like to_int, anything but whole numbers raises ValueError"""
+    bad = ~np.isfinite(array) | (array != np.floor(array))
+    if bad.any():
+        raise ValueError(f"{float(array[np.argmax(bad)])!r} is not a whole number")
+    return array.astype(np.int64)
+
+def _convert(values: Any, kind: str, default: Any = None) -> np.ndarray:
+    """Convert one raw column to a typed array, with default in place of None"""
+    if isinstance(values, np.ndarray):
+        if values.dtype != object:
+            if kind == 'bool' and values.dtype.kind in 'biuf':
+                return values.astype(bool)
+            if kind in ('float', 'optional_float'):
+                return values.astype(np.float64)
+            if kind == 'int':
+                if values.dtype.kind in 'biu':
+                    return values.astype(np.int64)
+                return _whole_numbers(values.astype(np.float64))
+        values = values.tolist()
+    if kind in ('float', 'int'):
+        # None becomes NaN here; only columns with NaN need the slower look for None
+        array = np.asarray(values, dtype=np.float64)
+        if np.isnan(array).any() and None in values:
+            array = np.asarray(_fill_missing(values, default), dtype=np.float64)
+        return _whole_numbers(array) if kind == 'int' else array
+    if kind == 'bool':
+        # Every flag defaults to False, which is also bool(None)
+        return np.fromiter(map(bool, values), dtype=bool, count=len(values))
+    if kind == 'str':
+        if None in values:
+            values = _fill_missing(values, default)
+        return _normalize_categories(values)
+    # Optional floats: missing values (None) become NaN
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+def to_columns(batch: Batch) -> Dict[str, np.ndarray]:
+    """Turn a list of application dicts or a mapping of columns into typed arrays
+
+    Missing fields and None values get the field default, as on the
+    single-application path.
+    """
+    if isinstance(batch, Mapping):
+        size = None
+        for field, column in batch.items():
+            if size is None:
+                size = len(column)
+            elif len(column) != size:
+                raise ValueError(f"Column '{field}' has {len(column)} rows, expected {size}")
+        size = size or 0
+
+        columns = {}
+        for field, default, kind in FIELDS:
+            if field in batch:
+                columns[field] = _convert(batch[field], kind, default)
+            else:
+                columns[field] = np.full(size, _convert([default], kind, default)[0])
+        return columns
+
+    rows = batch if isinstance(batch, list) else list(batch)
+    return {
+        field: _convert([row.get(field) for row in rows], kind, default)
+        for field, default, kind in FIELDS
+    }
+
+def batch_size(batch: Batch) -> int:
+    """Rows in a list of application dicts or a mapping of columns"""
+    if isinstance(batch, Mapping):
+        return len(next(iter(batch.values()), ()))
+    return len(batch)
+
+def slice_batch(batch: Batch, start: int, stop: int) -> Batch:
+    """Rows start:stop of a batch, in the same form"""
+    if isinstance(batch, Mapping):
+        return {field: column[start:stop] for field, column in batch.items()}
+    return batch[start:stop]
+
+# None lets NumPy size string columns to the value (dtype=str would mean one character)
+COLUMN_DTYPES = {'float': np.float64, 'int': np.int64, 'bool': bool, 'str': None, 'optional_float': np.float64}
+
+def record_columns(record: ApplicationRecord, size: int) -> Dict[str, np.ndarray]:
+    """Columns repeating one decoded application size times (no per-row conversion)"""
+    columns = {}
+    for field, _, kind in FIELDS:
+        value = getattr(record, field)
+        if value is None:
+            value = np.nan
+        columns[field] = np.full(size, value, dtype=COLUMN_DTYPES[kind])
+    return columns
+
+def score_offer_grid(engine: Any, record: ApplicationRecord, amounts: Sequence[float],
+                     terms: Sequence[int]) -> Dict[str, Any]:
+    """Score one application at every (amount, term) pair; rows are amount-major"""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    terms = np.asarray(terms, dtype=np.int64)
+    columns = record_columns(record, amounts.size * terms.size)
+    columns['loan_amount'] = np.repeat(amounts, terms.size)
+    columns['loan_term_months'] = np.tile(terms, amounts.size)
+    return score_columns(engine, columns)
+
+def round_like_python(values: np.ndarray, digits: int) -> np.ndarray:
+    """np.round that agrees with Python's round() on every element
+    
+    np.round scales by 10**digits first, which can land exactly on .5 for a
+    value that is just below or above it (35.415 is 35.41499...); those few
+    elements are rounded again with round().
+    """
+    rounded = np.round(values, digits)
+    scaled = values * 10.0 ** digits
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if ties.size:
+        rounded[ties] = [round(value, digits) for value in values[ties].tolist()]
+    return rounded
+
+def annuity_factors(table: AnnuityFactorTable, n: np.ndarray) -> np.ndarray:
+    """Installment per unit of principal for each term, one table lookup per distinct term"""
+    terms, inverse = np.unique(n, return_inverse=True)
+    # Factors come from the engine's table so results match the scalar path bit for bit
+    factors = np.array([table.payment(1.0, int(t)) for t in terms])
+    return factors[inverse.reshape(n.shape)]
+
+def annuity_installments(table: AnnuityFactorTable, P: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Vectorized AnnuityFactorTable.payment(P, n)"""
+    if table.monthly_rate <= 0:
+        return P / np.maximum(n, 1)
+    return P * annuity_factors(table, n)
+
+def calculate_limits(engine: Any, net_income: np.ndarray, loan_amount: np.ndarray,
+                     loan_term_months: np.ndarray, new_dti: np.ndarray, decision: np.ndarray) -> Dict[str, np.ndarray]:
+    """Vectorized _calculate_limits: closed-form maximum amount and recommended term"""
+    if engine.monthly_rate > 0:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            target_installment = net_income * engine.target_payment_ratio
+            max_amount = target_installment / annuity_factors(engine.annuity, loan_term_months)
+        max_amount = np.maximum(0.0, np.minimum(max_amount, loan_amount * engine.max_amount_multiplier))
+        max_approved_amount = np.where(net_income > 0, np.floor(max_amount / 1000.0) * 1000.0, 0.0)
+    else:
+        max_approved_amount = np.zeros(loan_amount.shape)
+
+    # Extend the term to reduce DTI for conditional approvals
+    recommended_term = np.where((decision == "CONDITIONAL") & (new_dti > 0.45),
+                                np.minimum(loan_term_months + 12, 84), loan_term_months)
+
+    return {
+        "max_approved_amount": max_approved_amount,
+        "recommended_term_months": recommended_term
+    }
+
+def score_columns(engine: Any, cols: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Score typed columns with the weights and thresholds of an AdvancedCreditScoringEngine"""
+    annuity = engine.annuity
+
+    loan_amount = cols['loan_amount']
+    credit_card_debt = cols['credit_card_debt']
+    defaulted_loans = cols['defaulted_loans']
+    legal_issues = cols['legal_issues']
+    dti_input = cols['debt_to_income_ratio']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        net_income = np.maximum(0.0, cols['monthly_income'] + cols['additional_income']
+                                - cols['expenses'] - cols['rent_payment'])
+        has_income = net_income > 0
+
+        # Current debt payments: DTI from input when given, heuristic otherwise
+        existing_loans = cols['existing_loans']
+        heuristic_debt = 0.04 * credit_card_debt + np.where(
+            existing_loans > 0,
+            annuity_installments(annuity, existing_loans, np.full(existing_loans.shape, 24)),
+            0.0
+        )
+        current_monthly_debt = np.where(
+            np.isnan(dti_input),
+            heuristic_debt,
+            np.where(has_income, dti_input * net_income, 0.0)
+        )
+
+        new_installment = annuity_installments(annuity, loan_amount, cols['loan_term_months'])
+        new_dti = np.where(has_income, (current_monthly_debt + new_installment) / net_income, 1.0)
+
+        # Other ratios
+        has_loan = loan_amount > 0
+        credit_limit = cols['credit_card_limit']
+        credit_util = np.where(credit_limit > 0, credit_card_debt / credit_limit, 0.0)
+        liquidity_ratio = np.where(has_loan, (cols['bank_balance'] + 0.8 * cols['investments']) / loan_amount, 0.0)
+        collateral_factor = np.where(has_loan & (cols['home_ownership'] == "owner"),
+                                     cols['real_estate_value'] / loan_amount, 0.0)
+        payment_ratio = np.where(has_income, new_installment / net_income, 1.0)
+
+    # Component scores (0-1 scale), same formulas as _calculate_component_scores
+    components = {
+        'kkb_credit_history': np.clip((cols['kkb_score'] - 300.0) / 600.0, 0.0, 1.0),
+        'dti_ratio': np.where(new_dti <= 0.2, 1.0,
+                              np.where(new_dti >= 0.6, 0.0, 1.0 - (new_dti - 0.2) / (0.6 - 0.2))),
+        'income_adequacy': np.where(payment_ratio <= 0.3, 1.0,
+                                    np.where(payment_ratio >= 0.7, 0.0, 1.0 - (payment_ratio - 0.3) / (0.7 - 0.3))),
+        'credit_utilization': 1.0 - np.clip(credit_util, 0.0, 1.0),
+        'liquidity': np.clip(liquidity_ratio / 2.0, 0.0, 1.0),
+        'collateral_assets': np.clip(collateral_factor / 3.0, 0.0, 1.0),
+        'stability': np.clip(
+            np.where(cols['job_stability'] == "stable", 0.6, 0.0)
+            + np.clip(cols['work_experience'] / 10.0, 0.0, 0.3)
+            + np.clip(cols['residence_duration'] / 120.0, 0.0, 0.1)
+            + np.where(np.isin(cols['employment_type'], ("kamu", "public")), 0.2, 0.0),
+            0.0, 1.0
+        ),
+        'banking_relationship': np.clip(
+            np.clip(cols['existing_relationship'] / 60.0, 0.0, 0.6)
+            + np.clip(cols['total_banking_products'] / 6.0, 0.0, 0.3)
+            + np.where(cols['customer_segment'] == "private", 0.1, 0.0),
+            0.0, 1.0
+        ),
+    }
+
+    # Weighted sum, accumulated in the same component order as the scalar path
+    components = {component: np.clip(values, 0.0, 1.0) for component, values in components.items()}
+    total_score = np.zeros(loan_amount.shape)
+    for component, weight in engine.weights.items():
+        if component == 'max_penalty':
+            continue
+        total_score = total_score + components[component] * weight
+
+    # Penalties (same as _calculate_penalties)
+    penalty = np.clip(
+        np.where(defaulted_loans, 0.35, 0.0) + np.where(legal_issues, 0.35, 0.0)
+        + np.clip(cols['payment_delays'] / 6.0, 0.0, 0.2),
+        0.0, 1.0
+    )
+    penalty_points = penalty * engine.weights['max_penalty']
+    total_score = np.clip(total_score - penalty_points, 0.0, 100.0)
+
+    # Policy caps for high-risk cases
+    hard_block = defaulted_loans | legal_issues
+    total_score = np.where(hard_block, np.minimum(total_score, HARD_BLOCK_CAP), total_score)
+
+    decision = np.where(total_score >= engine.approve_threshold, "APPROVE",
+                        np.where(total_score >= engine.conditional_threshold, "CONDITIONAL", "REJECT"))
+
+    limits = calculate_limits(engine, net_income, loan_amount, cols['loan_term_months'], new_dti, decision)
+
+    return {
+        "size": int(total_score.shape[0]),
+        "score": round_like_python(total_score, 2),
+        # Unrounded, as compared with the thresholds
+        "raw_score": total_score,
+        "decision": decision,
+        "limits": limits,
+        "calculations": {
+            "net_income": round_like_python(net_income, 2),
+            "current_monthly_debt_payment": round_like_python(current_monthly_debt, 2),
+            "new_installment": round_like_python(new_installment, 2),
+            "new_dti": round_like_python(new_dti, 4),
+            "credit_utilization": round_like_python(credit_util, 4),
+            "liquidity_ratio": round_like_python(liquidity_ratio, 4),
+            "collateral_factor": round_like_python(collateral_factor, 4)
+        },
+        # Clamped 0-1 inputs of the weighted sum, enough to rescore with other weights
+        "components": components,
+        "penalty": penalty,
+        "penalty_points": penalty_points,
+        "hard_block": hard_block
+    }
+
+def concat_results(parts: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Join score_columns results of consecutive slices into one result"""
+    joined = {}
+    for key, value in parts[0].items():
+        if isinstance(value, dict):
+            joined[key] = concat_results([part[key] for part in parts])
+        elif isinstance(value, np.ndarray):
+            joined[key] = np.concatenate([part[key] for part in parts])
+        elif key == "size":
+            joined[key] = sum(part[key] for part in parts)
+        else:
+            joined[key] = value
+    return joined
@@ -0,0 +1,208 @@
+# Approve/conditional threshold calibration on labelled historical applications
+#
+#   python -m models.calibration history.csv --label bad --max-bad-rate 0.04 --grid grid.csv
+#
+# The history is scored once in batch. Scores are then sorted with prefix
+# sums of counts, bads and exposures, so the rows at or above any threshold
+# are one searchsorted away and every (conditional, approve) pair on the
+# grid is evaluated in a single vectorized pass, whatever the row count.
+import csv
+import json
+import time
+from itertools import islice
+from typing import Dict, Any, Iterable, Optional, Sequence, Tuple
+import numpy as np
+
+from models.batch_scoring import to_columns, score_columns
+
+# Share of the exposure lost when a loan defaults (Basel foundation IRB, senior unsecured)
+DEFAULT_LGD = 0.45
+DEFAULT_STEP = 1.0
+DEFAULT_CHUNK_SIZE = 100_000
+TRUE_VALUES = ('1', 'true', 'yes', 'evet')
+
+METRICS_FIELDS = ('conditional_threshold', 'approve_threshold', 'approval_rate', 'conditional_rate',
+                  'booked_rate', 'bad_rate_approved', 'bad_rate_booked', 'expected_loss', 'loss_rate')
+
+def is_bad(value: Any) -> bool:
+    """Outcome label: true for defaults; CSV text such as '1', '0' or 'evet' is parsed"""
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        try:
+            return float(value) != 0
+        except ValueError:
+            return False
+    return bool(value)
+
+def threshold_grid(step: float = DEFAULT_STEP, lo: float = 0.0, hi: float = 100.0) -> np.ndarray:
+    # Rounded so 0.1 steps give 60.0, not 60.00000000000001
+    return np.round(np.arange(lo, hi + step / 2, step), 6)
+
+class ThresholdCalibration:
+    """Outcome statistics of every threshold pair from one sorted pass over the scores
+
+    Applications at or above the approve threshold are approved, those
+    between the conditional and approve thresholds are approved on
+    conditions and booked with conditional_weight (1 = all of them).
+    Expected loss is lgd x exposure summed over booked applications that
+    went bad.
+    """
+
+    def __init__(self, scores: Sequence[float], bad: Sequence[bool], exposure: Sequence[float],
+                 lgd: float = DEFAULT_LGD, conditional_weight: float = 1.0):
+        scores = np.asarray(scores, dtype=np.float64)
+        order = np.argsort(scores, kind='stable')
+        self.scores = scores[order]
+        bad = np.asarray(bad, dtype=bool)[order]
+        exposure = np.asarray(exposure, dtype=np.float64)[order]
+        self.size = self.scores.size
+        self.lgd = lgd
+        self.conditional_weight = conditional_weight
+
+        # prefix[k][i] sums the i lowest scores; rows at or above index i sum to prefix[k][-1] - prefix[k][i]
+        self.prefix = {
+            name: np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+            for name, values in (('count', np.ones(self.size)), ('bad', bad), ('exposure', exposure),
+                                 ('bad_exposure', np.where(bad, exposure, 0.0)))
+        }
+
+    def _at_or_above(self, thresholds: np.ndarray) -> Dict[str, np.ndarray]:
+        # 'left' keeps rows equal to the threshold, as in score >= threshold
+        index = np.searchsorted(self.scores, thresholds, side='left')
+        return {name: prefix[-1] - prefix[index] for name, prefix in self.prefix.items()}
+
+    def evaluate(self, approve_threshold, conditional_threshold) -> Dict[str, np.ndarray]:
+        """Metrics for threshold pairs (scalars or arrays broadcast together)"""
+        approve_threshold = np.asarray(approve_threshold, dtype=np.float64)
+        # A conditional threshold above the approve threshold leaves no conditional band
+        conditional_threshold = np.minimum(np.asarray(conditional_threshold, dtype=np.float64), approve_threshold)
+        approved = self._at_or_above(approve_threshold)
+        above_conditional = self._at_or_above(conditional_threshold)
+        w = self.conditional_weight
+        booked = {name: approved[name] + w * (above_conditional[name] - approved[name]) for name in approved}
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'conditional_threshold': conditional_threshold,
+                'approve_threshold': approve_threshold,
+                'approval_rate': approved['count'] / self.size,
+                'conditional_rate': (above_conditional['count'] - approved['count']) / self.size,
+                'booked_rate': booked['count'] / self.size,
+                'bad_rate_approved': np.where(approved['count'] > 0, approved['bad'] / approved['count'], 0.0),
+                'bad_rate_booked': np.where(booked['count'] > 0, booked['bad'] / booked['count'], 0.0),
+                'expected_loss': self.lgd * booked['bad_exposure'],
+                'loss_rate': np.where(booked['exposure'] > 0,
+                                      self.lgd * booked['bad_exposure'] / booked['exposure'], 0.0)
+            }
+
+    def grid(self, thresholds: Sequence[float]) -> Dict[str, np.ndarray]:
+        """Metrics for every pair conditional <= approve drawn from thresholds"""
+        thresholds = np.unique(np.asarray(thresholds, dtype=np.float64))
+        conditional, approve = np.triu_indices(thresholds.size)
+        return self.evaluate(thresholds[approve], thresholds[conditional])
+
+    def recommend(self, thresholds: Sequence[float], max_bad_rate: float,
+                  min_approval_rate: float = 0.0) -> Optional[Dict[str, float]]:
+        """The pair booking the most applications within the bad rate limit (lowest loss on ties)"""
+        grid = self.grid(thresholds)
+        eligible = np.flatnonzero((grid['bad_rate_booked'] <= max_bad_rate)
+                                  & (grid['approval_rate'] >= min_approval_rate))
+        if not eligible.size:
+            return None
+        # lexsort sorts by its last key first
+        best = eligible[np.lexsort((grid['expected_loss'][eligible], -grid['booked_rate'][eligible]))[0]]
+        return _row(grid, best)
+
+def _row(metrics: Dict[str, np.ndarray], index: int = None) -> Dict[str, float]:
+    row = {}
+    for field in METRICS_FIELDS:
+        value = metrics[field] if index is None else metrics[field][index]
+        row[field] = round(float(value), 2 if field == 'expected_loss' else 6)
+    return row
+
+def score_history(records: Iterable[Dict[str, Any]], engine: Any, label: str = 'bad',
+                  exposure_field: str = 'loan_amount',
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Unrounded scores, bad flags and exposures of labelled applications, scored in chunks"""
+    scores, bads, exposures = [], [], []
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        columns = to_columns(chunk)
+        scores.append(score_columns(engine, columns)['raw_score'])
+        bads.append(np.fromiter((is_bad(record.get(label)) for record in chunk), dtype=bool, count=len(chunk)))
+        exposures.append(columns[exposure_field] if exposure_field in columns
+                         else np.array([float(record.get(exposure_field, 0)) for record in chunk]))
+    if not scores:
+        raise ValueError("No labelled applications")
+    return np.concatenate(scores), np.concatenate(bads), np.concatenate(exposures)
+
+def calibrate(records: Iterable[Dict[str, Any]], engine: Any = None, label: str = 'bad',
+              step: float = DEFAULT_STEP, max_bad_rate: float = 0.05, min_approval_rate: float = 0.0,
+              lgd: float = DEFAULT_LGD, conditional_weight: float = 1.0) -> Dict[str, Any]:
+    """Score the history once, then compare the engine's thresholds with the recommended pair
+    
+    The ThresholdCalibration is returned under 'calibration' for further
+    queries without rescoring.
+    """
+    if engine is None:
+        from models.advanced_scoring import AdvancedCreditScoringEngine
+        engine = AdvancedCreditScoringEngine()
+
+    started = time.perf_counter()
+    scores, bad, exposure = score_history(records, engine, label)
+    scored = time.perf_counter()
+    calibration = ThresholdCalibration(scores, bad, exposure, lgd, conditional_weight)
+    thresholds = threshold_grid(step)
+    current = _row(calibration.evaluate(engine.approve_threshold, engine.conditional_threshold))
+    recommended = calibration.recommend(thresholds, max_bad_rate, min_approval_rate)
+    done = time.perf_counter()
+
+    return {
+        'rows': calibration.size,
+        'bad_rate': round(float(bad.mean()), 6),
+        'lgd': lgd,
+        'pairs_evaluated': thresholds.size * (thresholds.size + 1) // 2,
+        'constraints': {'max_bad_rate': max_bad_rate, 'min_approval_rate': min_approval_rate},
+        'current': current,
+        'recommended': recommended,
+        'seconds': {'scoring': round(scored - started, 3), 'calibration': round(done - scored, 3)},
+        'calibration': calibration
+    }
+
+def write_grid(calibration: ThresholdCalibration, thresholds: Sequence[float], path: str):
+    """Every evaluated pair as CSV, one row per (conditional, approve) pair"""
+    grid = calibration.grid(thresholds)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(METRICS_FIELDS)
+        writer.writerows(zip(*(grid[field].tolist() for field in METRICS_FIELDS)))
+
+if __name__ == '__main__':
+    import argparse
+
+    from score_portfolio import read_records
+
+    parser = argparse.ArgumentParser(description="Calibrate approve/conditional thresholds on labelled history")
+    parser.add_argument('input', help="Labelled applications as CSV (header row) or NDJSON")
+    parser.add_argument('--label', default='bad', help="Outcome field, true for defaulted loans")
+    parser.add_argument('--step', type=float, default=DEFAULT_STEP, help="Threshold grid step in score points")
+    parser.add_argument('--max-bad-rate', type=float, default=0.05)
+    parser.add_argument('--min-approval-rate', type=float, default=0.0)
+    parser.add_argument('--lgd', type=float, default=DEFAULT_LGD)
+    parser.add_argument('--conditional-weight', type=float, default=1.0,
+                        help="Share of conditional approvals that are booked")
+    parser.add_argument('--grid', help="Also write every evaluated pair to this CSV")
+    args = parser.parse_args()
+
+    report = calibrate(read_records(args.input), label=args.label, step=args.step,
+                       max_bad_rate=args.max_bad_rate, min_approval_rate=args.min_approval_rate,
+                       lgd=args.lgd, conditional_weight=args.conditional_weight)
+    calibration = report.pop('calibration')
+    if args.grid:
+        write_grid(calibration, threshold_grid(args.step), args.grid)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
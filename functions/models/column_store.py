@@ -0,0 +1,88 @@
+# Append-only columnar files: one .npy file per column plus a manifest
+#
+# Chunks are appended to every column as they are produced, so writers
+# need memory for one chunk only. Each .npy file starts with a fixed-size
+# header that is rewritten with the final row count on close; readers get
+# memory-mapped arrays back from open_column_store().
+import json
+import os
+import struct
+from typing import Dict, Any, Mapping, Sequence, Tuple
+import numpy as np
+
+MANIFEST = 'manifest.json'
+
+# Fixed-size .npy header, rewritten with the final row count on close
+NPY_HEADER_BYTES = 128
+
+def _npy_header(dtype: Any, rows: int) -> bytes:
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (np.dtype(dtype).str, rows)
+    # magic (6) + version (2) + header length (2) + header text padded with spaces + newline
+    text = header.ljust(NPY_HEADER_BYTES - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(text)) + text.encode('latin1')
+
+class ColumnStoreWriter:
+    """Appends chunks of equal-length columns to one .npy file each
+
+    resume_rows reopens an existing store and drops everything after that
+    many rows, for runs continuing from a checkpoint.
+    """
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, Any]], resume_rows: int = None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self.rows = resume_rows or 0
+        self.files = {}
+        for name, dtype in self.columns:
+            file_path = os.path.join(path, f'{name}.npy')
+            if resume_rows:
+                if not os.path.exists(file_path):
+                    raise ValueError(f"Cannot resume {path}: {name}.npy is missing")
+                f = open(file_path, 'r+b')
+                f.seek(NPY_HEADER_BYTES + self.rows * dtype.itemsize)
+                f.truncate()
+            else:
+                f = open(file_path, 'wb')
+                f.write(_npy_header(dtype, 0))
+            self.files[name] = f
+
+    def write(self, arrays: Mapping[str, np.ndarray]):
+        size = None
+        for name, dtype in self.columns:
+            values = np.asarray(arrays[name], dtype=dtype)
+            if size is None:
+                size = values.size
+            elif values.size != size:
+                raise ValueError(f"Column '{name}' has {values.size} rows, expected {size}")
+            self.files[name].write(values.tobytes())
+        self.rows += size or 0
+
+    def flush(self):
+        """Make appended rows durable before they are checkpointed"""
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self, version: int, **manifest: Any):
+        for name, dtype in self.columns:
+            f = self.files[name]
+            f.seek(0)
+            f.write(_npy_header(dtype, self.rows))
+            f.close()
+        with open(os.path.join(self.path, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': version,
+                'rows': self.rows,
+                'columns': [name for name, _ in self.columns],
+                **manifest
+            }, f, indent=2)
+
+def open_column_store(path: str, version: int) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Manifest and memory-mapped columns of a store written with the given version"""
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != version:
+        raise ValueError(f"Unsupported column store at {path}")
+    columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in manifest['columns']}
+    return manifest, columns
@@ -0,0 +1,302 @@
+# Counterfactual targets: the smallest change to one input that lifts an
+# application over the conditional or approve threshold
+#
+# Every advanced-engine component is piecewise linear in the ratio it reads
+# (DTI band 0.2-0.6, payment ratio band 0.3-0.7, utilization, liquidity / 2,
+# collateral / 3), and the score only rises as the loan amount falls, the
+# term grows, card debt is paid down or savings grow. For each lever the
+# points where a component enters or leaves its band are found in closed
+# form, the score is evaluated at those few points in one vectorized pass,
+# and the threshold is solved exactly inside the segment that crosses it:
+# a linear equation, or for the loan amount (liquidity and collateral go
+# with 1 / amount) a quadratic. No search, whatever the batch size.
+from typing import Dict, Any, Sequence
+import numpy as np
+
+from models.advanced_scoring import HARD_BLOCK_CAP
+from models.annuity import MAX_TERM_MONTHS
+from models.application import APPLICATION_SCHEMA
+from models.batch_scoring import Batch, to_columns, score_columns, annuity_installments, record_columns
+
+LEVERS = ('loan_amount', 'loan_term_months', 'credit_card_debt', 'bank_balance')
+TARGETS = ('CONDITIONAL', 'APPROVE')
+# Suggested amounts are rounded to whole 100 TL, in the applicant's favour
+MONEY_STEP = 100.0
+MIN_LOAN_AMOUNT = APPLICATION_SCHEMA.ranges['loan_amount'][0]
+
+def _pre_cap_scores(engine: Any, cols: Dict[str, np.ndarray], field: str, values: np.ndarray) -> np.ndarray:
+    """Weighted sum minus penalty (before the 0-100 clamp and the cap) with field set to each column of values"""
+    rows, points = values.shape
+    repeated = {name: np.repeat(column, points) for name, column in cols.items()}
+    repeated[field] = values.ravel().astype(cols[field].dtype)
+    result = score_columns(engine, repeated)
+    total = np.zeros(rows * points)
+    for component, weight in engine.weights.items():
+        if component != 'max_penalty':
+            total = total + result['components'][component] * weight
+    return (total - result['penalty_points']).reshape(rows, points)
+
+def _crossing(pre: np.ndarray, threshold: np.ndarray):
+    """First candidate meeting the threshold per row, and whether there is one"""
+    meets = pre >= threshold[:, None]
+    return np.argmax(meets, axis=1), meets.any(axis=1)
+
+def _interpolate(x0, x1, p0, p1, threshold):
+    """x where the line through (x0, p0) and (x1, p1) reaches threshold"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = x0 + (threshold - p0) * (x1 - x0) / (p1 - p0)
+    return np.where(p1 != p0, x, x1)
+
+def _debt_inputs(engine: Any, cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Unrounded net income, installment and debt payments, as in score_columns"""
+    net_income = np.maximum(0.0, cols['monthly_income'] + cols['additional_income']
+                            - cols['expenses'] - cols['rent_payment'])
+    existing = cols['existing_loans']
+    loan_payment = np.where(existing > 0, annuity_installments(engine.annuity, existing, np.full(existing.shape, 24)),
+                            0.0)
+    dti_input = cols['debt_to_income_ratio']
+    current_debt = np.where(np.isnan(dti_input), 0.04 * cols['credit_card_debt'] + loan_payment,
+                            np.where(net_income > 0, dti_input * net_income, 0.0))
+    return {
+        'net_income': net_income,
+        'loan_payment': loan_payment,
+        'current_debt': current_debt,
+        'installment': annuity_installments(engine.annuity, cols['loan_amount'], cols['loan_term_months']),
+        # Installment per unit of principal at the requested term
+        'factor': annuity_installments(engine.annuity, np.ones(net_income.shape), cols['loan_term_months'])
+    }
+
+def _candidates(current: np.ndarray, breakpoints: Sequence[np.ndarray], lo: np.ndarray, hi: np.ndarray,
+                descending: bool) -> np.ndarray:
+    """Current value, the breakpoints inside [lo, hi] and the far bound, sorted away from the current value"""
+    far = lo if descending else hi
+    columns = [current]
+    for point in breakpoints:
+        inside = np.isfinite(point) & (point > lo) & (point < hi)
+        # Points outside the range collapse onto the current value (zero-length segments)
+        columns.append(np.where(inside, point, current))
+    columns.append(far)
+    points = np.sort(np.column_stack(columns), axis=1)
+    return points[:, ::-1] if descending else points
+
+def _solve_linear(engine, cols, field, points, threshold):
+    pre = _pre_cap_scores(engine, cols, field, points)
+    j, feasible = _crossing(pre, threshold)
+    rows = np.arange(points.shape[0])
+    prev = np.maximum(j - 1, 0)
+    value = _interpolate(points[rows, prev], points[rows, j], pre[rows, prev], pre[rows, j], threshold)
+    return np.where(j == 0, points[:, 0], value), points[rows, j], feasible
+
+def _solve_bank_balance(engine, cols, inputs, threshold):
+    current = cols['bank_balance']
+    # Liquidity counts fully up to (balance + 0.8 x investments) = 2 x loan amount
+    saturation = np.where(cols['loan_amount'] > 0, 2 * cols['loan_amount'] - 0.8 * cols['investments'], current)
+    points = np.column_stack([current, np.maximum(current, saturation)])
+    value, safe, feasible = _solve_linear(engine, cols, 'bank_balance', points, threshold)
+    return np.ceil(value / MONEY_STEP) * MONEY_STEP, safe, feasible
+
+def _solve_card_debt(engine, cols, inputs, threshold):
+    current = cols['credit_card_debt']
+    net_income = inputs['net_income']
+    # Debt enters DTI as a 4% minimum payment, unless DTI was given as input
+    uses_debt = np.isnan(cols['debt_to_income_ratio']) & (net_income > 0)
+    breakpoints = [np.where(cols['credit_card_limit'] > 0, cols['credit_card_limit'], np.nan)]
+    for band in (0.2, 0.6):
+        debt = (band * net_income - inputs['installment'] - inputs['loan_payment']) / 0.04
+        breakpoints.append(np.where(uses_debt, debt, np.nan))
+    points = _candidates(current, breakpoints, np.zeros(current.shape), current, descending=True)
+    value, safe, feasible = _solve_linear(engine, cols, 'credit_card_debt', points, threshold)
+    return np.maximum(0.0, np.floor(value / MONEY_STEP) * MONEY_STEP), safe, feasible
+
+def _solve_term(engine, cols, inputs, threshold):
+    current = cols['loan_term_months']
+    amount = cols['loan_amount']
+    net_income = inputs['net_income']
+    terms = np.arange(1, MAX_TERM_MONTHS + 1)
+    # Installment per unit of principal by term, decreasing with the term
+    factors = annuity_installments(engine.annuity, np.ones(terms.size), terms)
+
+    def first_term(installment):
+        """Shortest term whose installment is at most the given one"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_unit = np.where(amount > 0, installment / amount, np.inf)
+        index = np.searchsorted(-factors, -per_unit, side='left')
+        return np.clip(terms[np.minimum(index, terms.size - 1)], current, MAX_TERM_MONTHS)
+
+    # Installments where the DTI or payment-ratio component leaves its band
+    breakpoints = []
+    for installment in (0.2 * net_income - inputs['current_debt'], 0.6 * net_income - inputs['current_debt'],
+                        0.3 * net_income, 0.7 * net_income):
+        term = first_term(np.where(net_income > 0, installment, np.nan))
+        # The term just before each breakpoint too: a crossing between the two needs no interpolation
+        breakpoints += [term - 1, term]
+    points = _candidates(current.astype(np.float64), breakpoints, current.astype(np.float64),
+                         np.full(current.shape, float(MAX_TERM_MONTHS)), descending=False)
+    pre = _pre_cap_scores(engine, cols, 'loan_term_months', points)
+    j, feasible = _crossing(pre, threshold)
+    rows = np.arange(points.shape[0])
+    prev = np.maximum(j - 1, 0)
+    lo, hi = points[rows, prev], points[rows, j]
+    # Between breakpoints the score is linear in the installment
+    installments = amount[:, None] * factors[points.astype(np.int64) - 1]
+    target = _interpolate(installments[rows, prev], installments[rows, j], pre[rows, prev], pre[rows, j], threshold)
+    value = np.where(hi - lo <= 1, hi, np.clip(first_term(target), lo + 1, hi))
+    return np.where(j == 0, current, value), hi, feasible
+
+def _solve_loan_amount(engine, cols, inputs, threshold):
+    current = cols['loan_amount']
+    factor = inputs['factor']
+    net_income = inputs['net_income']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        breakpoints = [
+            (0.2 * net_income - inputs['current_debt']) / factor,
+            (0.6 * net_income - inputs['current_debt']) / factor,
+            0.3 * net_income / factor,
+            0.7 * net_income / factor,
+            # Liquidity and collateral stop counting fully below these amounts
+            (cols['bank_balance'] + 0.8 * cols['investments']) / 2,
+            np.where(cols['home_ownership'] == "owner", cols['real_estate_value'] / 3, np.nan)
+        ]
+    lo = np.minimum(current, MIN_LOAN_AMOUNT)
+    coarse = _candidates(current, breakpoints, lo, current, descending=True)
+    # Midpoints give the third point that pins down a + b x P + c / P on each segment
+    points = np.empty((coarse.shape[0], 2 * coarse.shape[1] - 1))
+    points[:, ::2] = coarse
+    points[:, 1::2] = (coarse[:, :-1] + coarse[:, 1:]) / 2
+
+    pre = _pre_cap_scores(engine, cols, 'loan_amount', points)
+    j, feasible = _crossing(pre, threshold)
+    rows = np.arange(points.shape[0])
+    start = np.maximum(2 * ((j - 1) // 2), 0)
+    x = np.stack([points[rows, start], points[rows, start + 1], points[rows, np.minimum(start + 2, points.shape[1] - 1)]],
+                 axis=1)
+    p = np.stack([pre[rows, start], pre[rows, start + 1], pre[rows, np.minimum(start + 2, points.shape[1] - 1)]],
+                 axis=1)
+
+    value = np.where(j == 0, current, points[rows, j])
+    solve = np.flatnonzero(feasible & (j > 0) & (x[:, 0] > x[:, 2]))
+    if solve.size:
+        # pre = a + b t + c / t with t = P / segment start, well scaled on (0, 1]
+        t = x[solve] / x[solve, :1]
+        coefficients = np.linalg.solve(np.stack([np.ones_like(t), t, 1 / t], axis=2), p[solve][:, :, None])[:, :, 0]
+        a, b, c = coefficients.T
+        # b t^2 + (a - threshold) t + c = 0; the root inside the segment is the largest amount meeting it
+        linear = a - threshold[solve]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            root = np.sqrt(np.maximum(linear * linear - 4 * b * c, 0.0))
+            roots = np.stack([(-linear + root) / (2 * b), (-linear - root) / (2 * b), -c / linear], axis=1)
+        quadratic = np.abs(b) > 1e-12
+        roots[quadratic, 2] = np.nan
+        roots[~quadratic, :2] = np.nan
+        t_lo, t_hi = t[:, 2:3] - 1e-9, t[:, 0:1] + 1e-9
+        roots = np.where((roots >= t_lo) & (roots <= t_hi), roots, np.nan)
+        solved = np.nanmax(np.where(np.isnan(roots), -np.inf, roots), axis=1) * x[solve, 0]
+        # Fall back to the segment end known to meet the threshold if no root was found
+        value[solve] = np.where(np.isfinite(solved), solved, points[solve, j[solve]])
+    value = np.where(j == 0, current, np.maximum(lo, np.floor(value / MONEY_STEP) * MONEY_STEP))
+    return value, points[rows, j], feasible
+
+SOLVERS = {
+    'loan_amount': (_solve_loan_amount, -MONEY_STEP),
+    'loan_term_months': (_solve_term, 1),
+    'credit_card_debt': (_solve_card_debt, -MONEY_STEP),
+    'bank_balance': (_solve_bank_balance, MONEY_STEP),
+}
+
+def solve_counterfactuals(engine: Any, batch: Batch, target: str = None,
+                          levers: Sequence[str] = LEVERS) -> Dict[str, Any]:
+    """Per application and lever, the value closest to the current one that reaches the target
+
+    target is 'CONDITIONAL' or 'APPROVE'; by default each application aims
+    one level above its current decision. Values are NaN where one lever
+    alone cannot get there (hard blocks cap the score at 60); applications
+    already at the target keep their current values.
+    """
+    cols = to_columns(batch)
+    base = score_columns(engine, cols)
+    if target is None:
+        targets = np.where(base['decision'] == "REJECT", "CONDITIONAL", "APPROVE")
+    elif target in TARGETS:
+        targets = np.full(base['size'], target)
+    else:
+        raise ValueError(f"Unknown target '{target}' (use one of: {', '.join(TARGETS)})")
+    threshold = np.where(targets == "APPROVE", float(engine.approve_threshold), float(engine.conditional_threshold))
+    reachable = ~(base['hard_block'] & (threshold > HARD_BLOCK_CAP))
+    at_target = base['raw_score'] >= threshold
+    inputs = _debt_inputs(engine, cols)
+
+    results = {}
+    for lever in levers:
+        solver, step = SOLVERS[lever]
+        value, safe, feasible = solver(engine, cols, inputs, threshold)
+        feasible &= reachable
+        # Rounding to the 100 TL grid must not move a value that already reaches the target
+        value = np.where(at_target, cols[lever], value)
+
+        # Check the rounded values in one more pass; float noise at the boundary costs one step
+        pre = _pre_cap_scores(engine, cols, lever, value[:, None])[:, 0]
+        short = feasible & (pre < threshold)
+        if short.any():
+            value = np.where(short, value + step, value)
+            pre = _pre_cap_scores(engine, cols, lever, value[:, None])[:, 0]
+            value = np.where(short & (pre < threshold), safe, value)
+        # A root rounded just past an exact tie can sit one step short of the closest value
+        closer = value - step
+        try_closer = feasible & ~short & ((closer - cols[lever]) * np.sign(step) >= 0)
+        if try_closer.any():
+            pre = _pre_cap_scores(engine, cols, lever, closer[:, None])[:, 0]
+            value = np.where(try_closer & (pre >= threshold), closer, value)
+
+        final = dict(cols)
+        final[lever] = value.astype(cols[lever].dtype)
+        scored = score_columns(engine, final)
+        value = np.where(feasible, value, np.nan)
+        results[lever] = {
+            'current': cols[lever],
+            'value': value,
+            'change': value - cols[lever],
+            'score': np.where(feasible, scored['score'], np.nan),
+            'decision': np.where(feasible, scored['decision'], None),
+            'feasible': feasible
+        }
+    return {
+        'size': base['size'],
+        'score': base['score'],
+        'decision': base['decision'],
+        'target': targets,
+        'threshold': threshold,
+        'levers': results
+    }
+
+LEVER_MESSAGES = {
+    'loan_amount': lambda option: f"Kredi tutarı {option['suggested']:,.0f} TL'ye düşürülürse",
+    'loan_term_months': lambda option: f"Vade {option['suggested']:.0f} aya uzatılırsa",
+    'credit_card_debt': lambda option: f"Kredi kartı borcu {-option['change']:,.0f} TL azaltılırsa",
+    'bank_balance': lambda option: f"Banka birikimi {option['change']:,.0f} TL artırılırsa",
+}
+
+def counterfactual_options(engine: Any, record: Any, target: str = None) -> Dict[str, Any]:
+    """solve_counterfactuals for one decoded application, as a response block"""
+    cols = record_columns(record, 1)
+    result = solve_counterfactuals(engine, cols, target)
+    options = []
+    for lever, values in result['levers'].items():
+        if not values['feasible'][0] or values['change'][0] == 0:
+            continue
+        # Terms are whole months
+        convert = int if lever == 'loan_term_months' else float
+        option = {
+            'field': lever,
+            'current': convert(values['current'][0]),
+            'suggested': convert(values['value'][0]),
+            'change': convert(values['change'][0]),
+            'score': values['score'][0].item(),
+            'decision': values['decision'][0]
+        }
+        option['message'] = LEVER_MESSAGES[lever](option)
+        options.append(option)
+    return {
+        'target': result['target'][0].item(),
+        'threshold': result['threshold'][0].item(),
+        'options': options
+    }
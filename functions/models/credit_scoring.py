@@ -2,10 +2,12 @@
 from datetime import datetime
 from typing import Dict, Any, Tuple
 
+from models.tiers import TierTables, load_tier_tables
+
 class CreditScoringEngine:
     """Advanced credit scoring engine with Turkish banking standards"""
     
-    def __init__(self):
+    def __init__(self, tiers: TierTables = None):
         self.risk_factors = {
             'income_stability': 0.25,
             'debt_to_income': 0.20,
@@ -21,6 +23,11 @@ class CreditScoringEngine:
             'private': {'min_income': 40000, 'max_loan': 1000000},
             'corporate': {'min_income': 25000, 'max_loan': 750000}
         }
+        
+        # Risk categories and the decision matrix come from data/score_tiers.json
+        self.tiers = tiers if tiers is not None else load_tier_tables()
+        self.risk_category_tiers = self.tiers['risk_scoring.risk_category']
+        self.decision_tiers = self.tiers['risk_scoring.decision']
 
     def calculate_risk_score(self, application_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate comprehensive risk score"""
@@ -114,14 +121,7 @@ class CreditScoringEngine:
 
     def _categorize_risk(self, score: float) -> str:
         """Categorize risk based on score"""
-        if score >= 80:
-            return 'LOW_RISK'
-        elif score >= 60:
-            return 'MEDIUM_RISK'
-        elif score >= 40:
-            return 'HIGH_RISK'
-        else:
-            return 'VERY_HIGH_RISK'
+        return self.risk_category_tiers.lookup(score)
 
     def make_decision(self, risk_data: Dict[str, Any], application_data: Dict[str, Any]) -> Dict[str, Any]:
         """Make final credit decision"""
@@ -131,22 +131,10 @@ class CreditScoringEngine:
         segment = risk_data.get('customer_segment', 'mass')
         
         # Decision matrix based on risk score and segment
-        if risk_score >= 75:
-            approved = True
-            recommended_amount = loan_amount
-            conditions = ['Standart kredi koşulları geçerlidir']
-        elif risk_score >= 60:
-            approved = True
-            recommended_amount = min(loan_amount, loan_amount * 0.8)
-            conditions = ['Ek teminat gerekebilir', 'Daha yüksek faiz oranı uygulanabilir']
-        elif risk_score >= 45:
-            approved = False
-            recommended_amount = min(loan_amount, loan_amount * 0.5)
-            conditions = ['Ek gelir belgesi gerekli', 'Kefil veya teminat zorunlu']
-        else:
-            approved = False
-            recommended_amount = 0
-            conditions = ['Mevcut şartlarda kredi verilemez', 'Gelir artışı sonrası tekrar değerlendirilebilir']
+        tier = self.decision_tiers.lookup(risk_score)
+        approved = tier['approved']
+        recommended_amount = min(loan_amount, loan_amount * tier['amount_ratio']) if tier['amount_ratio'] else 0
+        conditions = list(tier['conditions'])
         
         # Risk factors affecting decision
         factors = []
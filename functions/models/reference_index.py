@@ -0,0 +1,282 @@
+# Memory-mapped nearest-neighbour index over a large reference book
+import csv
+import json
+import os
+from typing import Dict, Any, Iterable, Sequence
+import numpy as np
+
+from models.reference_set import (
+    FEATURES, SCALES, WEIGHTS, RELEVANCE_THRESHOLD, FULL_CONFIDENCE_MATCHES, NEUTRAL_PREDICTION
+)
+
+STORE_VERSION = 1
+MANIFEST = 'manifest.json'
+DEFAULT_LEAF_SIZE = 128
+CSV_CHUNK_ROWS = 100_000
+
+# Per-leaf arrays, small enough to scan on every query
+LEAF_ARRAYS = ('leaf_start', 'leaf_end', 'leaf_min', 'leaf_max',
+               'leaf_count', 'leaf_approved', 'leaf_sum', 'leaf_approved_sum')
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate arange(start, end) for every pair without a Python loop"""
+    lengths = ends - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(int(lengths.sum())) + offsets
+
+def _feature_similarity_sum(n_left: np.ndarray, sum_left: np.ndarray, n_right: np.ndarray,
+                            sum_right: np.ndarray, q: float, s: float) -> float:
+    """Sum of max(0, 1 - |q - x| / s) over rows known to lie in [q - s, q] (left) or [q, q + s] (right)"""
+    return float(np.sum(n_left - (q * n_left - sum_left) / s) + np.sum(n_right - (sum_right - q * n_right) / s))
+
+class ReferenceIndex:
+    """KD-tree bucketed reference book stored as memory-mapped .npy files
+
+    Rows are partitioned into leaves of at most leaf_size rows by recursive
+    median splits. Each query bounds the similarity of every leaf from its
+    bounding box: leaves that cannot pass the relevance threshold are
+    skipped, leaves that certainly pass are aggregated exactly from per-leaf
+    and per-dimension prefix sums, and only leaves straddling the threshold
+    are scanned row by row. Results match ReferenceSet on the same rows up to
+    floating-point rounding.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != STORE_VERSION or tuple(manifest.get('features', ())) != FEATURES:
+            raise ValueError(f"Unsupported reference store at {path}")
+
+        self.path = path
+        self.manifest = manifest
+        # Plain ndarray views over the mapped files: pages are read on demand, nothing is copied
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+            for name in manifest['arrays']
+        }
+
+        for name in LEAF_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.features = arrays['features']
+        self.approved = arrays['approved']
+        self.sort_key = [arrays[f'sort_key_{d}'] for d in range(len(FEATURES))]
+        self.prefix_sum = [arrays[f'prefix_sum_{d}'] for d in range(len(FEATURES))]
+        self.prefix_approved = [arrays[f'prefix_approved_{d}'] for d in range(len(FEATURES))]
+        self.prefix_approved_sum = [arrays[f'prefix_approved_sum_{d}'] for d in range(len(FEATURES))]
+        self.key_origin = np.array(manifest['key_origin'])
+        self.key_span = np.array(manifest['key_span'])
+
+        self.scales = np.array(SCALES)
+        self.inv_scales = 1.0 / self.scales
+        self.weights = np.array(WEIGHTS)
+
+    def __len__(self) -> int:
+        return int(self.manifest['rows'])
+
+    @classmethod
+    def open(cls, path: str) -> 'ReferenceIndex':
+        return cls(path)
+
+    @classmethod
+    def build(cls, features: np.ndarray, approved: np.ndarray, path: str,
+              leaf_size: int = DEFAULT_LEAF_SIZE) -> 'ReferenceIndex':
+        """Partition a reference book into leaves and write the store to path"""
+        features = np.ascontiguousarray(features, dtype=np.float64).reshape(-1, len(FEATURES))
+        approved = np.ascontiguousarray(approved, dtype=np.float64)
+        if len(features) != len(approved):
+            raise ValueError("features and approved must have the same number of rows")
+        n_rows, n_dims = features.shape
+
+        # Recursive median splits on the dimension with the widest weighted spread
+        order = np.arange(n_rows)
+        spread_weight = np.array(WEIGHTS) / np.array(SCALES)
+        leaves = []
+        stack = [(0, n_rows)] if n_rows else []
+        while stack:
+            start, end = stack.pop()
+            if end - start <= leaf_size:
+                leaves.append((start, end))
+                continue
+            block = features[order[start:end]]
+            dim = int(np.argmax((block.max(axis=0) - block.min(axis=0)) * spread_weight))
+            mid = (end - start) // 2
+            order[start:end] = order[start:end][np.argpartition(block[:, dim], mid)]
+            stack.append((start + mid, end))
+            stack.append((start, start + mid))
+
+        features = features[order]
+        approved = approved[order]
+        leaf_start = np.array([s for s, _ in leaves], dtype=np.int64)
+        leaf_end = np.array([e for _, e in leaves], dtype=np.int64)
+        leaf_id = np.repeat(np.arange(len(leaves)), leaf_end - leaf_start)
+
+        def segment_reduce(ufunc, values):
+            return ufunc.reduceat(values, leaf_start, axis=0) if len(leaves) else values[:0]
+
+        arrays = {
+            'features': features,
+            'approved': approved,
+            'leaf_start': leaf_start,
+            'leaf_end': leaf_end,
+            'leaf_min': segment_reduce(np.minimum, features),
+            'leaf_max': segment_reduce(np.maximum, features),
+            'leaf_count': (leaf_end - leaf_start).astype(np.float64),
+            'leaf_approved': segment_reduce(np.add, approved),
+            'leaf_sum': segment_reduce(np.add, features),
+            'leaf_approved_sum': segment_reduce(np.add, features * approved[:, None]),
+        }
+
+        # Per dimension: rows sorted by value inside each leaf, keyed as leaf + [0, 0.5] fraction
+        # so one searchsorted call can look up thresholds in many leaves at once. Query keys
+        # are clipped to [-0.25, 0.75], which stays inside the leaf but outside its data range.
+        key_origin = features.min(axis=0) if n_rows else np.zeros(n_dims)
+        key_span = np.maximum(features.max(axis=0) - key_origin, 1e-12) if n_rows else np.ones(n_dims)
+        for d in range(n_dims):
+            key = leaf_id + 0.5 * (features[:, d] - key_origin[d]) / key_span[d]
+            by_value = np.argsort(key, kind='stable')
+            values = features[by_value, d]
+            flags = approved[by_value]
+            arrays[f'sort_key_{d}'] = key[by_value]
+            arrays[f'prefix_sum_{d}'] = np.concatenate(([0.0], np.cumsum(values)))
+            arrays[f'prefix_approved_{d}'] = np.concatenate(([0.0], np.cumsum(flags)))
+            arrays[f'prefix_approved_sum_{d}'] = np.concatenate(([0.0], np.cumsum(values * flags)))
+
+        os.makedirs(path, exist_ok=True)
+        for name, values in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), values)
+        manifest = {
+            'version': STORE_VERSION,
+            'features': list(FEATURES),
+            'rows': int(n_rows),
+            'leaves': len(leaves),
+            'leaf_size': leaf_size,
+            'key_origin': key_origin.tolist(),
+            'key_span': key_span.tolist(),
+            'arrays': sorted(arrays)
+        }
+        with open(os.path.join(path, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return cls(path)
+
+    @classmethod
+    def build_from_records(cls, records: Iterable[Dict[str, Any]], path: str,
+                           leaf_size: int = DEFAULT_LEAF_SIZE) -> 'ReferenceIndex':
+        """Build a store from records with the FEATURES keys and an 'approved' flag"""
+        features, approved = [], []
+        chunk = []
+        for record in records:
+            chunk.append([float(record[f]) for f in FEATURES] + [float(record['approved'])])
+            if len(chunk) >= CSV_CHUNK_ROWS:
+                block = np.array(chunk)
+                features.append(block[:, :-1])
+                approved.append(block[:, -1])
+                chunk = []
+        if chunk:
+            block = np.array(chunk)
+            features.append(block[:, :-1])
+            approved.append(block[:, -1])
+        if not features:
+            return cls.build(np.empty((0, len(FEATURES))), np.empty(0), path, leaf_size)
+        return cls.build(np.concatenate(features), np.concatenate(approved), path, leaf_size)
+
+    @classmethod
+    def build_from_csv(cls, csv_path: str, path: str, leaf_size: int = DEFAULT_LEAF_SIZE) -> 'ReferenceIndex':
+        with open(csv_path, encoding='utf-8', newline='') as f:
+            return cls.build_from_records(csv.DictReader(f), path, leaf_size)
+
+    def _certain_leaf_sums(self, leaves: np.ndarray, q: np.ndarray, near: np.ndarray,
+                           far: np.ndarray) -> Sequence[float]:
+        """Exact match count, similarity sum and approved-similarity sum over leaves that all pass"""
+        count = self.leaf_count[leaves]
+        approved = self.leaf_approved[leaves]
+        similarity_sum = 0.0
+        approved_sum = 0.0
+
+        for d in range(len(FEATURES)):
+            s, w, qd = self.scales[d], self.weights[d], q[d]
+            lo = self.leaf_min[leaves, d]
+            hi = self.leaf_max[leaves, d]
+
+            # Linear pieces: whole box on one side of q and within reach, or out of reach entirely
+            in_reach = far[:, d] <= s
+            left = in_reach & (hi <= qd)
+            right = in_reach & (lo >= qd) & ~left
+            mixed = ~(left | right | (near[:, d] >= s))
+
+            similarity_sum += w * _feature_similarity_sum(
+                count[left], self.leaf_sum[leaves[left], d], count[right], self.leaf_sum[leaves[right], d], qd, s)
+            approved_sum += w * _feature_similarity_sum(
+                approved[left], self.leaf_approved_sum[leaves[left], d],
+                approved[right], self.leaf_approved_sum[leaves[right], d], qd, s)
+
+            if not mixed.any():
+                continue
+
+            # Leaves containing q or q +/- s: split rows at the breakpoints with prefix sums
+            ids = leaves[mixed].astype(np.float64)
+            origin, span = self.key_origin[d], self.key_span[d]
+            sort_key = self.sort_key[d]
+            i1 = np.searchsorted(sort_key, ids + np.clip(0.5 * (qd - s - origin) / span, -0.25, 0.75), side='left')
+            i2 = np.searchsorted(sort_key, ids + np.clip(0.5 * (qd - origin) / span, -0.25, 0.75), side='right')
+            i3 = np.searchsorted(sort_key, ids + np.clip(0.5 * (qd + s - origin) / span, -0.25, 0.75), side='right')
+
+            prefix_sum = self.prefix_sum[d]
+            similarity_sum += w * _feature_similarity_sum(
+                i2 - i1, prefix_sum[i2] - prefix_sum[i1], i3 - i2, prefix_sum[i3] - prefix_sum[i2], qd, s)
+            prefix_approved = self.prefix_approved[d]
+            prefix_approved_sum = self.prefix_approved_sum[d]
+            approved_sum += w * _feature_similarity_sum(
+                prefix_approved[i2] - prefix_approved[i1], prefix_approved_sum[i2] - prefix_approved_sum[i1],
+                prefix_approved[i3] - prefix_approved[i2], prefix_approved_sum[i3] - prefix_approved_sum[i2],
+                qd, s)
+
+        return float(count.sum()), float(similarity_sum), float(approved_sum)
+
+    def predict(self, query: Sequence[float]) -> float:
+        """Similarity-weighted approval probability for one applicant (FEATURES order)"""
+        if not len(self):
+            return NEUTRAL_PREDICTION
+        q = np.asarray(query, dtype=np.float64)
+
+        # Similarity bounds per leaf from its bounding box
+        near = np.maximum(0.0, np.maximum(self.leaf_min - q, q - self.leaf_max))
+        far = np.maximum(np.abs(q - self.leaf_min), np.abs(q - self.leaf_max))
+        upper = np.maximum(0.0, 1.0 - near * self.inv_scales) @ self.weights
+        lower = np.maximum(0.0, 1.0 - far * self.inv_scales) @ self.weights
+
+        candidates = upper > RELEVANCE_THRESHOLD
+        certain = np.flatnonzero(candidates & (lower > RELEVANCE_THRESHOLD))
+        straddling = np.flatnonzero(candidates & (lower <= RELEVANCE_THRESHOLD))
+
+        matches, similarity_sum, approved_sum = self._certain_leaf_sums(certain, q, near[certain], far[certain])
+
+        if len(straddling):
+            rows = _ranges(self.leaf_start[straddling], self.leaf_end[straddling])
+            similarity = np.maximum(0.0, 1.0 - np.abs(self.features[rows] - q) * self.inv_scales) @ self.weights
+            relevant = similarity > RELEVANCE_THRESHOLD
+            matches += float(relevant.sum())
+            similarity_sum += float(similarity[relevant].sum())
+            approved_sum += float(similarity[relevant] @ self.approved[rows][relevant])
+
+        if not matches:
+            return NEUTRAL_PREDICTION
+        base_prediction = approved_sum / similarity_sum if similarity_sum > 0 else NEUTRAL_PREDICTION
+        confidence = min(1.0, matches / FULL_CONFIDENCE_MATCHES)
+        return base_prediction * confidence + NEUTRAL_PREDICTION * (1 - confidence)
+
+    def predict_batch(self, queries: np.ndarray) -> np.ndarray:
+        """Approval probabilities for many applicants (rows in FEATURES order)"""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, len(FEATURES))
+        return np.array([self.predict(q) for q in queries])
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a memory-mapped reference store from a CSV book")
+    parser.add_argument('csv_path', help="CSV with age, monthly_income, employment_years, debt_ratio, kkb_score, approved")
+    parser.add_argument('store_path', help="Output directory for the store")
+    parser.add_argument('--leaf-size', type=int, default=DEFAULT_LEAF_SIZE)
+    args = parser.parse_args()
+
+    index = ReferenceIndex.build_from_csv(args.csv_path, args.store_path, args.leaf_size)
+    print(f"{len(index)} rows, {index.manifest['leaves']} leaves -> {args.store_path}")
@@ -0,0 +1,97 @@
+# Reference set for similarity-based approval prediction
+import csv
+import json
+import os
+from typing import Dict, Any, Iterable, Sequence
+import numpy as np
+
+DEFAULT_REFERENCE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      'data', 'reference_set.json')
+
+# Feature columns, the distance that drops a feature's similarity to 0, and its weight
+FEATURES = ('age', 'monthly_income', 'employment_years', 'debt_ratio', 'kkb_score')
+SCALES = (30.0, 20000.0, 15.0, 0.5, 200.0)
+WEIGHTS = (0.15, 0.30, 0.20, 0.25, 0.10)
+
+RELEVANCE_THRESHOLD = 0.1  # Minimum combined similarity for a reference to count
+FULL_CONFIDENCE_MATCHES = 10  # Relevant references needed for full confidence
+NEUTRAL_PREDICTION = 0.5
+
+# Query x reference pairs compared per step in predict_batch (bounds temporary memory)
+BATCH_CHUNK_CELLS = 2_000_000
+
+class ReferenceSet:
+    """Decided applications compiled into contiguous arrays for similarity scoring"""
+
+    def __init__(self, features: np.ndarray, approved: np.ndarray):
+        self.features = np.ascontiguousarray(features, dtype=np.float64)
+        self.approved = np.ascontiguousarray(approved, dtype=np.float64)
+        self.inv_scales = 1.0 / np.array(SCALES)
+        self.weights = np.array(WEIGHTS)
+
+    def __len__(self) -> int:
+        return len(self.approved)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'ReferenceSet':
+        """Compile records with the FEATURES keys and an 'approved' flag"""
+        records = list(records)
+        features = np.array([[float(r[f]) for f in FEATURES] for r in records], dtype=np.float64)
+        approved = np.array([float(r['approved']) for r in records], dtype=np.float64)
+        return cls(features.reshape(len(records), len(FEATURES)), approved)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_REFERENCE_PATH) -> 'ReferenceSet':
+        """Load a reference set from a JSON list of records, a CSV file with a header row,
+        or compiled arrays written by save (.npz)"""
+        if path.lower().endswith('.npz'):
+            with np.load(path) as arrays:
+                return cls(arrays['features'], arrays['approved'])
+        with open(path, encoding='utf-8', newline='') as f:
+            if path.lower().endswith('.csv'):
+                return cls.from_records(csv.DictReader(f))
+            return cls.from_records(json.load(f))
+
+    def save(self, path: str):
+        """Write the compiled arrays (.npz) so loading skips record parsing"""
+        np.savez(path, features=self.features, approved=self.approved)
+
+    def _aggregate(self, similarity: np.ndarray) -> np.ndarray:
+        """Turn similarity rows (queries x references) into predictions"""
+        relevant = similarity > RELEVANCE_THRESHOLD
+        weights = np.where(relevant, similarity, 0.0)
+        matches = relevant.sum(axis=-1)
+        total_weight = weights.sum(axis=-1)
+        weighted_sum = weights @ self.approved
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            base_prediction = np.where(total_weight > 0, weighted_sum / total_weight, NEUTRAL_PREDICTION)
+        # Confidence grows with the number of similar cases
+        confidence = np.minimum(1.0, matches / FULL_CONFIDENCE_MATCHES)
+        prediction = base_prediction * confidence + NEUTRAL_PREDICTION * (1 - confidence)
+        return np.where(matches > 0, prediction, NEUTRAL_PREDICTION)
+
+    def similarity(self, query: Sequence[float]) -> np.ndarray:
+        """Weighted similarity of one applicant (FEATURES order) to every reference"""
+        per_feature = np.maximum(0.0, 1.0 - np.abs(self.features - np.asarray(query, dtype=np.float64)) * self.inv_scales)
+        return per_feature @ self.weights
+
+    def predict(self, query: Sequence[float]) -> float:
+        """Similarity-weighted approval probability for one applicant"""
+        if not len(self):
+            return NEUTRAL_PREDICTION
+        return float(self._aggregate(self.similarity(query)))
+
+    def predict_batch(self, queries: np.ndarray) -> np.ndarray:
+        """Approval probabilities for many applicants (rows in FEATURES order)"""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, len(FEATURES))
+        if not len(self):
+            return np.full(len(queries), NEUTRAL_PREDICTION)
+
+        predictions = np.empty(len(queries))
+        chunk = max(1, BATCH_CHUNK_CELLS // len(self))
+        for start in range(0, len(queries), chunk):
+            block = queries[start:start + chunk]
+            per_feature = np.maximum(0.0, 1.0 - np.abs(block[:, None, :] - self.features[None, :, :]) * self.inv_scales)
+            predictions[start:start + chunk] = self._aggregate(per_feature @ self.weights)
+        return predictions
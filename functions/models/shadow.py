@@ -0,0 +1,280 @@
+# Champion/challenger shadow scoring, off the request path
+#
+# The live engine passes each decoded application with its own score and
+# decision to ShadowScorer.submit(), which only enqueues it. A daemon worker
+# drains the queue in batches, derives the features the challengers share
+# once per application, runs every challenger and logs disagreements as
+# compact JSON lines:
+#
+#   {"ts":1760794000,"app":"3f2a9c1e0b7d4e65","model":"legacy","champion":[71.2,"C"],"challenger":[78.9,"A"]}
+#
+# When the queue is full the application is dropped rather than making the
+# request wait.
+import abc
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Any, Callable, Sequence, Tuple
+
+from models.application import FIELDS, MAX_STRING_LENGTH, ApplicationRecord
+from models.credit_scoring import CreditScoringEngine
+from utils.decision_cache import application_key
+from utils.metrics import METRICS
+
+DECISION_CODES = {"APPROVE": "A", "CONDITIONAL": "C", "REJECT": "R"}
+CATEGORY_FIELDS = frozenset(field for field, kind, _, _, _ in FIELDS if kind == 'str')
+
+SHADOW_METRIC = 'finis_shadow_comparisons_total'
+METRICS.describe(SHADOW_METRIC, 'Shadow comparisons by challenger and result (agree, score, decision, error, dropped)')
+
+class SharedFeatures:
+    """Inputs derived once per application and reused by every challenger"""
+
+    __slots__ = ('record', 'application', 'ml_prediction', 'legacy_score')
+
+    def __init__(self, record: ApplicationRecord):
+        self.record = record
+        self.application = legacy_application(record)
+        self.ml_prediction = None
+        self.legacy_score = None
+
+def legacy_application(record: ApplicationRecord) -> Dict[str, Any]:
+    """Request-style dict for the older scorers: decoded numbers and flags, categories as sent
+
+    They match categories such as 'Doktor' case-sensitively, so those keep
+    the request's spelling (trimmed, as text); fields outside the schema are
+    passed through.
+    """
+    application = dict(record.source)
+    for field, value in record.to_dict().items():
+        if field in CATEGORY_FIELDS:
+            value = str(application[field]).strip()[:MAX_STRING_LENGTH]
+        application[field] = value
+    return application
+
+class Challenger(abc.ABC):
+    """A shadow model scoring on the 0-100 scale with APPROVE/CONDITIONAL/REJECT decisions"""
+
+    name = 'challenger'
+
+    def prepare(self, batch: List[SharedFeatures]):
+        """Fill in shared features for a whole batch at once (optional)"""
+
+    @abc.abstractmethod
+    def score(self, features: SharedFeatures) -> Tuple[float, str]:
+        """(score, decision) for one application; raising counts as an error"""
+
+class LegacyScoreChallenger(Challenger):
+    """CreditDecisionEngine.calculate_credit_score, cut at the advanced engine's thresholds"""
+
+    name = 'legacy'
+
+    def __init__(self, engine, approve_threshold: float = 75, conditional_threshold: float = 60):
+        self.engine = engine
+        self.approve_threshold = approve_threshold
+        self.conditional_threshold = conditional_threshold
+
+    def prepare(self, batch: List[SharedFeatures]):
+        # The similarity model and the tier lookups run column-wise: one vectorized pass per batch
+        pending = [features for features in batch if features.ml_prediction is None]
+        if pending:
+            predictions = self.engine._ml_prediction_batch([features.application for features in pending])
+            for features, prediction in zip(pending, predictions):
+                features.ml_prediction = prediction
+        scores = self.engine.calculate_credit_scores([features.application for features in batch],
+                                                     [features.ml_prediction for features in batch])
+        for features, score in zip(batch, scores.tolist()):
+            features.legacy_score = score
+
+    def score(self, features: SharedFeatures) -> Tuple[float, str]:
+        score = features.legacy_score
+        if score is None:
+            score, _ = self.engine.calculate_credit_score(features.application, ml_prediction=features.ml_prediction)
+        if score >= self.approve_threshold:
+            return score, "APPROVE"
+        if score >= self.conditional_threshold:
+            return score, "CONDITIONAL"
+        return score, "REJECT"
+
+class RiskScoreChallenger(Challenger):
+    """credit_scoring.CreditScoringEngine risk score and decision matrix"""
+
+    name = 'risk_scoring'
+
+    def __init__(self, engine: CreditScoringEngine = None):
+        self.engine = engine if engine is not None else CreditScoringEngine()
+
+    def score(self, features: SharedFeatures) -> Tuple[float, str]:
+        risk = self.engine.calculate_risk_score(features.application)
+        if 'error' in risk:
+            # calculate_risk_score reports failures with a zero score instead of raising
+            raise ValueError(risk['error'])
+        tier = self.engine.decision_tiers.lookup(risk['risk_score'])
+        if not tier['approved']:
+            return risk['risk_score'], "REJECT"
+        return risk['risk_score'], "APPROVE" if tier['amount_ratio'] >= 1 else "CONDITIONAL"
+
+class _ChallengerStats:
+    __slots__ = ('compared', 'decision_disagreements', 'score_disagreements', 'errors', 'abs_diff_total')
+
+    def __init__(self):
+        self.compared = self.decision_disagreements = self.score_disagreements = self.errors = 0
+        self.abs_diff_total = 0.0
+
+class ShadowScorer:
+    """Bounded queue plus one background worker comparing challengers with the live decision"""
+
+    def __init__(self, challengers: Sequence[Challenger], queue_size: int = 1000, batch_size: int = 64,
+                 sample_every: int = 1, score_tolerance: float = 5.0, log: Callable[[str], Any] = None):
+        self.challengers = list(challengers)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        # Shadow one application in sample_every
+        self.sample_every = max(1, sample_every)
+        self.calls = itertools.count()
+        # Score gaps up to this many points count as agreement when the decisions match
+        self.score_tolerance = score_tolerance
+        self.log = log or logging.getLogger('finis.shadow').info
+        self.stats_by_challenger = {challenger.name: _ChallengerStats() for challenger in self.challengers}
+        self.processed = 0
+        self.dropped = 0
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def submit(self, record: ApplicationRecord, score: float, decision: str) -> bool:
+        """Queue one live decision for comparison; never blocks"""
+        if next(self.calls) % self.sample_every:
+            return False
+        if self.worker is None:
+            self._start_worker()
+        try:
+            self.queue.put_nowait((record, score, decision))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            METRICS.inc(SHADOW_METRIC, challenger='*', result='dropped')
+            return False
+        return True
+
+    def _start_worker(self):
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+                self.worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.process(batch)
+            except Exception:
+                logging.exception("Shadow scoring batch failed")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def process(self, batch: List[Tuple[ApplicationRecord, float, str]]):
+        """Score one batch with every challenger and record the disagreements"""
+        features = [SharedFeatures(record) for record, _, _ in batch]
+        ready = []
+        for challenger in self.challengers:
+            try:
+                challenger.prepare(features)
+            except Exception:
+                # Only this challenger misses the batch; each application counts as one error
+                logging.exception("Shadow challenger %s failed to prepare a batch", challenger.name)
+                self.stats_by_challenger[challenger.name].errors += len(batch)
+                METRICS.inc(SHADOW_METRIC, amount=len(batch), challenger=challenger.name, result='error')
+                continue
+            ready.append(challenger)
+
+        now = int(time.time())
+        for shared, (record, champion_score, champion_decision) in zip(features, batch):
+            app = None
+            for challenger in ready:
+                stats = self.stats_by_challenger[challenger.name]
+                try:
+                    score, decision = challenger.score(shared)
+                except Exception:
+                    stats.errors += 1
+                    METRICS.inc(SHADOW_METRIC, challenger=challenger.name, result='error')
+                    continue
+
+                gap = abs(score - champion_score)
+                stats.compared += 1
+                stats.abs_diff_total += gap
+                if decision != champion_decision:
+                    stats.decision_disagreements += 1
+                    result = 'decision'
+                elif gap > self.score_tolerance:
+                    stats.score_disagreements += 1
+                    result = 'score'
+                else:
+                    result = 'agree'
+                METRICS.inc(SHADOW_METRIC, challenger=challenger.name, result=result)
+
+                if result != 'agree':
+                    if app is None:
+                        # A short hash identifies the application without logging its values
+                        app = application_key(record)[:16]
+                    self.log(json.dumps({
+                        "ts": now,
+                        "app": app,
+                        "model": challenger.name,
+                        "champion": [round(champion_score, 2), DECISION_CODES.get(champion_decision, "?")],
+                        "challenger": [round(score, 2), DECISION_CODES.get(decision, "?")]
+                    }, separators=(',', ':')))
+        with self.lock:
+            self.processed += len(batch)
+
+    def drain(self):
+        """Block until every queued application has been compared"""
+        self.queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        challengers = {}
+        for name, stats in self.stats_by_challenger.items():
+            challengers[name] = {
+                'compared': stats.compared,
+                'decision_disagreements': stats.decision_disagreements,
+                'score_disagreements': stats.score_disagreements,
+                'errors': stats.errors,
+                'mean_abs_score_diff': round(stats.abs_diff_total / stats.compared, 3) if stats.compared else 0.0
+            }
+        return {
+            'queued': self.queue.qsize(),
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'sample_every': self.sample_every,
+            'challengers': challengers
+        }
+
+def file_log(path: str) -> Callable[[str], Any]:
+    """Append-only JSON-lines writer for the disagreement log"""
+    f = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def write(line: str):
+        f.write(line + '\n')
+
+    return write
+
+def build_challengers(names: Sequence[str], legacy_engine=None) -> List[Challenger]:
+    """Challengers by name: 'legacy' (needs the CreditDecisionEngine) and 'risk_scoring'"""
+    challengers = []
+    for name in names:
+        name = name.strip()
+        if name == LegacyScoreChallenger.name:
+            challengers.append(LegacyScoreChallenger(legacy_engine))
+        elif name == RiskScoreChallenger.name:
+            challengers.append(RiskScoreChallenger())
+        elif name:
+            raise ValueError(f"Unknown shadow challenger: {name}")
+    return challengers
@@ -0,0 +1,293 @@
+# Monte Carlo stress testing of a loan book with the advanced scoring engine
+#
+#   python -m models.stress portfolio.csv --scenarios scenarios.json --simulations 200 --workers 4
+#
+# Each scenario shocks the portfolio (income, expenses, interest rate, KKB
+# score) and rescores it with the columnar engine math. Random shocks are
+# drawn per simulation and applicant, so a scenario with 200 simulations
+# scores 200 x len(portfolio) scenario-applicant pairs, processed in chunks
+# of whole simulations. Every scenario draws from its own child of one
+# SeedSequence: results depend only on the seed, not on the worker count.
+# Score and DTI quantiles come from fixed-bin histograms filled chunk by
+# chunk, so memory does not grow with the number of simulations.
+import copy
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Sequence
+import numpy as np
+
+from models.annuity import AnnuityFactorTable
+from models.batch_scoring import Batch, to_columns, score_columns
+
+DEFAULT_SIMULATIONS = 100
+# Scenario-applicant pairs scored per pass
+DEFAULT_CHUNK_ROWS = 200_000
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DECISIONS = ("APPROVE", "CONDITIONAL", "REJECT")
+
+# KKB scores stay on the engine's 300-900 scale
+KKB_MIN, KKB_MAX = 300.0, 900.0
+
+# Histogram ranges and bin widths (the quantile resolution) for the reported distributions
+SCORE_BINS = (0.0, 100.0, 0.01)
+DTI_BINS = (0.0, 5.0, 0.001)
+
+class Scenario:
+    """One set of shocks applied to every application in the portfolio
+
+    income_shock and expense_inflation are relative changes (-0.2 = 20%
+    less income), rate_shift is in annual percentage points and kkb_drift
+    in score points. income_volatility (lognormal sigma, mean preserving),
+    kkb_volatility (normal sigma) and job_loss_rate (share of applicants
+    losing their monthly income) are drawn per applicant and simulation.
+    """
+
+    FIELDS = ('income_shock', 'income_volatility', 'expense_inflation', 'rate_shift',
+              'kkb_drift', 'kkb_volatility', 'job_loss_rate')
+
+    def __init__(self, name: str, income_shock: float = 0.0, income_volatility: float = 0.0,
+                 expense_inflation: float = 0.0, rate_shift: float = 0.0, kkb_drift: float = 0.0,
+                 kkb_volatility: float = 0.0, job_loss_rate: float = 0.0):
+        if income_shock <= -1:
+            raise ValueError(f"Scenario {name}: income_shock must be above -1")
+        if not 0 <= job_loss_rate <= 1:
+            raise ValueError(f"Scenario {name}: job_loss_rate must be between 0 and 1")
+        if income_volatility < 0 or kkb_volatility < 0:
+            raise ValueError(f"Scenario {name}: volatilities cannot be negative")
+        self.name = name
+        self.income_shock = income_shock
+        self.income_volatility = income_volatility
+        self.expense_inflation = expense_inflation
+        self.rate_shift = rate_shift
+        self.kkb_drift = kkb_drift
+        self.kkb_volatility = kkb_volatility
+        self.job_loss_rate = job_loss_rate
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> 'Scenario':
+        unknown = set(spec) - set(cls.FIELDS) - {'name'}
+        if unknown:
+            raise ValueError(f"Unknown scenario fields: {', '.join(sorted(unknown))}")
+        return cls(**spec)
+
+    @property
+    def stochastic(self) -> bool:
+        """False when every simulation would be identical"""
+        return bool(self.income_volatility or self.kkb_volatility or self.job_loss_rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, **{field: getattr(self, field) for field in self.FIELDS}}
+
+DEFAULT_SCENARIOS = (
+    Scenario('baseline'),
+    Scenario('income_-10', income_shock=-0.10, income_volatility=0.10),
+    Scenario('income_-25', income_shock=-0.25, income_volatility=0.15, job_loss_rate=0.05),
+    Scenario('expenses_+20', expense_inflation=0.20),
+    Scenario('rate_+2', rate_shift=2.0),
+    Scenario('rate_+5', rate_shift=5.0),
+    Scenario('kkb_-75', kkb_drift=-75, kkb_volatility=40),
+    Scenario('severe', income_shock=-0.20, income_volatility=0.15, expense_inflation=0.25,
+             rate_shift=5.0, kkb_drift=-75, kkb_volatility=40, job_loss_rate=0.08),
+)
+
+def engine_at_rate(engine: Any, annual_rate: float) -> Any:
+    """Shallow copy of the engine with its interest rate (and annuity table) replaced"""
+    shocked = copy.copy(engine)
+    shocked.annual_rate = annual_rate
+    shocked.monthly_rate = annual_rate / 100 / 12
+    shocked.annuity = AnnuityFactorTable(shocked.monthly_rate)
+    return shocked
+
+def _net_income(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    return columns['monthly_income'] + columns['additional_income'] - columns['expenses'] - columns['rent_payment']
+
+def shock_columns(columns: Dict[str, np.ndarray], scenario: Scenario, simulations: int,
+                  rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """The portfolio repeated simulations times (simulation-major) with the scenario's shocks applied
+
+    An input debt_to_income_ratio stands for a fixed monthly debt payment:
+    it is rescaled to the shocked net income rather than shrinking with it.
+    """
+    size = columns['loan_amount'].size * simulations
+    shocked = {field: np.tile(column, simulations) for field, column in columns.items()}
+    monthly_debt = np.maximum(0.0, _net_income(shocked)) * shocked['debt_to_income_ratio']
+
+    income_factor = np.full(size, 1.0 + scenario.income_shock)
+    if scenario.income_volatility:
+        sigma = scenario.income_volatility
+        income_factor *= rng.lognormal(-sigma * sigma / 2, sigma, size)
+    monthly_income = shocked['monthly_income'] * income_factor
+    if scenario.job_loss_rate:
+        monthly_income[rng.random(size) < scenario.job_loss_rate] = 0.0
+    shocked['monthly_income'] = monthly_income
+    shocked['additional_income'] = shocked['additional_income'] * income_factor
+
+    if scenario.expense_inflation:
+        shocked['expenses'] = shocked['expenses'] * (1.0 + scenario.expense_inflation)
+        shocked['rent_payment'] = shocked['rent_payment'] * (1.0 + scenario.expense_inflation)
+
+    if scenario.kkb_drift or scenario.kkb_volatility:
+        kkb = shocked['kkb_score'] + scenario.kkb_drift
+        if scenario.kkb_volatility:
+            kkb = kkb + rng.normal(0.0, scenario.kkb_volatility, size)
+        shocked['kkb_score'] = np.clip(kkb, KKB_MIN, KKB_MAX)
+
+    # NaN (no input DTI) stays NaN; without net income the engine ignores the ratio
+    net_income = _net_income(shocked)
+    ratio = np.where(np.isnan(monthly_debt), np.nan, 0.0)
+    shocked['debt_to_income_ratio'] = np.divide(monthly_debt, net_income, out=ratio, where=net_income > 0)
+    return shocked
+
+class Histogram:
+    """Fixed-width bins over [low, high) for a streaming mean and quantiles
+
+    Values outside the range are counted in the first or last bin, which
+    then stretch to the observed minimum or maximum.
+    """
+
+    def __init__(self, low: float, high: float, width: float):
+        self.low = low
+        self.width = width
+        self.counts = np.zeros(int(round((high - low) / width)), dtype=np.int64)
+        self.total = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    def add(self, values: np.ndarray):
+        if not values.size:
+            return
+        index = np.clip(np.floor((values - self.low) / self.width), 0, self.counts.size - 1).astype(np.int64)
+        self.counts += np.bincount(index, minlength=self.counts.size)
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    def quantiles(self) -> Dict[str, float]:
+        """Mean and QUANTILES, taking the values of a bin as spread evenly across it"""
+        n = int(self.counts.sum())
+        result = {'mean': round(self.total / n, 4)}
+        cumulative = np.cumsum(self.counts)
+        last = self.counts.size - 1
+        for q in QUANTILES:
+            rank = q * (n - 1)
+            i = int(np.searchsorted(cumulative, rank, side='right'))
+            start = self.low + i * self.width
+            stop = start + self.width
+            if i == 0:
+                start = min(start, self.minimum)
+            if i == last:
+                stop = max(stop, self.maximum)
+            position = (rank - (cumulative[i - 1] if i else 0) + 0.5) / self.counts[i]
+            value = min(max(start + position * (stop - start), self.minimum), self.maximum)
+            result[f'p{round(q * 100):02d}'] = round(value, 4)
+        return result
+
+def simulate_scenario(engine: Any, columns: Dict[str, np.ndarray], scenario: Scenario,
+                      seed: np.random.SeedSequence, simulations: int = DEFAULT_SIMULATIONS,
+                      chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, Any]:
+    """Decision mix, score and DTI distributions of one scenario over the portfolio columns"""
+    started = time.perf_counter()
+    portfolio_size = columns['loan_amount'].size
+    simulations = simulations if scenario.stochastic else 1
+    if scenario.rate_shift:
+        engine = engine_at_rate(engine, engine.annual_rate + scenario.rate_shift)
+    rng = np.random.default_rng(seed)
+
+    scores, dtis = Histogram(*SCORE_BINS), Histogram(*DTI_BINS)
+    counts = dict.fromkeys(DECISIONS, 0)
+    approval_by_simulation = []
+    per_chunk = max(1, chunk_rows // max(portfolio_size, 1))
+    for done in range(0, simulations, per_chunk):
+        chunk = min(per_chunk, simulations - done)
+        result = score_columns(engine, shock_columns(columns, scenario, chunk, rng))
+        decision = result['decision']
+        for name in DECISIONS:
+            counts[name] += int(np.count_nonzero(decision == name))
+        approved = (decision == "APPROVE").reshape(chunk, portfolio_size)
+        approval_by_simulation.append(approved.mean(axis=1))
+        scores.add(result['score'])
+        dtis.add(result['calculations']['new_dti'])
+
+    pairs = simulations * portfolio_size
+    approval_by_simulation = np.concatenate(approval_by_simulation)
+    return {
+        'scenario': scenario.to_dict(),
+        'simulations': simulations,
+        'pairs': pairs,
+        'decision_mix': {name: round(count / pairs, 4) for name, count in counts.items()},
+        'approval_rate': round(counts["APPROVE"] / pairs, 4),
+        'approval_rate_range': {
+            'p05': round(float(np.quantile(approval_by_simulation, 0.05)), 4),
+            'p95': round(float(np.quantile(approval_by_simulation, 0.95)), 4)
+        },
+        'score': scores.quantiles(),
+        'new_dti': dtis.quantiles(),
+        'annual_rate': engine.annual_rate,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+def run_stress_test(portfolio: Batch, scenarios: Sequence[Scenario] = DEFAULT_SCENARIOS, seed: int = 42,
+                    simulations: int = DEFAULT_SIMULATIONS, workers: int = 1, engine: Any = None,
+                    chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, Any]:
+    """Simulate every scenario over the portfolio; workers > 1 runs scenarios in a process pool
+
+    Each scenario also reports its approval rate change against the
+    unshocked portfolio, in percentage points.
+    """
+    if engine is None:
+        from models.advanced_scoring import AdvancedCreditScoringEngine
+        engine = AdvancedCreditScoringEngine()
+    columns = to_columns(portfolio)
+    if not columns['loan_amount'].size:
+        raise ValueError("Portfolio is empty")
+    seeds = np.random.SeedSequence(seed).spawn(len(scenarios))
+
+    started = time.perf_counter()
+    base = score_columns(engine, columns)
+    base_approval = float(np.count_nonzero(base['decision'] == "APPROVE")) / columns['loan_amount'].size
+
+    if workers > 1 and len(scenarios) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(scenarios))) as pool:
+            futures = [pool.submit(simulate_scenario, engine, columns, scenario, child, simulations, chunk_rows)
+                       for scenario, child in zip(scenarios, seeds)]
+            results = [future.result() for future in futures]
+    else:
+        results = [simulate_scenario(engine, columns, scenario, child, simulations, chunk_rows)
+                   for scenario, child in zip(scenarios, seeds)]
+
+    for result in results:
+        result['approval_rate_change_pp'] = round((result['approval_rate'] - base_approval) * 100, 2)
+    elapsed = time.perf_counter() - started
+    pairs = sum(result['pairs'] for result in results)
+    return {
+        'portfolio_size': int(columns['loan_amount'].size),
+        'seed': seed,
+        'base_approval_rate': round(base_approval, 4),
+        'scenarios': results,
+        'pairs': pairs,
+        'seconds': round(elapsed, 3),
+        'pairs_per_second': round(pairs / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+def load_scenarios(path: str) -> List[Scenario]:
+    """Scenarios from a JSON list of specs ({"name": ..., "income_shock": ..., ...})"""
+    with open(path, encoding='utf-8') as f:
+        return [Scenario.from_spec(spec) for spec in json.load(f)]
+
+if __name__ == '__main__':
+    import argparse
+
+    from score_portfolio import read_records
+
+    parser = argparse.ArgumentParser(description="Stress test a portfolio under shock scenarios")
+    parser.add_argument('input', help="Applications as CSV (header row) or NDJSON")
+    parser.add_argument('--scenarios', help="JSON list of scenarios (default: the built-in set)")
+    parser.add_argument('--simulations', type=int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=1, help="Processes, one scenario per task")
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(args.scenarios) if args.scenarios else DEFAULT_SCENARIOS
+    report = run_stress_test(list(read_records(args.input)), scenarios, args.seed, args.simulations, args.workers)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,130 @@
+# Versioned threshold tables for tiered scoring rules
+#
+# A table maps a value to the tier it falls in. "bounds" are ascending
+# breakpoints and "values" holds one entry per tier (len(bounds) + 1):
+#
+#   closed "left":  tiers are (-inf, b0), [b0, b1), ..., [bn, inf)  -- "x >= b" ladders
+#   closed "right": tiers are (-inf, b0], (b0, b1], ..., (bn, inf)  -- "x <= b" ladders
+#
+# A value is a constant (number, string or object) or a linear piece
+# {"linear": {"intercept", "origin", "slope", "divisor", "min", "max"}} that
+# evaluates clamp(intercept + (x - origin) * slope / divisor). Lookups are a
+# bisect (scalar) or searchsorted (batch), so their cost does not grow
+# with the number of tiers.
+import json
+import os
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TIERS_PATH = os.path.join(os.path.dirname(MODELS_DIR), 'data', 'score_tiers.json')
+# Alternative tier file, so risk policy can retune bands without a code change
+TIERS_ENV = 'FINIS_SCORE_TIERS'
+
+class LinearPiece:
+    """clamp(intercept + (x - origin) * slope / divisor, min, max)"""
+
+    __slots__ = ('intercept', 'origin', 'slope', 'divisor', 'lo', 'hi')
+
+    def __init__(self, intercept: float = 0, origin: float = 0, slope: float = 1, divisor: float = 1,
+                 min: Optional[float] = None, max: Optional[float] = None):
+        self.intercept = intercept
+        self.origin = origin
+        self.slope = slope
+        self.divisor = divisor
+        self.lo = min
+        self.hi = max
+
+    def __call__(self, x: float) -> float:
+        value = self.intercept + (x - self.origin) * self.slope / self.divisor
+        if self.lo is not None and value < self.lo:
+            value = self.lo
+        if self.hi is not None and value > self.hi:
+            value = self.hi
+        return value
+
+    def apply_many(self, x: np.ndarray) -> np.ndarray:
+        value = self.intercept + (x - self.origin) * self.slope / self.divisor
+        return np.clip(value, self.lo, self.hi) if self.lo is not None or self.hi is not None else value
+
+class TierTable:
+    """One compiled threshold table"""
+
+    __slots__ = ('name', 'bounds', 'values', 'closed', '_find')
+
+    def __init__(self, name: str, bounds: List[float], values: List[Any], closed: str = 'left'):
+        if closed not in ('left', 'right'):
+            raise ValueError(f"Tier table {name}: closed must be 'left' or 'right'")
+        if len(values) != len(bounds) + 1:
+            raise ValueError(f"Tier table {name}: needs len(bounds) + 1 values")
+        if any(a >= b for a, b in zip(bounds, bounds[1:])):
+            raise ValueError(f"Tier table {name}: bounds must be strictly ascending")
+        self.name = name
+        self.bounds = tuple(bounds)
+        self.values = tuple(_compile_value(value) for value in values)
+        self.closed = closed
+        # bisect_right puts a bound into the tier above it, bisect_left into the one below
+        self._find = bisect_right if closed == 'left' else bisect_left
+
+    @classmethod
+    def from_spec(cls, name: str, spec: Dict[str, Any]) -> 'TierTable':
+        return cls(name, spec['bounds'], spec['values'], spec.get('closed', 'left'))
+
+    def tier(self, x: float) -> int:
+        return self._find(self.bounds, x)
+
+    def lookup(self, x: float) -> Any:
+        value = self.values[self._find(self.bounds, x)]
+        return value(x) if value.__class__ is LinearPiece else value
+
+    __call__ = lookup
+
+    def lookup_many(self, x: Any) -> np.ndarray:
+        """Vectorized lookup for numeric tables: one searchsorted over the whole column"""
+        x = np.asarray(x, dtype=np.float64)
+        side = 'right' if self.closed == 'left' else 'left'
+        tiers = np.searchsorted(np.asarray(self.bounds, dtype=np.float64), x, side=side)
+        constants = np.array([np.nan if value.__class__ is LinearPiece else value for value in self.values],
+                             dtype=np.float64)
+        result = constants[tiers]
+        for index, value in enumerate(self.values):
+            if value.__class__ is LinearPiece:
+                mask = tiers == index
+                result[mask] = value.apply_many(x[mask])
+        return result
+
+class TierTables:
+    """A versioned set of named tier tables"""
+
+    def __init__(self, version: str, tables: Dict[str, TierTable], source: str = None):
+        self.version = version
+        self.tables = tables
+        self.source = source
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any], source: str = None) -> 'TierTables':
+        tables = {name: TierTable.from_spec(name, table) for name, table in spec['tables'].items()}
+        return cls(str(spec['version']), tables, source)
+
+    def __getitem__(self, name: str) -> TierTable:
+        return self.tables[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {'version': self.version, 'tables': len(self.tables), 'source': self.source}
+
+def _compile_value(value: Any) -> Any:
+    if isinstance(value, dict) and 'linear' in value:
+        return LinearPiece(**value['linear'])
+    return value
+
+@lru_cache(maxsize=None)
+def _load(path: str) -> TierTables:
+    with open(path, encoding='utf-8') as f:
+        return TierTables.from_spec(json.load(f), source=os.path.basename(path))
+
+def load_tier_tables(path: str = None) -> TierTables:
+    """Tier tables from path, $FINIS_SCORE_TIERS or data/score_tiers.json (parsed once per file)"""
+    return _load(os.path.abspath(path or os.environ.get(TIERS_ENV) or DEFAULT_TIERS_PATH))
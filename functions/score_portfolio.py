@@ -0,0 +1,319 @@
+# Offline portfolio scoring with AdvancedCreditScoringEngine
+#
+#   python score_portfolio.py applications.csv decisions.ndjson --workers 8
+#   python score_portfolio.py applications.csv decisions.ndjson --workers 8 --executor thread
+#   python score_portfolio.py applications.ndjson decisions.csv --resume
+#   python score_portfolio.py applications.csv decisions.ndjson --components data/components
+#
+# Input and output are streamed in chunks, so memory stays bounded by
+# chunk_size x in-flight chunks regardless of file size. Output order
+# follows input order; a checkpoint next to the output records how many
+# rows are safely written so an interrupted run can continue with --resume.
+# Rows the engine cannot read (say, text in a numeric field) get an ERROR
+# record with the reason instead of stopping the run.
+# --components also stores every row's component scores for rescoring
+# under new weights (models/rescoring.py). Workers are processes by default
+# and threads sharing one engine on free-threaded builds (utils/parallel.py).
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+from models.advanced_scoring import AdvancedCreditScoringEngine
+from models.batch_scoring import FIELDS, to_columns
+from models.rescoring import ComponentStoreWriter, component_arrays
+from utils.parallel import gil_enabled
+
+DEFAULT_CHUNK_SIZE = 10_000
+ID_FIELDS = ('application_id', 'id')
+
+CALCULATION_FIELDS = ('net_income', 'current_monthly_debt_payment', 'new_installment', 'new_dti',
+                      'credit_utilization', 'liquidity_ratio', 'collateral_factor')
+OUTPUT_FIELDS = ('row', 'id', 'decision', 'score', 'max_approved_amount',
+                 'recommended_term_months') + CALCULATION_FIELDS + ('error',)
+
+FIELD_KINDS = {field: kind for field, _, kind in FIELDS}
+TRUE_VALUES = ('1', 'true', 'yes', 'evet')
+
+def _parse_csv_value(value: str, kind: str) -> Any:
+    """CSV cells are text: parse flags explicitly, leave numbers to the column conversion"""
+    if kind == 'bool':
+        return value.strip().lower() in TRUE_VALUES
+    return value
+
+def _csv_records(f) -> Iterator[Dict[str, Any]]:
+    for row in csv.DictReader(f):
+        # Empty cells fall back to the engine defaults, like missing JSON keys
+        yield {
+            key: _parse_csv_value(value, FIELD_KINDS.get(key, 'str'))
+            for key, value in row.items()
+            if key is not None and value not in ('', None)
+        }
+
+def _ndjson_records(f) -> Iterator[Dict[str, Any]]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream application records from a CSV (header row) or NDJSON file"""
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = _csv_records if path.lower().endswith('.csv') else _ndjson_records
+        yield from reader(f)
+
+def chunked(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+_engine = None
+
+def _init_worker():
+    global _engine
+    _engine = AdvancedCreditScoringEngine()
+
+def _record_id(record: Any) -> Any:
+    if not isinstance(record, dict):
+        return None
+    return next((record[f] for f in ID_FIELDS if f in record), None)
+
+def _columns_or_error(records: List[Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(columns, None) for records the batch scorer can read, (None, reason) otherwise"""
+    try:
+        columns = to_columns(records)
+    except (AttributeError, TypeError, ValueError) as error:
+        return None, str(error)
+    for field, column in columns.items():
+        if column.shape != (len(records),):
+            return None, f"{field} is not a single value"
+    return columns, None
+
+def record_error(record: Any) -> Optional[str]:
+    """Why the batch scorer cannot read one record, or None when it can"""
+    if not isinstance(record, dict):
+        return "Record is not an object"
+    return _columns_or_error([record])[1]
+
+def score_chunk(start_row: int, chunk: List[Dict[str, Any]], with_components: bool = False) -> Any:
+    """Score one chunk and flatten the columnar result into output rows
+
+    When the chunk does not convert as a whole, its records are checked one
+    at a time: unreadable ones become ERROR rows and the rest are scored.
+    with_components returns (rows, component store columns of the scored
+    rows) instead; the columns are None when no row could be scored.
+    """
+    if _engine is None:
+        _init_worker()
+    errors = {}
+    batch, _ = _columns_or_error(chunk)
+    if batch is None:
+        errors = {i: error for i, error in enumerate(map(record_error, chunk)) if error is not None}
+        batch = [record for i, record in enumerate(chunk) if i not in errors]
+    scored = [i for i in range(len(chunk)) if i not in errors]
+    if not scored:
+        rows = [_error_row(start_row + i, record, errors[i]) for i, record in enumerate(chunk)]
+        return (rows, None) if with_components else rows
+    result = _engine.score_applications(batch)
+    limits = result["limits"]
+    calculations = result["calculations"]
+
+    columns = {
+        'decision': result["decision"].tolist(),
+        'score': result["score"].tolist(),
+        'max_approved_amount': limits["max_approved_amount"].tolist(),
+        'recommended_term_months': limits["recommended_term_months"].tolist(),
+    }
+    for field in CALCULATION_FIELDS:
+        columns[field] = calculations[field].tolist()
+
+    rows = [None] * len(chunk)
+    for i, error in errors.items():
+        rows[i] = _error_row(start_row + i, chunk[i], error)
+    for position, i in enumerate(scored):
+        record = chunk[i]
+        row = {'row': start_row + i, 'id': _record_id(record)}
+        for field, values in columns.items():
+            row[field] = values[position]
+        rows[i] = row
+    if with_components:
+        return rows, component_arrays(result, [start_row + i for i in scored])
+    return rows
+
+def _error_row(row: int, record: Any, error: str) -> Dict[str, Any]:
+    return {'row': row, 'id': _record_id(record), 'decision': 'ERROR', 'error': error}
+
+def _csv_cell(value: Any) -> str:
+    text = str(value)
+    if any(c in text for c in ',"\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+class PortfolioWriter:
+    """Output stream (NDJSON or CSV) with a checkpoint of rows already written"""
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint'
+        self.is_csv = path.lower().endswith('.csv')
+        self.rows_done = 0
+        # Rows in the --components store; error rows have none
+        self.component_rows = 0
+
+        offset = 0
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            self.rows_done = checkpoint['rows_done']
+            offset = checkpoint['output_bytes']
+            self.component_rows = checkpoint.get('component_rows', self.rows_done)
+
+        self.file = open(path, 'r+b' if offset else 'wb')
+        # Drop anything written after the last checkpoint
+        self.file.seek(offset)
+        self.file.truncate()
+        if self.is_csv and not offset:
+            self.file.write((','.join(OUTPUT_FIELDS) + '\n').encode('utf-8'))
+
+    def _write_csv_rows(self, rows: List[Dict[str, Any]]):
+        lines = []
+        for row in rows:
+            lines.append(','.join('' if row.get(f) is None else _csv_cell(row[f]) for f in OUTPUT_FIELDS))
+        self.file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if self.is_csv:
+            self._write_csv_rows(rows)
+        else:
+            self.file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows).encode('utf-8'))
+        self.rows_done += len(rows)
+
+    def checkpoint(self, component_rows: int = 0):
+        """Make written rows durable, then record them (atomic replace)"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.component_rows = component_rows
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'rows_done': self.rows_done, 'output_bytes': self.file.tell(),
+                       'component_rows': component_rows}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self, completed: bool):
+        self.file.close()
+        if completed and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+def _scored_chunks(chunks: Iterator[Tuple[int, List[Dict[str, Any]]]], workers: int,
+                   max_in_flight: int, with_components: bool = False, executor: str = 'process') -> Iterator[Any]:
+    """Score chunks in input order, keeping at most max_in_flight chunks in memory"""
+    if workers <= 1:
+        for start_row, chunk in chunks:
+            yield score_chunk(start_row, chunk, with_components)
+        return
+
+    if executor == 'thread':
+        # One engine shared by every thread instead of one per process
+        _init_worker()
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    with pool:
+        pending = []
+        for start_row, chunk in chunks:
+            pending.append(pool.submit(score_chunk, start_row, chunk, with_components))
+            if len(pending) >= max_in_flight:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+def score_portfolio(input_path: str, output_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    workers: int = None, resume: bool = False, progress: bool = True,
+                    components_path: str = None, executor: str = None) -> Dict[str, Any]:
+    """Stream input_path through the engine into output_path; returns run statistics
+
+    executor picks 'process' or 'thread' workers; None uses threads only
+    when the GIL is off.
+    """
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if executor is None:
+        executor = 'process' if gil_enabled() else 'thread'
+    if executor not in ('process', 'thread'):
+        raise ValueError(f"Unknown executor: {executor}")
+    writer = PortfolioWriter(output_path, resume)
+    skipped = writer.rows_done
+    # Resuming cuts the component store back to the checkpointed rows as well
+    components = ComponentStoreWriter(components_path, AdvancedCreditScoringEngine(),
+                                      resume_rows=writer.component_rows) if components_path else None
+    records = islice(read_records(input_path), skipped, None)
+
+    def numbered_chunks():
+        start_row = skipped
+        for chunk in chunked(records, chunk_size):
+            yield start_row, chunk
+            start_row += len(chunk)
+
+    started = time.perf_counter()
+    completed = False
+    errors = 0
+    try:
+        for scored in _scored_chunks(numbered_chunks(), workers, max_in_flight=2 * max(workers, 1),
+                                     with_components=components is not None, executor=executor):
+            if components is not None:
+                rows, arrays = scored
+                if arrays is not None:
+                    components.write(arrays)
+                    components.flush()
+            else:
+                rows = scored
+            writer.write(rows)
+            errors += sum(1 for row in rows if row['decision'] == 'ERROR')
+            writer.checkpoint(components.rows if components is not None else 0)
+            if progress:
+                scored = writer.rows_done - skipped
+                elapsed = time.perf_counter() - started
+                print(f"\r{writer.rows_done} rows written ({scored / elapsed:,.0f} rows/s)",
+                      end='', file=sys.stderr, flush=True)
+        completed = True
+    finally:
+        writer.close(completed)
+        if components is not None:
+            components.close()
+        if progress:
+            print(file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': writer.rows_done,
+        'resumed_from': skipped,
+        'errors': errors,
+        'executor': executor if workers > 1 else 'in-process',
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round((writer.rows_done - skipped) / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score a portfolio file with the advanced scoring engine")
+    parser.add_argument('input_path', help="Applications as CSV (header row) or NDJSON")
+    parser.add_argument('output_path', help="Decisions as NDJSON, or CSV when the name ends in .csv")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes or threads (default: CPU count, 1 = in-process)")
+    parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint next to the output file")
+    parser.add_argument('--quiet', action='store_true', help="No progress output")
+    parser.add_argument('--components', help="Also store component scores in this directory for rescoring")
+    parser.add_argument('--executor', choices=('process', 'thread'), default=None,
+                        help="Worker kind (default: threads when the GIL is off, processes otherwise)")
+    args = parser.parse_args()
+
+    stats = score_portfolio(args.input_path, args.output_path, args.chunk_size, args.workers,
+                            args.resume, progress=not args.quiet, components_path=args.components,
+                            executor=args.executor)
+    print(json.dumps(stats), file=sys.stderr)
@@ -0,0 +1,9 @@
+# Tests import the function modules the way the runtime does, from functions/
+import os
+import sys
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FUNCTIONS_DIR)
+
+# Keep the decision audit off Firestore while main is imported by tests
+os.environ.setdefault('FINIS_AUDIT_SINK', 'memory')
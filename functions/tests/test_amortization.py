@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pytest
+from firebase_functions import https_fn
+from werkzeug.test import EnvironBuilder
+
+import main
+from models.amortization import open_schedule_store, schedule_columns, write_schedules
+from models.annuity import AnnuityFactorTable, amortization_schedule, annuity_factor, annuity_payment, effective_annual_rate
+
+RATE = 4.09 / 100 / 12
+
+@pytest.fixture(scope='module')
+def engine():
+    return main.CreditDecisionEngine()
+
+def test_loan_details_report_the_compounded_rate_and_the_rounded_installment(engine):
+    record = main.APPLICATION_SCHEMA.decode({'loan_amount': 150000, 'loan_term_months': 36})
+    details = engine._calculate_loan_details(record, {})
+    assert details['effective_annual_rate'] == 4.17
+    assert details['effective_annual_rate'] == round(effective_annual_rate(RATE) * 100, 2)
+    assert details['monthly_payment'] == round(annuity_payment(150000.0, RATE, 36), 2) == 4434.61
+    rows = list(amortization_schedule(150000.0, RATE, 36))
+    assert details['total_payment'] == round(sum(row['payment'] for row in rows), 2)
+    assert details['total_interest'] == round(sum(row['interest'] for row in rows), 2)
+
+@pytest.mark.parametrize('amount, term', [(150000, 36), (1000, 3), (2000000, 240), (12345.67, 17), (99999, 120)])
+def test_loan_details_totals_match_the_schedule(engine, amount, term):
+    record = main.APPLICATION_SCHEMA.decode({'loan_amount': amount, 'loan_term_months': term})
+    details = engine._calculate_loan_details(record, {})
+    rows = list(amortization_schedule(float(amount), RATE, term))
+    assert details['monthly_payment'] == rows[0]['payment']
+    assert details['total_payment'] == round(sum(row['payment'] for row in rows), 2)
+    assert details['total_interest'] == round(sum(row['interest'] for row in rows), 2)
+
+def test_annuity_table_serves_the_memoized_factors_and_counts_only_fallbacks():
+    table = AnnuityFactorTable(RATE)
+    assert [table.factor(n) for n in range(3, 241)] == [annuity_factor(RATE, n) for n in range(3, 241)]
+    assert table.stats()['misses'] == 0
+    assert table.factor(300) == annuity_factor(RATE, 300)
+    assert table.factor(36, 0.01) == annuity_factor(0.01, 36)
+    assert table.stats()['misses'] == 2
+
+@pytest.mark.parametrize('amount, term', [(150000.0, 36), (1000.0, 3), (2000000.0, 240), (12345.67, 17)])
+def test_schedule_repays_the_principal_to_the_kurus(amount, term):
+    rows = list(amortization_schedule(amount, RATE, term))
+    payment = round(annuity_payment(amount, RATE, term), 2)
+
+    assert [row['month'] for row in rows] == list(range(1, term + 1))
+    assert all(row['payment'] == payment for row in rows[:-1])
+    assert abs(rows[-1]['payment'] - payment) < 0.01 * term
+    assert rows[-1]['balance'] == 0.0
+    assert round(sum(row['principal'] for row in rows), 2) == round(amount, 2)
+    for row in rows:
+        assert row['payment'] == round(row['interest'] + row['principal'], 2)
+
+def test_zero_rate_schedule_splits_the_principal_evenly():
+    rows = list(amortization_schedule(1000.0, 0.0, 3))
+    assert [row['payment'] for row in rows] == [333.33, 333.33, 333.34]
+    assert all(row['interest'] == 0.0 for row in rows)
+
+@pytest.mark.parametrize('rate', [RATE, 0.0])
+def test_batch_schedules_match_the_generator_row_for_row(rate):
+    amounts = [150000.0, 1000.0, 87500.5, 640000.0]
+    terms = [36, 3, 240, 1]
+    columns = schedule_columns(amounts, rate, terms)
+    expected = [row for amount, term in zip(amounts, terms) for row in amortization_schedule(amount, rate, term)]
+
+    assert columns['loan'].tolist() == [i for i, term in enumerate(terms) for _ in range(term)]
+    for field in ('month', 'payment', 'interest', 'principal', 'balance'):
+        assert columns[field].tolist() == [row[field] for row in expected]
+
+def test_schedule_store_numbers_loans_across_chunks(tmp_path):
+    loans = [{'loan_amount': 10000 * (i + 1), 'loan_term_months': 12 + i} for i in range(5)]
+    stats = write_schedules(loans, str(tmp_path / 'schedules'), RATE, chunk_size=2)
+    store = open_schedule_store(str(tmp_path / 'schedules'))
+
+    assert stats == {'path': str(tmp_path / 'schedules'), 'loans': 5, 'rows': sum(12 + i for i in range(5))}
+    assert np.unique(np.asarray(store['loan'])).tolist() == [0, 1, 2, 3, 4]
+    last = np.asarray(store['loan']) == 4
+    assert np.asarray(store['payment'])[last].tolist() == [row['payment'] for row in amortization_schedule(50000, RATE, 16)]
+
+def test_loan_schedule_endpoint_streams_one_line_per_month():
+    request = https_fn.Request(EnvironBuilder(method='POST', json={'loan_amount': 150000, 'loan_term_months': 36}).get_environ())
+    response = main.loan_schedule(request)
+    lines = response.get_data(as_text=True).splitlines()
+    assert response.status_code == 200
+    assert [json.loads(line) for line in lines] == list(amortization_schedule(150000.0, RATE, 36))
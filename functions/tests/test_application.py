@@ -0,0 +1,61 @@
+import pytest
+
+from models.application import APPLICATION_SCHEMA, ApplicationSchema, ApplicationValidationError
+from utils.security import SecurityValidator
+
+@pytest.mark.parametrize('value, expected', [(36, 36), ('36', 36), ('36.0', 36), (36.0, 36), (' 36 ', 36)])
+def test_int_fields_accept_whole_numbers_in_any_notation(value, expected):
+    record = APPLICATION_SCHEMA.decode({'loan_term_months': value})
+    assert record.loan_term_months == expected
+    assert type(record.loan_term_months) is int
+
+@pytest.mark.parametrize('value', ['36.5', 36.5, 'otuz altı', float('nan'), float('inf'), [36]])
+def test_int_fields_reject_fractions_and_non_numbers(value):
+    record, errors = APPLICATION_SCHEMA.validate({'loan_term_months': value})
+    assert record is None
+    assert errors == ['loan_term_months must be a valid number']
+
+@pytest.mark.parametrize('field, low, high', [
+    ('loan_amount', 1000, 2000000),
+    ('loan_term_months', 3, 240),
+    ('monthly_income', 0, 1000000),
+    ('age', 18, 80),
+    ('work_experience', 0, 50),
+    ('kkb_score', 300, 900),
+    ('debt_to_income_ratio', 0, 5),
+])
+def test_ranges_include_their_bounds(field, low, high):
+    for value in (low, high):
+        record, errors = APPLICATION_SCHEMA.validate({field: value})
+        assert errors == [] and getattr(record, field) == value
+    below = low - 1 if isinstance(low, int) and field != 'debt_to_income_ratio' else low - 0.01
+    for value in (below, high + 1):
+        record, errors = APPLICATION_SCHEMA.validate({field: value})
+        assert record is None
+        assert errors == [f'{field} must be between {low} and {high}']
+
+def test_missing_and_null_fields_take_defaults_without_range_checks():
+    record, errors = APPLICATION_SCHEMA.validate({'loan_amount': None})
+    assert errors == []
+    assert record.loan_amount == 0.0 and record.age == 30 and record.debt_to_income_ratio is None
+    assert 'loan_amount' not in record
+
+def test_every_error_is_reported_in_one_pass():
+    with pytest.raises(ApplicationValidationError) as error:
+        APPLICATION_SCHEMA.decode({'age': 17, 'kkb_score': 950, 'loan_term_months': '12.5'})
+    assert error.value.errors == ['loan_term_months must be a valid number',
+                                  'age must be between 18 and 80',
+                                  'kkb_score must be between 300 and 900']
+
+def test_required_fields_and_non_object_bodies():
+    schema = ApplicationSchema(required=('loan_amount', 'kkb_score'))
+    assert schema.validate({'loan_amount': 5000}) == (None, ['Missing required field: kkb_score'])
+    assert schema.validate([1, 2]) == (None, ['Request body must be a JSON object'])
+
+def test_request_validation_accepts_float_notation_for_whole_numbers():
+    result = SecurityValidator().validate_request_data({
+        'loan_amount': '150000', 'loan_term_months': '36.0', 'monthly_income': 22000,
+        'debt_to_income_ratio': 0.2, 'kkb_score': '720'
+    })
+    assert result['valid'], result['errors']
+    assert result['sanitized_data']['loan_term_months'] == 36
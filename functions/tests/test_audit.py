@@ -0,0 +1,86 @@
+import json
+import logging
+
+import pytest
+from firebase_functions import https_fn
+from werkzeug.test import EnvironBuilder
+
+import main
+from benchmarks.synthetic import generate_applications
+from utils.audit import AuditWriter, MemorySink, decision_document
+
+@pytest.fixture(scope='module')
+def entries():
+    applications = generate_applications(25, seed=31)
+    return [(1_700_000_000.0 + i, application, main._encoded_decision(application)[0], False)
+            for i, application in enumerate(applications)]
+
+def test_every_submitted_record_is_written_once(entries):
+    sink = MemorySink()
+    writer = AuditWriter(sink, batch_size=10, flush_interval=5.0)
+    assert all(writer.submit(entry) for entry in entries)
+    assert writer.flush(timeout=10)
+    stats = writer.close()
+
+    assert stats['submitted'] == stats['written'] == len(entries)
+    assert stats['dropped'] == stats['rejected'] == stats['queued'] == 0
+    assert len(sink.documents) == len(entries)
+    assert max(sink.writes) <= 10
+    decisions = sorted(document['decision'] for document in sink.documents.values())
+    assert decisions == sorted(json.loads(body)['decision'] for _, _, body, _ in entries)
+
+def test_failed_writes_are_retried_without_duplicates(entries):
+    sink = MemorySink(failures=2)
+    writer = AuditWriter(sink, batch_size=50, retry_backoff=0.001)
+    for entry in entries:
+        writer.submit(entry)
+    assert writer.flush(timeout=10)
+    stats = writer.close()
+
+    assert stats['retries'] == 2
+    assert stats['written'] == len(entries) == len(sink.documents)
+
+def test_unbuildable_records_are_rejected_and_the_rest_written(entries):
+    sink = MemorySink()
+    writer = AuditWriter(sink, batch_size=50)
+    writer.submit((0.0, {}, 'not json', False))
+    for entry in entries[:5]:
+        writer.submit(entry)
+    assert writer.flush(timeout=10)
+    stats = writer.close()
+    assert (stats['rejected'], stats['written']) == (1, 5)
+
+def test_records_that_cannot_be_queued_are_logged(entries, caplog):
+    sink = MemorySink(latency=0.2)
+    writer = AuditWriter(sink, max_queue=2, batch_size=1, flush_interval=0.0, block_timeout=0.0,
+                         logger=logging.getLogger('finis.audit.test'))
+    with caplog.at_level(logging.ERROR, logger='finis.audit.test'):
+        accepted = [writer.submit(entry) for entry in entries[:10]]
+        stats = writer.close(timeout=5)
+    assert stats['dropped'] == accepted.count(False) > 0
+    assert stats['written'] == accepted.count(True)
+    dropped = [record for record in caplog.records if record.getMessage().startswith('Audit queue full')]
+    assert len(dropped) == stats['dropped']
+    assert not writer.submit(entries[0])
+
+def test_documents_store_the_decoded_application(entries):
+    received_at, application, body, _ = entries[0]
+    document = decision_document(entries[0])
+    assert document['application']['loan_amount'] == float(application['loan_amount'])
+    assert document['response'] == json.loads(body)
+    assert document['received_at'].timestamp() == received_at
+    assert len(document['audit_id']) == 32
+
+def test_evaluate_credit_decisions_reach_the_audit_sink():
+    writer = main.get_audit_writer()
+    application = dict(generate_applications(1, seed=32)[0], application_id='audit-test')
+    before = writer.stats()['written']
+
+    request = https_fn.Request(EnvironBuilder(method='POST', json=application).get_environ())
+    response = main.evaluate_credit(request)
+    assert writer.flush(timeout=10)
+
+    assert response.status_code == 200
+    assert writer.stats()['written'] == before + 1
+    sent = json.loads(response.get_data(as_text=True))
+    assert [document['response'] for document in writer.sink.documents.values() if document['response'] == sent] == [sent]
@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_applications
+from models.advanced_scoring import AdvancedCreditScoringEngine
+from models.batch_scoring import FIELDS, to_columns
+
+@pytest.fixture(scope='module')
+def engine():
+    return AdvancedCreditScoringEngine()
+
+def _with_gaps(applications, seed=7):
+    """Copies with some fields set to None and others left out"""
+    rnd = random.Random(seed)
+    gapped = []
+    for application in applications:
+        application = dict(application)
+        for field, _, _ in FIELDS:
+            roll = rnd.random()
+            if roll < 0.15:
+                application[field] = None
+            elif roll < 0.25:
+                application.pop(field, None)
+        gapped.append(application)
+    return gapped
+
+def _assert_matches_scalar(engine, applications, result):
+    for i, application in enumerate(applications):
+        expected = engine.score_application(application)
+        assert result['score'][i] == expected['score'], i
+        assert result['decision'][i] == expected['decision'], i
+        assert result['limits']['max_approved_amount'][i] == expected['limits']['max_approved_amount'], i
+        assert result['calculations']['net_income'][i] == expected['calculations']['net_income'], i
+
+def test_nulls_and_missing_fields_score_like_the_scalar_path(engine):
+    applications = _with_gaps(generate_applications(500, seed=11))
+    with np.errstate(invalid='raise'):
+        result = engine.score_applications(applications)
+    _assert_matches_scalar(engine, applications, result)
+
+def test_null_columns_use_the_field_defaults(engine):
+    applications = _with_gaps(generate_applications(200, seed=12))
+    columns = {field: [application.get(field) for application in applications] for field, _, _ in FIELDS}
+    _assert_matches_scalar(engine, applications, engine.score_applications(columns))
+
+def test_explicit_nulls_do_not_become_nan():
+    columns = to_columns([{'expenses': None, 'payment_delays': None, 'employment_type': None}])
+    assert columns['expenses'][0] == 0.0
+    assert columns['payment_delays'][0] == 0
+    assert columns['employment_type'][0] == ''
+    assert np.isnan(columns['debt_to_income_ratio'][0])
+
+@pytest.mark.parametrize('value', [36, 36.0, '36', '36.0'])
+def test_int_fields_accept_whole_numbers_like_the_scalar_path(engine, value):
+    application = dict(generate_applications(1, seed=9)[0], loan_term_months=value)
+    scalar = engine.score_application(application)
+    for batch in ([application], {'loan_term_months': np.array([float(value)]), 'loan_amount': [application['loan_amount']]}):
+        assert to_columns(batch)['loan_term_months'].tolist() == [36]
+    assert engine.score_applications([application])['score'][0] == scalar['score']
+
+@pytest.mark.parametrize('value', [36.7, '36.7', float('nan'), float('inf')])
+def test_int_fields_reject_fractions_like_the_scalar_path(engine, value):
+    application = dict(generate_applications(1, seed=9)[0], loan_term_months=value)
+    with pytest.raises(ValueError, match='whole number|valid number'):
+        engine.score_application(application)
+    with pytest.raises(ValueError, match='whole number'):
+        engine.score_applications([application])
+    with pytest.raises(ValueError, match='whole number'):
+        to_columns({'loan_term_months': np.array([float(value)])})
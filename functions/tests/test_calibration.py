@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_applications
+from models.advanced_scoring import AdvancedCreditScoringEngine
+from models.calibration import DEFAULT_LGD, ThresholdCalibration, calibrate, threshold_grid
+
+def naive_metrics(scores, bad, exposure, approve, conditional, lgd=DEFAULT_LGD, weight=1.0):
+    """One threshold pair evaluated by masking every row, as a rescoring loop would"""
+    conditional = min(conditional, approve)
+    approved = [score >= approve for score in scores]
+    band = [conditional <= score < approve for score in scores]
+    booked_count = sum(approved) + weight * sum(band)
+    booked_bad = sum(b for b, a in zip(bad, approved) if a) + weight * sum(b for b, c in zip(bad, band) if c)
+    booked_exposure = (sum(e for e, a in zip(exposure, approved) if a)
+                       + weight * sum(e for e, c in zip(exposure, band) if c))
+    booked_bad_exposure = (sum(e for e, b, a in zip(exposure, bad, approved) if a and b)
+                           + weight * sum(e for e, b, c in zip(exposure, bad, band) if c and b))
+    approved_count = sum(approved)
+    return {
+        'approval_rate': approved_count / len(scores),
+        'conditional_rate': sum(band) / len(scores),
+        'booked_rate': booked_count / len(scores),
+        'bad_rate_approved': sum(b for b, a in zip(bad, approved) if a) / approved_count if approved_count else 0.0,
+        'bad_rate_booked': booked_bad / booked_count if booked_count else 0.0,
+        'expected_loss': lgd * booked_bad_exposure,
+        'loss_rate': lgd * booked_bad_exposure / booked_exposure if booked_exposure else 0.0
+    }
+
+@pytest.fixture(scope='module')
+def history():
+    rng = np.random.default_rng(51)
+    # Whole and half points so many scores sit exactly on a threshold
+    scores = np.round(rng.uniform(20, 100, 600) * 2) / 2
+    bad = rng.random(600) < (100 - scores) / 150
+    exposure = rng.uniform(5000, 500000, 600).round(2)
+    return scores, bad, exposure
+
+@pytest.mark.parametrize('weight', [1.0, 0.5, 0.0])
+def test_prefix_sums_match_a_naive_pass_per_threshold_pair(history, weight):
+    scores, bad, exposure = history
+    calibration = ThresholdCalibration(scores, bad, exposure, conditional_weight=weight)
+    thresholds = threshold_grid(2.5, 15, 100)
+    grid = calibration.grid(thresholds)
+
+    assert grid['approve_threshold'].size == thresholds.size * (thresholds.size + 1) // 2
+    for i in range(grid['approve_threshold'].size):
+        approve, conditional = grid['approve_threshold'][i], grid['conditional_threshold'][i]
+        expected = naive_metrics(scores.tolist(), bad.tolist(), exposure.tolist(), approve, conditional, weight=weight)
+        for field, value in expected.items():
+            assert grid[field][i] == pytest.approx(value, rel=1e-9, abs=1e-9), (approve, conditional, field)
+
+def test_a_conditional_threshold_above_approve_leaves_no_band(history):
+    scores, bad, exposure = history
+    calibration = ThresholdCalibration(scores, bad, exposure)
+    metrics = calibration.evaluate(70, 80)
+    assert float(metrics['conditional_threshold']) == 70
+    assert float(metrics['conditional_rate']) == 0.0
+    assert float(metrics['approval_rate']) == pytest.approx(np.mean(scores >= 70))
+
+def test_recommendation_is_the_best_pair_found_by_brute_force(history):
+    scores, bad, exposure = history
+    calibration = ThresholdCalibration(scores, bad, exposure)
+    thresholds = threshold_grid(5, 40, 100)
+    best = calibration.recommend(thresholds, max_bad_rate=0.1)
+
+    candidates = []
+    for conditional in thresholds:
+        for approve in thresholds[thresholds >= conditional]:
+            metrics = naive_metrics(scores.tolist(), bad.tolist(), exposure.tolist(), approve, conditional)
+            if metrics['bad_rate_booked'] <= 0.1:
+                # Remaining ties go to the first pair in grid order (conditional, then approve)
+                candidates.append((-metrics['booked_rate'], metrics['expected_loss'], conditional, approve))
+    _, _, conditional, approve = min(candidates)
+    assert (best['approve_threshold'], best['conditional_threshold']) == (approve, conditional)
+
+def test_calibrating_history_scores_it_with_the_engine():
+    engine = AdvancedCreditScoringEngine()
+    records = [dict(application, bad=index % 7 == 0) for index, application in enumerate(generate_applications(300, seed=52))]
+    result = calibrate(records, engine, step=5)
+
+    scores = engine.score_applications(records)['raw_score']
+    assert result['rows'] == 300
+    assert result['current']['approval_rate'] == round(float(np.mean(scores >= engine.approve_threshold)), 6)
+    assert result['pairs_evaluated'] == 21 * 22 // 2
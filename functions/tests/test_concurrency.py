@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+
+import main
+from benchmarks.concurrency import check_decisions, check_encoded, check_rate_limit, run_threads
+from benchmarks.synthetic import generate_applications
+from utils.decision_cache import DecisionCache
+from utils.metrics import MetricsRegistry
+from utils.rate_limit import InMemoryBackend, RateLimitBackend, SlidingWindowRateLimiter
+
+THREADS = 8
+
+@pytest.fixture(autouse=True)
+def interleaved():
+    # Switch threads as often as possible so they interleave inside the shared paths
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(previous)
+
+@pytest.fixture(scope='module')
+def applications():
+    return generate_applications(60, seed=8)
+
+def test_decisions_and_their_counters_match_serial_runs(applications):
+    result = check_decisions(main, applications, THREADS, rounds=2)
+    assert result['mismatches'] == 0
+    assert result['decisions_counted']['counted'] == result['decisions_counted']['expected']
+
+def test_decision_cache_counts_every_lookup(monkeypatch, applications):
+    monkeypatch.setattr(main, 'DECISION_CACHE', DecisionCache(ttl_seconds=300))
+    result = check_encoded(main, applications, THREADS, rounds=3)
+    assert result['ok'], result
+    assert 0 < result['cache_hits'] < result['calls']
+
+def test_each_client_gets_exactly_its_limit():
+    result = check_rate_limit(THREADS, THREADS * 40, clients=4)
+    assert result['allowed_per_client'] == [result['limit']] * 4
+
+def test_clients_on_other_stripes_do_not_wait_for_each_other():
+    limiter = SlidingWindowRateLimiter(InMemoryBackend(), max_per_minute=10**6, max_per_hour=10**6)
+    stripe = limiter.locks[hash('198.51.100.1') % len(limiter.locks)]
+    other = next(f'198.51.100.{i}' for i in range(2, 200)
+                 if limiter.locks[hash(f'198.51.100.{i}') % len(limiter.locks)] is not stripe)
+    with stripe:
+        assert limiter.check(other)['allowed']
+
+def test_metrics_counters_lose_no_increments():
+    registry = MetricsRegistry()
+    run_threads(THREADS, lambda i: registry.inc('finis_test_total', outcome='even' if i % 2 else 'odd'), 4000)
+    assert registry.counters[('finis_test_total', (('outcome', 'odd'),))] == 2000
+    assert registry.counters[('finis_test_total', (('outcome', 'even'),))] == 2000
+
+def test_backends_must_implement_every_operation():
+    class Partial(RateLimitBackend):
+        def get_many(self, keys):
+            return [None] * len(keys)
+
+    with pytest.raises(TypeError):
+        Partial()
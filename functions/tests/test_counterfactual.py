@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_applications
+from models.advanced_scoring import HARD_BLOCK_CAP, AdvancedCreditScoringEngine
+from models.annuity import MAX_TERM_MONTHS
+from models.batch_scoring import score_columns, to_columns
+from models.counterfactual import LEVERS, MIN_LOAN_AMOUNT, MONEY_STEP, solve_counterfactuals
+
+@pytest.fixture(scope='module')
+def engine():
+    return AdvancedCreditScoringEngine()
+
+def grid(lever, cols, row):
+    """Every value a suggestion may take, ordered away from the current one"""
+    current = float(cols[lever][row])
+    if lever == 'loan_term_months':
+        return np.arange(current, MAX_TERM_MONTHS + 1, dtype=np.float64)
+    if lever == 'bank_balance':
+        # Liquidity is full once balance + 0.8 x investments covers twice the amount; nothing changes past that
+        saturation = 2 * cols['loan_amount'][row] - 0.8 * cols['investments'][row]
+        above = np.arange(math.floor(current / MONEY_STEP) + 1, math.ceil(max(current, saturation) / MONEY_STEP) + 2)
+        return np.concatenate(([current], above * MONEY_STEP))
+    lo = min(current, MIN_LOAN_AMOUNT) if lever == 'loan_amount' else 0.0
+    below = np.arange(math.ceil(current / MONEY_STEP) - 1, math.ceil(lo / MONEY_STEP) - 1, -1) * MONEY_STEP
+    return np.concatenate(([current], below[below < current], [lo]))
+
+def grid_search(engine, cols, row, lever, threshold):
+    """Closest value on the grid whose score reaches the threshold, or NaN"""
+    values = grid(lever, cols, row)
+    trial = {name: np.repeat(column[row:row + 1], values.size) for name, column in cols.items()}
+    trial[lever] = values.astype(cols[lever].dtype)
+    meets = score_columns(engine, trial)['raw_score'] >= threshold
+    return values[np.argmax(meets)] if meets.any() else np.nan
+
+def applications():
+    rows = generate_applications(120, seed=61)
+    for row in rows[::7]:
+        row['defaulted_loans'] = True  # hard-blocked: capped at 60
+    for row in rows[3::11]:
+        row['legal_issues'] = True
+    for row in rows[5::9]:
+        # Off the 100 TL grid
+        row.update(bank_balance=row['bank_balance'] + 12.34, credit_card_debt=row['credit_card_debt'] + 56.78,
+                   loan_amount=row['loan_amount'] + 90.12)
+    return rows
+
+def test_solutions_match_a_grid_search_on_every_lever(engine):
+    batch = applications()
+    cols = to_columns(batch)
+    base = score_columns(engine, cols)
+
+    checked = {'blocked': 0, 'at_target': 0, 'moved': 0}
+    for target in (None, 'CONDITIONAL', 'APPROVE'):
+        result = solve_counterfactuals(engine, batch, target)
+        for row in range(result['size']):
+            threshold = result['threshold'][row]
+            blocked = base['hard_block'][row] and threshold > HARD_BLOCK_CAP
+            at_target = base['raw_score'][row] >= threshold
+            for lever in LEVERS:
+                solved = result['levers'][lever]
+                value = solved['value'][row]
+                if blocked:
+                    assert np.isnan(value) and not solved['feasible'][row], (row, lever)
+                    continue
+                expected = grid_search(engine, cols, row, lever, threshold)
+                if np.isnan(expected):
+                    assert np.isnan(value), (row, lever, target)
+                    continue
+                assert value == expected, (row, lever, target)
+                assert solved['decision'][row] in ('APPROVE', result['target'][row])
+                if at_target:
+                    assert solved['change'][row] == 0
+            checked['blocked' if blocked else 'at_target' if at_target else 'moved'] += 1
+    assert all(checked.values()), checked
+
+def test_unknown_targets_are_rejected(engine):
+    with pytest.raises(ValueError):
+        solve_counterfactuals(engine, generate_applications(2, seed=62), 'MAYBE')
@@ -0,0 +1,103 @@
+import datetime
+import json
+
+import pytest
+
+import main
+from benchmarks.synthetic import generate_applications
+from models.application import APPLICATION_SCHEMA
+from utils.decision_cache import CACHE_METRIC, DecisionCache, application_key
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = DecisionCache(ttl_seconds=300)
+    monkeypatch.setattr(main, 'DECISION_CACHE', cache)
+    return cache
+
+@pytest.fixture
+def application():
+    return generate_applications(1, seed=21)[0]
+
+def _without_timestamp(body):
+    response = json.loads(body)
+    return {key: value for key, value in response.items() if key != 'timestamp'}, response['timestamp']
+
+def test_retries_are_served_from_the_cache_with_a_fresh_timestamp(cache, application):
+    first, first_hit = main._encoded_decision(application)
+    # A retry may encode the same numbers differently
+    retry = {key: str(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+             for key, value in application.items()}
+    second, second_hit = main._encoded_decision(retry)
+
+    assert (first_hit, second_hit) == (False, True)
+    first_response, first_time = _without_timestamp(first)
+    second_response, second_time = _without_timestamp(second)
+    assert second_response == first_response
+    assert datetime.datetime.fromisoformat(second_time) >= datetime.datetime.fromisoformat(first_time)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_field_selections_and_invalid_applications_are_cached_apart(cache, application):
+    main._encoded_decision(application)
+    _, hit = main._encoded_decision(application, frozenset({'decision', 'credit_score'}))
+    assert not hit
+    _, hit = main._encoded_decision(application, frozenset({'decision', 'credit_score'}))
+    assert hit
+
+    invalid = dict(application, kkb_score=5000)
+    assert not main._encoded_decision(invalid)[1]
+    assert not main._encoded_decision(invalid)[1]
+    assert len(cache) == 2
+
+def test_keys_hash_the_decoded_application():
+    record = APPLICATION_SCHEMA.decode({'loan_amount': '50000', 'monthly_income': 18000})
+    same = APPLICATION_SCHEMA.decode({'loan_amount': 50000.0, 'monthly_income': '18000'})
+    key = application_key(record)
+    assert key == application_key(same)
+    assert key != application_key(record, 'decision')
+    assert len(key) == 64 and '50000' not in key
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = DecisionCache(ttl_seconds=60, clock=clock)
+    cache.put('a', ('{"timestamp": ', '}'))
+    clock.now += 59
+    assert cache.get('a') == ('{"timestamp": ', '}')
+    clock.now += 1
+    assert cache.get('a') is None
+    assert len(cache) == 0 and cache.bytes == 0
+
+def test_least_recently_used_entries_go_first():
+    cache = DecisionCache(max_entries=2)
+    cache.put('a', ('x', 'y'))
+    cache.put('b', ('x', 'y'))
+    cache.get('a')
+    cache.put('c', ('x', 'y'))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['evictions'] == 1
+
+def test_the_byte_budget_bounds_the_cache():
+    cache = DecisionCache(max_bytes=100)
+    cache.put('big', ('x' * 200, ''))
+    assert len(cache) == 0
+    for i in range(5):
+        cache.put(f'k{i}', ('x' * 30, ''))
+    assert cache.bytes <= 100
+    assert len(cache) == 3
+
+def test_lookups_are_counted_in_metrics(cache, application):
+    def count(result):
+        return main.METRICS.counters.get((CACHE_METRIC, (('result', result),)), 0)
+
+    hits, misses = count('hit'), count('miss')
+    for _ in range(3):
+        main._encoded_decision(application)
+    assert (count('hit') - hits, count('miss') - misses) == (2, 1)
+    assert cache.stats()['hit_rate'] == round(2 / 3, 4)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from models.advanced_scoring import AdvancedCreditScoringEngine
+from models.annuity import annuity_payment
+from models.batch_scoring import calculate_limits
+
+@pytest.fixture(scope='module')
+def engine():
+    return AdvancedCreditScoringEngine()
+
+CASES = [
+    # net income, requested amount, term
+    (12000.0, 150000.0, 36),
+    (12000.0, 500000.0, 36),
+    (4500.0, 20000.0, 12),
+    (30000.0, 1000.0, 3),
+    (8000.0, 250000.0, 240),
+    (999.0, 50000.0, 120),
+]
+
+@pytest.mark.parametrize('net_income, loan_amount, term', CASES)
+def test_max_amount_is_the_largest_thousand_within_the_payment_target(engine, net_income, loan_amount, term):
+    limit = engine._calculate_limits(net_income, loan_amount, term, 0.3, "APPROVE")['max_approved_amount']
+    target = net_income * engine.target_payment_ratio
+    cap = loan_amount * engine.max_amount_multiplier
+
+    assert limit % 1000 == 0
+    assert limit <= cap
+    assert annuity_payment(limit, engine.monthly_rate, term) <= target + 1e-9
+    # One more step of 1000 breaks the payment target or the cap
+    above = limit + 1000
+    assert above > cap or annuity_payment(above, engine.monthly_rate, term) > target
+
+def test_no_net_income_means_no_limit(engine):
+    for net_income in (0.0, -500.0):
+        assert engine._calculate_limits(net_income, 100000.0, 36, 1.0, "REJECT")['max_approved_amount'] == 0.0
+
+def test_batch_limits_match_the_scalar_engine(engine):
+    net_income = np.array([case[0] for case in CASES] + [0.0])
+    loan_amount = np.array([case[1] for case in CASES] + [100000.0])
+    term = np.array([case[2] for case in CASES] + [36])
+    new_dti = np.array([0.5, 0.3, 0.5, 0.2, 0.6, 0.1, 1.0])
+    decision = np.array(["CONDITIONAL", "APPROVE", "CONDITIONAL", "APPROVE", "CONDITIONAL", "REJECT", "REJECT"])
+
+    batch = calculate_limits(engine, net_income, loan_amount, term, new_dti, decision)
+    for i in range(len(net_income)):
+        scalar = engine._calculate_limits(float(net_income[i]), float(loan_amount[i]), int(term[i]),
+                                          float(new_dti[i]), str(decision[i]))
+        assert batch['max_approved_amount'][i] == scalar['max_approved_amount']
+        assert batch['recommended_term_months'][i] == scalar['recommended_term_months']
+
+def test_conditional_approvals_with_high_dti_get_a_longer_term(engine):
+    assert engine._calculate_limits(12000.0, 150000.0, 36, 0.5, "CONDITIONAL")['recommended_term_months'] == 48
+    assert engine._calculate_limits(12000.0, 150000.0, 80, 0.5, "CONDITIONAL")['recommended_term_months'] == 84
+    assert engine._calculate_limits(12000.0, 150000.0, 36, 0.4, "CONDITIONAL")['recommended_term_months'] == 36
@@ -0,0 +1,45 @@
+import pytest
+from werkzeug.test import EnvironBuilder
+from firebase_functions import https_fn
+
+import main
+from benchmarks.synthetic import generate_applications
+from utils.metrics import MetricsRegistry
+
+STAGES = ('evaluate_credit', 'evaluate_credit.parse_body', 'evaluate_credit.body', 'decision.cache_lookup',
+          'decision.json_encode', 'decision.validate', 'decision.risk_factors', 'make_decision',
+          'score_application', 'score.features', 'score.components', 'score.limits', 'score.explanations')
+
+@pytest.fixture
+def sampled_metrics(monkeypatch):
+    monkeypatch.setattr(main.METRICS, 'sample_every', 10)
+    main.METRICS.reset()
+    if main.DECISION_CACHE is not None:
+        main.DECISION_CACHE.clear()
+    yield main.METRICS
+    main.METRICS.reset()
+
+def test_every_stage_of_a_sampled_request_is_recorded(sampled_metrics):
+    for application in generate_applications(200, seed=1):
+        request = https_fn.Request(EnvironBuilder(method='POST', json=application).get_environ())
+        assert main.evaluate_credit(request).status_code == 200
+
+    counts = {stage: summary['count'] for stage, summary in sampled_metrics.summary().items()}
+    for stage in STAGES:
+        assert counts.get(stage) == 20, stage
+
+def test_direct_decisions_sample_their_scoring_stages(sampled_metrics):
+    engine = main.get_decision_engine()
+    for application in generate_applications(100, seed=2):
+        engine.make_decision(application)
+
+    counts = {stage: summary['count'] for stage, summary in sampled_metrics.summary().items()}
+    assert counts['make_decision'] == counts['score_application'] == counts['score.features'] == 10
+
+def test_counters_are_exported_with_every_digit():
+    registry = MetricsRegistry()
+    registry.inc('finis_requests_total', 1234567, function='evaluate_credit')
+    registry.inc('finis_fraction_total', 0.125)
+    text = registry.render_prometheus()
+    assert 'finis_requests_total{function="evaluate_credit"} 1234567\n' in text
+    assert 'finis_fraction_total 0.125\n' in text
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from firebase_functions import https_fn
+from werkzeug.test import EnvironBuilder
+
+import main
+from benchmarks.synthetic import generate_applications
+from models.advanced_scoring import DEFAULT_OFFER_TERMS
+
+APPLICATION = generate_applications(1, seed=21)[0]
+
+def post_offers(body):
+    request = https_fn.Request(EnvironBuilder(method='POST', json=body).get_environ())
+    response = main.loan_offers(request)
+    return response.status_code, json.loads(response.get_data(as_text=True))
+
+def test_offers_default_to_the_product_terms_at_the_requested_amount():
+    status, result = post_offers(APPLICATION)
+    assert status == 200
+    assert result['terms'] == list(DEFAULT_OFFER_TERMS)
+    assert [offer['term_months'] for offer in result['offers']] == list(DEFAULT_OFFER_TERMS)
+    assert {offer['loan_amount'] for offer in result['offers']} == {float(APPLICATION['loan_amount'])}
+
+def test_offers_cover_every_amount_and_term():
+    status, result = post_offers({'application': APPLICATION, 'terms': [12, 24.0, 36], 'amounts': [50000, 75000.5]})
+    assert status == 200
+    assert result['terms'] == [12, 24, 36]
+    assert [(offer['loan_amount'], offer['term_months']) for offer in result['offers']] == [
+        (50000.0, 12), (50000.0, 24), (50000.0, 36), (75000.5, 12), (75000.5, 24), (75000.5, 36)]
+
+@pytest.mark.parametrize('terms', [[12, 36.5], [24.9], ['12'], [True], [2], [241], []])
+def test_invalid_terms_are_rejected(terms):
+    status, result = post_offers({'application': APPLICATION, 'terms': terms})
+    assert status == 400
+    assert any("'loan_term_months'" in error for error in result['errors'])
+
+def test_fractional_terms_are_not_truncated_by_the_engine():
+    engine = main.get_decision_engine()
+    with pytest.raises(ValueError):
+        engine.advanced_scoring.offer_matrix(APPLICATION, terms=[36.5])
+    assert engine.advanced_scoring.offer_matrix(APPLICATION, terms=[36.0])['terms'] == [36]
+
+def test_oversized_offer_matrices_are_refused():
+    amounts = [10000 + step for step in range(main.MAX_OFFER_CELLS // 2 + 1)]
+    status, _ = post_offers({'application': APPLICATION, 'terms': [12, 24], 'amounts': amounts})
+    assert status == 413
@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+import main
+from benchmarks.concurrency import _without_timestamps
+from benchmarks.synthetic import generate_applications
+from models.advanced_scoring import MIN_THREAD_ROWS, AdvancedCreditScoringEngine
+from utils.parallel import map_ranges, split_range
+
+@pytest.fixture(scope='module')
+def engine():
+    return AdvancedCreditScoringEngine()
+
+@pytest.fixture(scope='module')
+def applications():
+    return generate_applications(2 * MIN_THREAD_ROWS + 500, seed=31)
+
+def assert_same_result(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            assert_same_result(actual[key], value)
+        elif isinstance(value, np.ndarray):
+            assert actual[key].dtype == value.dtype, key
+            assert np.array_equal(actual[key], value, equal_nan=value.dtype.kind == 'f'), key
+        else:
+            assert actual[key] == value, key
+
+def test_slices_cover_the_range_in_order():
+    assert split_range(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert split_range(5000, 4, MIN_THREAD_ROWS) == [(0, 2500), (2500, 5000)]
+    assert split_range(100, 4, MIN_THREAD_ROWS) == [(0, 100)]
+
+def test_thread_pool_scores_equal_the_serial_scores(engine, applications):
+    serial = engine.score_applications(applications, threads=1)
+    for threads in (2, 3, 8):
+        assert_same_result(engine.score_applications(applications, threads=threads), serial)
+
+def test_thread_pool_decisions_equal_the_serial_decisions():
+    decision_engine = main.get_decision_engine()
+    applications = generate_applications(4 * main.MIN_THREAD_DECISIONS, seed=32)
+    serial = [_without_timestamps(decision) for decision in decision_engine.make_decisions(applications, threads=1)]
+    pooled = decision_engine.make_decisions(applications, threads=4)
+    assert [_without_timestamps(decision) for decision in pooled] == serial
+
+def test_nested_calls_run_in_the_calling_worker():
+    threads_by_slice = {}
+
+    def inner(start, stop):
+        return threading.get_ident()
+
+    def outer(start, stop):
+        threads_by_slice[start] = (threading.get_ident(), map_ranges(inner, 100, threads=4))
+        return stop - start
+
+    assert map_ranges(outer, 8, threads=4) == [2, 2, 2, 2]
+    assert sorted(threads_by_slice) == [0, 2, 4, 6]
+    for worker, inner_threads in threads_by_slice.values():
+        assert worker != threading.get_ident()
+        assert inner_threads == [worker]
+    # Outside a worker the same call uses a pool again
+    assert threading.get_ident() not in map_ranges(inner, 100, threads=4)
+
+def test_batches_scored_inside_a_worker_equal_the_serial_scores(engine, applications):
+    serial = engine.score_applications(applications, threads=1)
+    nested = map_ranges(lambda start, stop: engine.score_applications(applications, threads=4), 2, threads=2)
+    for result in nested:
+        assert_same_result(result, serial)
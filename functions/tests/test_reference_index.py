@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from models.reference_index import ReferenceIndex
+from models.reference_set import (
+    FULL_CONFIDENCE_MATCHES, NEUTRAL_PREDICTION, RELEVANCE_THRESHOLD, SCALES, WEIGHTS, ReferenceSet
+)
+
+def reference_book(rows, seed):
+    """Clustered applicants (age, income, experience, debt ratio, KKB) with approval flags"""
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform([20, 3000, 0, 0, 300], [70, 60000, 40, 1.5, 900], size=(12, 5))
+    spread = np.array([4, 3000, 3, 0.08, 40])
+    features = centres[rng.integers(0, len(centres), rows)] + rng.normal(size=(rows, 5)) * spread
+    approved = (rng.random(rows) < 0.6).astype(np.float64)
+    return features, approved, centres
+
+def brute_force(features, approved, query):
+    """The similarity model row by row, as the engine defines it"""
+    matches = similarity_sum = approved_sum = 0.0
+    for row, flag in zip(features, approved):
+        similarity = sum(w * max(0.0, 1.0 - abs(x - q) / s) for x, q, s, w in zip(row, query, SCALES, WEIGHTS))
+        if similarity > RELEVANCE_THRESHOLD:
+            matches += 1
+            similarity_sum += similarity
+            approved_sum += similarity * flag
+    if not matches:
+        return NEUTRAL_PREDICTION
+    confidence = min(1.0, matches / FULL_CONFIDENCE_MATCHES)
+    return approved_sum / similarity_sum * confidence + NEUTRAL_PREDICTION * (1 - confidence)
+
+@pytest.fixture(scope='module')
+def book():
+    return reference_book(3000, seed=41)
+
+@pytest.fixture(scope='module')
+def queries(book):
+    features, _, centres = book
+    rng = np.random.default_rng(42)
+    return np.vstack([
+        features[rng.integers(0, len(features), 40)],  # exact copies of stored rows
+        centres,  # dense regions: whole leaves pass the threshold
+        centres + rng.normal(size=centres.shape) * [15, 20000, 10, 0.5, 150],  # leaves on the threshold
+        [[18, 0, 0, 0, 300], [80, 1000000, 50, 5, 900]],  # far outside the book
+    ])
+
+@pytest.mark.parametrize('leaf_size', [1, 8, 128])
+def test_index_matches_the_brute_force_scan(tmp_path, book, queries, leaf_size):
+    features, approved, _ = book
+    index = ReferenceIndex.build(features, approved, str(tmp_path / 'store'), leaf_size=leaf_size)
+    expected = ReferenceSet(features, approved).predict_batch(queries)
+
+    np.testing.assert_allclose(index.predict_batch(queries), expected, rtol=1e-9, atol=1e-12)
+    for query in queries[::9]:
+        assert index.predict(query) == pytest.approx(brute_force(features, approved, query), rel=1e-9, abs=1e-12)
+
+def test_reopened_store_answers_like_the_built_one(tmp_path, book, queries):
+    features, approved, _ = book
+    built = ReferenceIndex.build(features, approved, str(tmp_path / 'store'), leaf_size=16)
+    reopened = ReferenceIndex.open(str(tmp_path / 'store'))
+    assert len(reopened) == len(features)
+    assert reopened.predict_batch(queries).tolist() == built.predict_batch(queries).tolist()
+
+def test_empty_and_unrelated_books_give_the_neutral_prediction(tmp_path, queries):
+    empty = ReferenceIndex.build(np.empty((0, 5)), np.empty(0), str(tmp_path / 'empty'))
+    assert empty.predict(queries[0]) == NEUTRAL_PREDICTION
+
+    far = ReferenceIndex.build(np.array([[1000.0, 1e7, 500.0, 50.0, 5000.0]]), np.ones(1), str(tmp_path / 'far'))
+    assert far.predict(queries[0]) == NEUTRAL_PREDICTION
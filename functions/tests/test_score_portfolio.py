@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import score_portfolio
+from benchmarks.synthetic import generate_applications
+from models.rescoring import ComponentStore
+
+def _write_ndjson(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def _read_ndjson(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+@pytest.fixture
+def applications():
+    records = generate_applications(30, seed=11)
+    for i, record in enumerate(records):
+        record['application_id'] = f'A{i}'
+    return records
+
+def test_unreadable_rows_get_error_records_and_the_rest_is_scored(tmp_path, applications):
+    broken = [dict(record) for record in applications]
+    broken[4]['loan_amount'] = 'yüz bin'
+    broken[17]['monthly_income'] = [25000]
+    _write_ndjson(tmp_path / 'in.ndjson', broken)
+    _write_ndjson(tmp_path / 'clean.ndjson', applications)
+
+    stats = score_portfolio.score_portfolio(str(tmp_path / 'in.ndjson'), str(tmp_path / 'out.ndjson'),
+                                            chunk_size=10, workers=1, progress=False)
+    score_portfolio.score_portfolio(str(tmp_path / 'clean.ndjson'), str(tmp_path / 'clean_out.ndjson'),
+                                    chunk_size=10, workers=1, progress=False)
+    rows = _read_ndjson(tmp_path / 'out.ndjson')
+    clean = _read_ndjson(tmp_path / 'clean_out.ndjson')
+
+    assert stats['rows'] == 30 and stats['errors'] == 2
+    assert [row['row'] for row in rows] == list(range(30))
+    for i in (4, 17):
+        assert rows[i]['decision'] == 'ERROR'
+        assert rows[i]['id'] == f'A{i}'
+        assert rows[i]['error']
+    for i in set(range(30)) - {4, 17}:
+        assert rows[i] == clean[i]
+
+def test_csv_output_has_an_error_column(tmp_path, applications):
+    applications[0]['kkb_score'] = 'bilinmiyor'
+    _write_ndjson(tmp_path / 'in.ndjson', applications)
+    score_portfolio.score_portfolio(str(tmp_path / 'in.ndjson'), str(tmp_path / 'out.csv'),
+                                    chunk_size=8, workers=1, progress=False)
+    with open(tmp_path / 'out.csv', encoding='utf-8') as f:
+        header, first, second = f.read().splitlines()[:3]
+    assert header.endswith(',error')
+    assert first.startswith('0,A0,ERROR,') and 'bilinmiyor' in first
+    assert second.startswith('1,A1,') and second.endswith(',')
+
+def test_component_store_skips_error_rows_and_resumes_from_its_own_count(tmp_path, applications):
+    applications[3]['expenses'] = 'n/a'
+    _write_ndjson(tmp_path / 'in.ndjson', applications)
+    output, store = str(tmp_path / 'out.ndjson'), str(tmp_path / 'components')
+
+    # An interrupted run: the first chunk and its checkpoint are on disk
+    chunks = score_portfolio._scored_chunks(iter([(0, applications[:10])]), 1, 1, with_components=True)
+    writer = score_portfolio.PortfolioWriter(output, resume=False)
+    components = score_portfolio.ComponentStoreWriter(store, score_portfolio.AdvancedCreditScoringEngine())
+    rows, arrays = next(chunks)
+    components.write(arrays)
+    components.flush()
+    writer.write(rows)
+    writer.checkpoint(components.rows)
+    writer.file.close()
+    components.close()
+
+    stats = score_portfolio.score_portfolio(str(tmp_path / 'in.ndjson'), output, chunk_size=10, workers=1,
+                                            resume=True, progress=False, components_path=store)
+    assert stats['resumed_from'] == 10
+    stored = ComponentStore(store)
+    assert stored.rows == 29
+    assert stored.columns['row'].tolist() == [i for i in range(30) if i != 3]
+    assert stored.rescore()['flipped'] == 0
+    # Flipped rows are reported by input row
+    not_approved = [row['row'] for row in _read_ndjson(output) if row['decision'] in ('CONDITIONAL', 'REJECT')]
+    assert stored.rescore(approve_threshold=0, conditional_threshold=0)['flipped_rows'].tolist() == not_approved
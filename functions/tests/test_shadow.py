@@ -0,0 +1,73 @@
+import pytest
+
+import main
+from benchmarks.synthetic import generate_applications
+from models.application import APPLICATION_SCHEMA
+from models.shadow import Challenger, LegacyScoreChallenger, RiskScoreChallenger, ShadowScorer
+
+@pytest.fixture(scope='module')
+def engine():
+    return main.CreditDecisionEngine()
+
+def test_legacy_challenger_scores_the_request_as_sent(engine):
+    application = dict(generate_applications(1, seed=3)[0], employment_type='Doktor', work_experience=2)
+    expected, _ = engine.calculate_credit_score(application)
+
+    scorer = ShadowScorer([LegacyScoreChallenger(engine)], log=lambda line: None)
+    record = APPLICATION_SCHEMA.decode(application)
+    scorer.process([(record, expected, 'APPROVE' if expected >= 75 else 'CONDITIONAL' if expected >= 60 else 'REJECT')])
+
+    stats = scorer.stats()['challengers']['legacy']
+    assert stats['compared'] == 1
+    assert stats['mean_abs_score_diff'] == 0.0
+    assert stats['decision_disagreements'] == 0
+
+def test_risk_score_failures_count_as_errors():
+    scorer = ShadowScorer([RiskScoreChallenger()], log=lambda line: None)
+    # calculate_risk_score cannot parse this and answers with risk_score 0 plus an 'error' key
+    record = APPLICATION_SCHEMA.convert({'loan_amount': 50000})
+    record.source = {'loan_amount': 50000, 'kkb_score': 'yok'}
+    scorer.process([(record, 80.0, 'APPROVE')])
+
+    stats = scorer.stats()['challengers']['risk_scoring']
+    assert stats['errors'] == 1
+    assert stats['compared'] == 0
+    assert stats['decision_disagreements'] == 0
+
+def test_challengers_must_implement_score():
+    class Incomplete(Challenger):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_string_valued_applications_are_scored_from_decoded_values(engine):
+    numeric = dict(generate_applications(1, seed=4)[0], employment_type='Doktor', work_experience=2)
+    as_text = {key: str(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+               for key, value in numeric.items()}
+    as_text['employment_type'] = ' Doktor '
+    expected, _ = engine.calculate_credit_score(numeric)
+
+    scorer = ShadowScorer([LegacyScoreChallenger(engine), RiskScoreChallenger()], log=lambda line: None)
+    batch = [(APPLICATION_SCHEMA.decode(application), expected, 'REJECT') for application in (numeric, as_text)]
+    scorer.process(batch)
+
+    stats = scorer.stats()['challengers']
+    assert stats['legacy']['compared'] == 2 and stats['legacy']['errors'] == 0
+    assert stats['legacy']['mean_abs_score_diff'] == 0.0
+    assert stats['risk_scoring']['compared'] == 2 and stats['risk_scoring']['errors'] == 0
+
+def test_a_failing_prepare_only_costs_that_challenger_its_batch(engine):
+    class Broken(LegacyScoreChallenger):
+        name = 'broken'
+
+        def prepare(self, batch):
+            raise RuntimeError("similarity model unavailable")
+
+    scorer = ShadowScorer([Broken(engine), LegacyScoreChallenger(engine)], log=lambda line: None)
+    records = [APPLICATION_SCHEMA.decode(application) for application in generate_applications(3, seed=6)]
+    scorer.process([(record, 70.0, 'CONDITIONAL') for record in records])
+
+    stats = scorer.stats()['challengers']
+    assert stats['broken']['errors'] == 3 and stats['broken']['compared'] == 0
+    assert stats['legacy']['errors'] == 0 and stats['legacy']['compared'] == 3
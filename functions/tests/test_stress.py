@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_applications
+from models.advanced_scoring import AdvancedCreditScoringEngine
+from models.batch_scoring import score_columns, to_columns
+from models.stress import Histogram, Scenario, shock_columns, simulate_scenario
+
+@pytest.fixture(scope='module')
+def engine():
+    return AdvancedCreditScoringEngine()
+
+def test_input_dti_keeps_its_monthly_debt_under_income_shocks(engine):
+    applications = generate_applications(200, seed=5)
+    for application in applications[::2]:
+        application['debt_to_income_ratio'] = 0.3
+    columns = to_columns(applications)
+    base = score_columns(engine, columns)['calculations']
+
+    scenario = Scenario('income_-40', income_shock=-0.40, expense_inflation=0.10)
+    shocked = score_columns(engine, shock_columns(columns, scenario, 1, np.random.default_rng(0)))['calculations']
+
+    still_earning = shocked['net_income'] > 0
+    assert still_earning[::2].any()
+    assert np.allclose(shocked['current_monthly_debt_payment'][still_earning],
+                       base['current_monthly_debt_payment'][still_earning], atol=0.01)
+    # Less income against the same debt means a higher DTI
+    assert (shocked['new_dti'][::2][still_earning[::2]] > base['new_dti'][::2][still_earning[::2]]).all()
+
+def test_histogram_quantiles_match_exact_quantiles_within_a_bin():
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.normal(60, 15, 50_000).clip(0, 100), [0.0, 100.0]])
+    histogram = Histogram(0.0, 100.0, 0.01)
+    for chunk in np.array_split(values, 7):
+        histogram.add(chunk)
+
+    result = histogram.quantiles()
+    assert result['mean'] == pytest.approx(values.mean(), abs=1e-4)
+    for name, q in (('p05', 0.05), ('p25', 0.25), ('p50', 0.5), ('p75', 0.75), ('p95', 0.95)):
+        assert result[name] == pytest.approx(np.quantile(values, q), abs=0.01)
+
+def test_histogram_stretches_its_outer_bins_to_outliers():
+    histogram = Histogram(0.0, 5.0, 0.001)
+    histogram.add(np.array([-1.0] * 10 + [40.0] * 90))
+    result = histogram.quantiles()
+    assert result['p05'] >= -1.0
+    assert result['p95'] == pytest.approx(40.0, rel=0.1)
+
+def test_scenario_distributions_are_reported_per_simulation_count(engine):
+    columns = to_columns(generate_applications(300, seed=2))
+    scenario = Scenario('severe', income_shock=-0.2, income_volatility=0.15, job_loss_rate=0.05)
+    result = simulate_scenario(engine, columns, scenario, np.random.SeedSequence(3), simulations=20, chunk_rows=1000)
+    assert result['pairs'] == 6000
+    assert 0 <= result['score']['p05'] <= result['score']['p50'] <= result['score']['p95'] <= 100
+    assert result['new_dti']['p05'] <= result['new_dti']['p95']
@@ -0,0 +1,165 @@
+import math
+
+import pytest
+
+import main
+from benchmarks.synthetic import generate_applications
+from models.tiers import TierTable, load_tier_tables
+
+# The if/elif ladders the tables replaced, kept here as the reference
+def income_ladder(total_income):
+    if total_income >= 35000:
+        return 100
+    elif total_income >= 20000:
+        return 90
+    elif total_income >= 15000:
+        return 85
+    elif total_income >= 10000:
+        return 75
+    elif total_income >= 7500:
+        return 65
+    elif total_income >= 5000:
+        return 55
+    return max(30, total_income / 200)
+
+def debt_ladder(debt_ratio):
+    if debt_ratio <= 0.1:
+        return 100
+    elif debt_ratio <= 0.2:
+        return 95
+    elif debt_ratio <= 0.3:
+        return 85
+    elif debt_ratio <= 0.4:
+        return 75
+    elif debt_ratio <= 0.5:
+        return 60
+    return max(0, 20 - (debt_ratio - 0.5) * 40)
+
+def asset_ladder(total_assets):
+    if total_assets >= 1000000:
+        return 100
+    elif total_assets >= 500000:
+        return 90
+    elif total_assets >= 250000:
+        return 80
+    elif total_assets >= 100000:
+        return 70
+    elif total_assets >= 50000:
+        return 60
+    return max(30, total_assets / 2000)
+
+def kkb_ladder(kkb_score):
+    if kkb_score >= 800:
+        return 100
+    elif kkb_score >= 700:
+        return 85
+    elif kkb_score >= 600:
+        return 70
+    elif kkb_score >= 500:
+        return 55
+    return 30
+
+def loan_to_income_ladder(ratio):
+    if ratio <= 2:
+        return 100
+    elif ratio <= 3:
+        return 85
+    elif ratio <= 4:
+        return 70
+    elif ratio <= 5:
+        return 55
+    elif ratio <= 6:
+        return 40
+    return max(20, 100 - (ratio - 6) * 10)
+
+def term_ladder(loan_term):
+    if loan_term <= 12:
+        return 100
+    elif loan_term <= 24:
+        return 90
+    elif loan_term <= 36:
+        return 80
+    elif loan_term <= 48:
+        return 70
+    elif loan_term <= 60:
+        return 60
+    elif loan_term <= 84:
+        return 50
+    return max(30, 100 - (loan_term - 84) * 2)
+
+def risk_category_ladder(score):
+    if score >= 80:
+        return 'LOW_RISK'
+    elif score >= 60:
+        return 'MEDIUM_RISK'
+    elif score >= 40:
+        return 'HIGH_RISK'
+    return 'VERY_HIGH_RISK'
+
+def decision_ladder(risk_score):
+    if risk_score >= 75:
+        return True, 1
+    elif risk_score >= 60:
+        return True, 0.8
+    elif risk_score >= 45:
+        return False, 0.5
+    return False, 0
+
+NUMERIC_LADDERS = {
+    'credit_score.income': (income_ladder, [0, 4000, 6000, 50000]),
+    'credit_score.debt_ratio': (debt_ladder, [0, 0.05, 0.75, 1.0, 3.0]),
+    'credit_score.assets': (asset_ladder, [0, 20000, 70000, 2000000]),
+    'credit_score.kkb': (kkb_ladder, [0, 300, 1900]),
+    'credit_score.loan_to_income': (loan_to_income_ladder, [0, 6.5, 9, 20]),
+    'credit_score.loan_term': (term_ladder, [3, 90, 120, 240]),
+}
+
+def boundary_values(table, extra):
+    """Every bound, the floats right next to it and a few points inside the tiers"""
+    values = list(extra)
+    for bound in table.bounds:
+        values += [math.nextafter(bound, -math.inf), bound, math.nextafter(bound, math.inf), bound - 1, bound + 1]
+    return values
+
+@pytest.fixture(scope='module')
+def tables():
+    return load_tier_tables()
+
+@pytest.mark.parametrize('name', sorted(NUMERIC_LADDERS))
+def test_tables_match_the_old_ladders_at_every_boundary(tables, name):
+    ladder, extra = NUMERIC_LADDERS[name]
+    table = tables[name]
+    values = boundary_values(table, extra)
+
+    expected = [ladder(x) for x in values]
+    assert [table.lookup(x) for x in values] == expected
+    assert table.lookup_many(values).tolist() == expected
+
+def test_risk_tables_match_the_old_ladders_at_every_boundary(tables):
+    categories = tables['risk_scoring.risk_category']
+    decisions = tables['risk_scoring.decision']
+    for x in boundary_values(categories, [0, 100]) + boundary_values(decisions, [0, 100]):
+        assert categories.lookup(x) == risk_category_ladder(x)
+        tier = decisions.lookup(x)
+        assert (tier['approved'], tier['amount_ratio']) == decision_ladder(x)
+
+def test_tables_reject_unordered_bounds():
+    with pytest.raises(ValueError):
+        TierTable('broken', [10, 5], [1, 2, 3])
+    with pytest.raises(ValueError):
+        TierTable('broken', [5, 10], [1, 2])
+
+def test_batch_credit_scores_equal_the_scalar_scores():
+    engine = main.CreditDecisionEngine()
+    applications = generate_applications(400, seed=15)
+    kinds = ['Doktor', 'Mühendis', 'Özel Sektör', 'Kamu', 'Serbest Meslek', '']
+    for index, application in enumerate(applications):
+        application['employment_type'] = kinds[index % len(kinds)]
+    # Land some applications exactly on the tier bounds
+    applications[0].update(monthly_income=20000, additional_income=0, loan_term_months=84, kkb_score=700)
+    applications[1].update(bank_balance=50000, investments=0, real_estate_value=0, loan_term_months=240)
+
+    predictions = engine._ml_prediction_batch(applications)
+    scores = engine.calculate_credit_scores(applications, predictions).tolist()
+    assert scores == [engine.calculate_credit_score(application, ml_prediction=prediction)[0]
+                      for application, prediction in zip(applications, predictions)]
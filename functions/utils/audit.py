@@ -0,0 +1,299 @@
+# Decision audit log, written to Firestore off the request path
+#
+# evaluate_credit hands each decision to AuditWriter.submit(), which only
+# appends it to a bounded in-memory queue. A daemon worker builds the
+# documents and coalesces them into batched writes of up to batch_size
+# records, or whatever arrived within flush_interval:
+#
+#   decisionAudit/{audit_id}  {received_at, application, decision, credit_score, cache_hit, response}
+#
+# Delivery is at least once. A batch leaves the queue only after its write
+# succeeded; failed writes are retried with exponential backoff under the
+# same document ids, so a retried batch overwrites rather than duplicates.
+# When the queue is full, submit() waits up to block_timeout for room
+# (backpressure) and then logs the record instead of queueing it; close()
+# flushes on shutdown and logs whatever it could not write in time.
+import datetime
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, Any, Callable, List, Sequence
+
+from models.application import APPLICATION_SCHEMA
+from utils.metrics import METRICS
+
+DEFAULT_COLLECTION = 'decisionAudit'
+DEFAULT_MAX_QUEUE = 10_000
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_BLOCK_TIMEOUT = 0.05
+# Firestore accepts at most 500 writes per batch and 1 MiB per document
+FIRESTORE_MAX_BATCH_WRITES = 500
+MAX_RESPONSE_BYTES = 1_000_000 - 16_384
+
+AUDIT_METRIC = 'finis_audit_records_total'
+METRICS.describe(AUDIT_METRIC, 'Decision audit records by outcome (written, retried, dropped, rejected, unwritten)')
+
+def decision_document(entry: Sequence[Any]) -> Dict[str, Any]:
+    """Audit document for one (received_at, application, response body, cache_hit) entry
+
+    The application is stored decoded, as the engine saw it; invalid
+    applications keep only the response, which lists the errors. Responses
+    too large for one document raise ValueError.
+    """
+    received_at, application, body, cache_hit = entry
+    # The response is most of the document; the decoded application is a few hundred bytes
+    if len(body.encode('utf-8')) > MAX_RESPONSE_BYTES:
+        raise ValueError("Response too large for an audit document")
+    record, _ = APPLICATION_SCHEMA.validate(application)
+    response = json.loads(body)
+    return {
+        'audit_id': uuid.uuid4().hex,
+        'received_at': datetime.datetime.fromtimestamp(received_at, datetime.timezone.utc),
+        'application': record.to_dict() if record is not None else None,
+        'decision': response.get('decision'),
+        'credit_score': response.get('credit_score'),
+        'cache_hit': cache_hit,
+        'response': response
+    }
+
+class FirestoreSink:
+    """Writes audit documents with Firestore batched writes
+
+    app_factory returns the firebase_admin app (main.get_firebase_app); the
+    client is created on the first write, on the audit worker. With
+    FIRESTORE_EMULATOR_HOST set, the client talks to the emulator.
+    """
+
+    def __init__(self, collection: str = DEFAULT_COLLECTION, app_factory: Callable[[], Any] = None):
+        self.collection = collection
+        self.app_factory = app_factory
+        self.client = None
+
+    def write(self, documents: List[Dict[str, Any]]):
+        if self.client is None:
+            from firebase_admin import firestore
+            self.client = firestore.client(self.app_factory() if self.app_factory else None)
+        collection = self.client.collection(self.collection)
+        for start in range(0, len(documents), FIRESTORE_MAX_BATCH_WRITES):
+            batch = self.client.batch()
+            for document in documents[start:start + FIRESTORE_MAX_BATCH_WRITES]:
+                batch.set(collection.document(document['audit_id']), document)
+            batch.commit()
+
+class MemorySink:
+    """In-memory stand-in for Firestore: documents by audit_id, plus the size of every write
+
+    latency simulates the commit round trip; the first `failures` writes
+    raise, to exercise retries.
+    """
+
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        self.latency = latency
+        self.failures = failures
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.writes: List[int] = []
+        self.lock = threading.Lock()
+
+    def write(self, documents: List[Dict[str, Any]]):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("Simulated audit write failure")
+            self.writes.append(len(documents))
+            for document in documents:
+                self.documents[document['audit_id']] = document
+
+def create_sink(kind: str, app_factory: Callable[[], Any] = None) -> Any:
+    """Sink for FINIS_AUDIT_SINK: 'firestore' or 'memory'"""
+    if kind == 'firestore':
+        return FirestoreSink(app_factory=app_factory)
+    if kind == 'memory':
+        return MemorySink()
+    raise ValueError(f"Unknown audit sink: {kind}")
+
+class AuditWriter:
+    """Bounded queue plus one background worker writing batches to a sink
+
+    Entries are turned into documents by build() on the worker, so the
+    request thread only pays for an append under a lock. Entries build()
+    raises on are logged and counted as rejected instead of written.
+    """
+
+    def __init__(self, sink: Any, build: Callable[[Any], Dict[str, Any]] = decision_document,
+                 max_queue: int = DEFAULT_MAX_QUEUE, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+                 retry_backoff: float = 0.1, max_backoff: float = 30.0, logger: logging.Logger = None):
+        self.sink = sink
+        self.build = build
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.logger = logger or logging.getLogger('finis.audit')
+        self.pending = deque()
+        self.in_flight = 0
+        self.closed = False
+        # Set when close() runs out of time: the worker stops retrying
+        self.abandoned = False
+        self.flush_requested = False
+        self.submitted = 0
+        self.written = 0
+        self.retries = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.batches = 0
+        self.worker = None
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def submit(self, entry: Any, timeout: float = None) -> bool:
+        """Queue one entry; waits up to timeout (default block_timeout) for room when the queue is full"""
+        if self.worker is None:
+            self._start_worker()
+        with self.lock:
+            if len(self.pending) >= self.max_queue and not self.closed:
+                self.changed.wait_for(lambda: len(self.pending) < self.max_queue or self.closed,
+                                      self.block_timeout if timeout is None else timeout)
+            if self.closed or len(self.pending) >= self.max_queue:
+                self.dropped += 1
+                accepted = False
+                reason = "Audit log closed" if self.closed else "Audit queue full"
+            else:
+                self.pending.append(entry)
+                self.submitted += 1
+                accepted = True
+                # Wake the worker for the first entry and once a batch is full
+                if len(self.pending) == 1 or len(self.pending) == self.batch_size:
+                    self.changed.notify_all()
+        if not accepted:
+            METRICS.inc(AUDIT_METRIC, outcome='dropped')
+            self._log_unwritten([entry], reason)
+        return accepted
+
+    def flush(self, timeout: float = None) -> bool:
+        """Write everything queued so far without waiting for the flush interval; False on timeout"""
+        with self.lock:
+            self.flush_requested = True
+            self.changed.notify_all()
+            return self.changed.wait_for(lambda: not self.pending and not self.in_flight, timeout)
+
+    def close(self, timeout: float = 10.0) -> Dict[str, Any]:
+        """Stop accepting entries, write the queue out and stop the worker
+
+        Entries still unwritten after timeout seconds are logged instead.
+        """
+        with self.lock:
+            self.closed = True
+            self.changed.notify_all()
+        if self.worker is not None:
+            self.worker.join(timeout)
+        with self.lock:
+            self.abandoned = True
+            self.changed.notify_all()
+            left = list(self.pending)
+            self.pending.clear()
+        if left:
+            METRICS.inc(AUDIT_METRIC, amount=len(left), outcome='unwritten')
+            self._log_unwritten(left, "Audit log closed")
+        return self.stats()
+
+    def _start_worker(self):
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self.worker.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                self.changed.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+                # Coalesce until a batch is full, the interval ends or a flush/close asks for it
+                deadline = time.monotonic() + self.flush_interval
+                while len(self.pending) < self.batch_size and not (self.closed or self.flush_requested):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.changed.wait(remaining)
+                batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                self.in_flight = len(batch)
+                # Room for producers waiting on a full queue
+                self.changed.notify_all()
+            try:
+                self._write(batch)
+            except Exception:
+                logging.exception("Audit batch failed")
+            finally:
+                with self.lock:
+                    self.in_flight = 0
+                    if not self.pending:
+                        self.flush_requested = False
+                    self.changed.notify_all()
+
+    def _write(self, batch: List[Any]):
+        documents = []
+        for entry in batch:
+            try:
+                documents.append(self.build(entry))
+            except Exception:
+                self.logger.exception("Audit record rejected")
+                with self.lock:
+                    self.rejected += 1
+                METRICS.inc(AUDIT_METRIC, outcome='rejected')
+        if not documents:
+            return
+
+        delay = self.retry_backoff
+        while True:
+            try:
+                self.sink.write(documents)
+                break
+            except Exception as error:
+                with self.lock:
+                    self.retries += 1
+                    abandoned = self.abandoned
+                METRICS.inc(AUDIT_METRIC, amount=len(documents), outcome='retried')
+                if abandoned:
+                    METRICS.inc(AUDIT_METRIC, amount=len(documents), outcome='unwritten')
+                    self._log_unwritten(documents, "Audit write abandoned at shutdown", built=True)
+                    return
+                self.logger.warning("Audit write of %d records failed, retrying in %.1fs: %s",
+                                    len(documents), delay, error)
+                with self.lock:
+                    self.changed.wait_for(lambda: self.abandoned, delay)
+                delay = min(delay * 2, self.max_backoff)
+        with self.lock:
+            self.written += len(documents)
+            self.batches += 1
+        METRICS.inc(AUDIT_METRIC, amount=len(documents), outcome='written')
+
+    def _log_unwritten(self, items: List[Any], reason: str, built: bool = False):
+        """Keep records that cannot reach the sink in the log, one JSON line each"""
+        for item in items:
+            try:
+                document = item if built else self.build(item)
+                self.logger.error("%s: %s", reason, json.dumps(document, default=str, ensure_ascii=False))
+            except Exception:
+                self.logger.exception("%s: record could not be logged", reason)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'queued': len(self.pending),
+                'in_flight': self.in_flight,
+                'submitted': self.submitted,
+                'written': self.written,
+                'batches': self.batches,
+                'retries': self.retries,
+                'dropped': self.dropped,
+                'rejected': self.rejected
+            }
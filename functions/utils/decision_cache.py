@@ -0,0 +1,101 @@
+# Content-addressed cache of encoded credit decisions for retried requests
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from models.application import ApplicationRecord
+from utils.metrics import METRICS
+from utils.security import DataEncryption
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+CACHE_METRIC = 'finis_decision_cache_total'
+METRICS.describe(CACHE_METRIC, 'Decision cache lookups by result (hit, miss)')
+
+def application_key(record: ApplicationRecord, variant: str = '') -> str:
+    """SHA-256 of the decoded application in canonical JSON
+
+    Decoding first means "50000", 50000 and 50000.0 share a key; only the
+    hash is kept, never the applicant's values. variant separates responses
+    of different shape for the same application.
+    """
+    # to_dict always lists fields in schema order, so no key sorting is needed
+    canonical = json.dumps(record.to_dict(), separators=(',', ':'), ensure_ascii=False)
+    return DataEncryption.hash_sensitive_data(canonical + '|' + variant)
+
+class DecisionCache:
+    """LRU cache with a TTL and a budget on the total size of the stored values
+
+    Values are (head, tail) string pairs: an encoded response split around
+    its timestamp, so a hit can be stamped with the time it is served.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (expires_at, size, value), least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        METRICS.inc(CACHE_METRIC, result='miss' if entry is None else 'hit')
+        return None if entry is None else entry[2]
+
+    def put(self, key: str, value: Tuple[str, str]):
+        # str length approximates the UTF-8 size closely enough for a budget
+        size = len(key) + len(value[0]) + len(value[1])
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (self.clock() + self.ttl_seconds, size, value)
+            self.bytes += size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        self.bytes -= self.entries.pop(key)[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,225 @@
+# In-process latency histograms and counters with Prometheus text export
+import contextvars
+import functools
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Any, Callable, Iterable, List, Tuple
+
+# Bucket upper bounds in seconds: 10us doubling up to ~10s; memory per stage is fixed
+DEFAULT_BUCKETS = tuple(1e-5 * 2 ** k for k in range(21))
+
+STAGE_METRIC = 'finis_stage_duration_seconds'
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram of durations (seconds)"""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf if beyond the last bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+class StageTimer:
+    """Collects the time since the previous lap under each stage name
+
+    Laps are kept on the timer and recorded together by total(), so a
+    request takes the registry lock once.
+    """
+
+    __slots__ = ('registry', 'started', 'last', 'laps')
+
+    def __init__(self, registry: 'MetricsRegistry'):
+        self.registry = registry
+        self.started = self.last = time.perf_counter()
+        self.laps = []
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.laps.append((stage, now - self.last))
+        self.last = now
+
+    def skip(self):
+        """Start the next lap now (the time since the last lap is recorded elsewhere)"""
+        self.last = time.perf_counter()
+
+    def total(self, stage: str):
+        """Record the whole span since the timer was created, plus all laps"""
+        self.laps.append((stage, time.perf_counter() - self.started))
+        self.registry.observe_many(self.laps)
+        self.laps = []
+
+class _NullTimer:
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+    def skip(self):
+        pass
+
+    def total(self, stage: str):
+        pass
+
+NULL_TIMER = _NullTimer()
+
+class MetricsRegistry:
+    """Stage latency histograms plus labelled counters, safe to share between threads"""
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 sample_every: int = 1):
+        self.enabled = enabled
+        self.buckets = buckets
+        # Time one request in sample_every; counters are always exact
+        self.sample_every = max(1, sample_every)
+        self.calls = itertools.count()
+        # Sampling decision of the request in progress, shared by every timer it opens
+        self.sampled = contextvars.ContextVar(f'finis_metrics_sampled_{id(self)}', default=None)
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.help: Dict[str, str] = {
+            STAGE_METRIC: 'Time spent in each request stage'
+        }
+        self.lock = threading.Lock()
+
+    def _draw(self) -> bool:
+        return next(self.calls) % self.sample_every == 0
+
+    def timer(self):
+        """Lap timer for one request; a no-op when metrics are off or the request is not sampled
+
+        Inside a request_scope every timer follows the request's sampling
+        decision, so nested stages are sampled together; outside one each
+        timer draws on its own.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        sampled = self.sampled.get()
+        if sampled is None:
+            sampled = self._draw()
+        return StageTimer(self) if sampled else NULL_TIMER
+
+    def request_scope(self, fn: Callable) -> Callable:
+        """Decorator making one sampling decision per outermost call of fn
+
+        Nested scopes (make_decision inside an instrumented handler) keep
+        the decision of the outer one.
+        """
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or self.sampled.get() is not None:
+                return fn(*args, **kwargs)
+            token = self.sampled.set(self._draw())
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.sampled.reset(token)
+
+        return wrapper
+
+    def observe(self, stage: str, seconds: float):
+        self.observe_many(((stage, seconds),))
+
+    def observe_many(self, samples: Iterable[Tuple[str, float]]):
+        if not self.enabled:
+            return
+        histograms = self.histograms
+        bounds = self.buckets
+        with self.lock:
+            for stage, seconds in samples:
+                histogram = histograms.get(stage)
+                if histogram is None:
+                    histogram = histograms[stage] = LatencyHistogram(bounds)
+                # LatencyHistogram.observe, inlined: this runs several times per request
+                histogram.counts[bisect_left(bounds, seconds)] += 1
+                histogram.total += seconds
+                histogram.count += 1
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        if not self.enabled:
+            return
+        # Callers pass labels in a fixed order, so keyword order identifies the series
+        key = (name, tuple(labels.items()))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def describe(self, name: str, help_text: str):
+        self.help[name] = help_text
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-stage count, mean and approximate p50/p99 (bucket upper bounds), in ms"""
+        with self.lock:
+            return {
+                stage: {
+                    'count': h.count,
+                    'mean_ms': round(h.total / h.count * 1000, 4) if h.count else 0.0,
+                    'p50_ms': round(h.quantile(0.50) * 1000, 4),
+                    'p99_ms': round(h.quantile(0.99) * 1000, 4)
+                }
+                for stage, h in sorted(self.histograms.items())
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        with self.lock:
+            if self.histograms:
+                lines.append(f'# HELP {STAGE_METRIC} {self.help[STAGE_METRIC]}')
+                lines.append(f'# TYPE {STAGE_METRIC} histogram')
+                for stage, h in sorted(self.histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(h.bounds, h.counts):
+                        cumulative += count
+                        lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="{bound:.6g}"}} {cumulative}')
+                    lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                    lines.append(f'{STAGE_METRIC}_sum{{stage="{stage}"}} {h.total:.9f}')
+                    lines.append(f'{STAGE_METRIC}_count{{stage="{stage}"}} {h.count}')
+
+            described = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in described:
+                    described.add(name)
+                    if name in self.help:
+                        lines.append(f'# HELP {name} {self.help[name]}')
+                    lines.append(f'# TYPE {name} counter')
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+                # repr keeps every digit; :g would export 1234567 as 1.23457e+06
+                text = str(int(value)) if float(value).is_integer() else repr(float(value))
+                lines.append(f'{name}{{{label_text}}} {text}' if label_text else f'{name} {text}')
+        return '\n'.join(lines) + '\n'
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Process-wide registry; FINIS_METRICS=0 turns collection off,
+# FINIS_METRICS_SAMPLE_EVERY=N times one request in N (default 10)
+METRICS = MetricsRegistry(enabled=os.environ.get('FINIS_METRICS', '1') != '0',
+                          sample_every=int(os.environ.get('FINIS_METRICS_SAMPLE_EVERY', '10')))
+METRICS.describe('finis_requests_total', 'HTTP requests by function and status code')
+METRICS.describe('finis_decisions_total', 'Credit decisions by outcome')
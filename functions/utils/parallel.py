@@ -0,0 +1,64 @@
+# Thread-pool execution for in-process batch work
+#
+# Threads share the engine, its annuity table and the reference set, so
+# nothing is pickled or duplicated per worker as with a process pool. On
+# free-threaded builds (python3.13t with the GIL off) they run on every
+# core; with the GIL only NumPy kernels overlap, so thread counts left to
+# the default fall back to running in the calling thread. A map_ranges
+# call made from inside a worker (make_decisions scoring a batch, say) runs
+# in that worker instead of starting a pool per worker.
+import os
+import sys
+import sysconfig
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+# Set while a thread runs a map_ranges slice
+_worker = threading.local()
+
+def free_threaded_build() -> bool:
+    """The interpreter was built without the GIL (may still have re-enabled it)"""
+    return bool(sysconfig.get_config_var('Py_GIL_DISABLED'))
+
+def gil_enabled() -> bool:
+    # Python < 3.13 has no sys._is_gil_enabled and always runs with the GIL
+    return getattr(sys, '_is_gil_enabled', lambda: True)()
+
+def available_cpus() -> int:
+    # process_cpu_count (3.13+) respects the CPU affinity mask
+    count = getattr(os, 'process_cpu_count', os.cpu_count)()
+    return count or 1
+
+def resolve_threads(threads: Optional[int] = None) -> int:
+    """Worker threads to use: explicit counts are kept, None means every CPU without a GIL and 1 with it"""
+    if threads is not None:
+        return max(1, int(threads))
+    return 1 if gil_enabled() else available_cpus()
+
+def split_range(size: int, parts: int, min_chunk: int = 1) -> List[Tuple[int, int]]:
+    """Up to parts contiguous (start, stop) ranges of near-equal size, none below min_chunk rows"""
+    parts = max(1, min(parts, size // max(min_chunk, 1)))
+    bounds = [size * i // parts for i in range(parts + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(parts) if bounds[i + 1] > bounds[i]]
+
+def map_ranges(fn: Callable[[int, int], Any], size: int, threads: Optional[int] = None,
+               min_chunk: int = 1) -> List[Any]:
+    """fn(start, stop) over contiguous slices of range(size), results in slice order
+
+    A single slice, or a call from inside another map_ranges slice, runs in
+    the calling thread without a pool.
+    """
+    ranges = split_range(size, resolve_threads(threads), min_chunk)
+    if len(ranges) <= 1 or getattr(_worker, 'active', False):
+        return [fn(0, size)]
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(_run_slice, fn, start, stop) for start, stop in ranges]
+        return [future.result() for future in futures]
+
+def _run_slice(fn: Callable[[int, int], Any], start: int, stop: int) -> Any:
+    _worker.active = True
+    try:
+        return fn(start, stop)
+    finally:
+        _worker.active = False
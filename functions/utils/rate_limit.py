@@ -0,0 +1,228 @@
+# Sliding-window rate limiting with pluggable counter storage
+import abc
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+DEFAULT_MAX_KEYS = 100_000
+# Locks serializing checks of the same client; clients share one by hash
+LOCK_STRIPES = 64
+
+class RateLimitBackend(abc.ABC):
+    """Counter storage used by SlidingWindowRateLimiter
+
+    Keys expire after their TTL. Implementations must make incr atomic
+    when several function instances share one store.
+    """
+
+    @abc.abstractmethod
+    def get_many(self, keys: List[str]) -> List[Optional[float]]:
+        """Values of the keys, None for missing or expired ones"""
+
+    @abc.abstractmethod
+    def incr(self, key: str, ttl: float) -> int:
+        """Increment a counter (created at 0 with the given TTL) and return the new value"""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: float, ttl: float):
+        """Store a value that expires after ttl seconds"""
+
+class InMemoryBackend(RateLimitBackend):
+    """Per-instance counters in an LRU-ordered dict with TTLs and a hard key cap"""
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS, clock=time.time):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> [value, expires_at], least recently used first
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _live(self, key: str, now: float) -> Optional[list]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _evict(self, now: float):
+        # Idle clients drift to the front; drop a few expired keys per call and enforce the cap
+        for _ in range(4):
+            if not self.entries:
+                break
+            key, entry = next(iter(self.entries.items()))
+            if entry[1] > now:
+                break
+            del self.entries[key]
+        while len(self.entries) > self.max_keys:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys: List[str]) -> List[Optional[float]]:
+        with self.lock:
+            now = self.clock()
+            values = []
+            for key in keys:
+                entry = self._live(key, now)
+                values.append(entry[0] if entry else None)
+            return values
+
+    def incr(self, key: str, ttl: float) -> int:
+        with self.lock:
+            now = self.clock()
+            entry = self._live(key, now)
+            if entry is None:
+                entry = self.entries[key] = [0, now + ttl]
+            entry[0] += 1
+            self._evict(now)
+            return entry[0]
+
+    def set(self, key: str, value: float, ttl: float):
+        with self.lock:
+            now = self.clock()
+            self.entries[key] = [value, now + ttl]
+            self.entries.move_to_end(key)
+            self._evict(now)
+
+class KeyValueBackend(RateLimitBackend):
+    """Shared counters in an external key-value store
+
+    client needs the redis-py style mget, incr, expire and set(..., ex=)
+    methods, so a Redis/Memorystore client or LocalKeyValueStore can be used.
+    """
+
+    def __init__(self, client: Any, prefix: str = 'rl:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get_many(self, keys: List[str]) -> List[Optional[float]]:
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [None if value is None else float(value) for value in values]
+
+    def incr(self, key: str, ttl: float) -> int:
+        key = self.prefix + key
+        value = int(self.client.incr(key))
+        if value == 1:
+            self.client.expire(key, int(math.ceil(ttl)))
+        return value
+
+    def set(self, key: str, value: float, ttl: float):
+        self.client.set(self.prefix + key, value, ex=int(math.ceil(ttl)))
+
+class LocalKeyValueStore:
+    """In-process stand-in for a shared key-value store (tests and local emulation)"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.data = {}  # key -> (value, expires_at or None)
+        self.lock = threading.Lock()
+
+    def _get(self, key: str):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= self.clock():
+            del self.data[key]
+            return None
+        return item
+
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        with self.lock:
+            return [None if (item := self._get(key)) is None else str(item[0]) for key in keys]
+
+    def incr(self, key: str) -> int:
+        with self.lock:
+            item = self._get(key)
+            value = int(item[0]) + 1 if item else 1
+            self.data[key] = (value, item[1] if item else None)
+            return value
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self.lock:
+            item = self._get(key)
+            if item is None:
+                return False
+            self.data[key] = (item[0], self.clock() + seconds)
+            return True
+
+    def set(self, key: str, value: Any, ex: int = None) -> bool:
+        with self.lock:
+            self.data[key] = (value, None if ex is None else self.clock() + ex)
+            return True
+
+class SlidingWindowRateLimiter:
+    """Per-minute and per-hour limits with constant work per check
+
+    Each window keeps the count of the current and previous fixed window;
+    the sliding count is the current count plus the previous count weighted
+    by how much of the previous window still overlaps the last window length.
+    """
+
+    def __init__(self, backend: RateLimitBackend = None, max_per_minute: int = 30,
+                 max_per_hour: int = 200, block_seconds: int = 1800, clock=time.time):
+        self.backend = backend if backend is not None else InMemoryBackend(clock=clock)
+        self.max_per_minute = max_per_minute
+        self.max_per_hour = max_per_hour
+        self.block_seconds = block_seconds
+        self.clock = clock
+        # Read-check-increment must not interleave for one client, or two requests
+        # could both see its last free slot; other clients go through another stripe.
+        # Instances sharing a store can still overshoot by the number of instances
+        # checking at the same moment.
+        self.locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    @staticmethod
+    def _window_keys(client: str, window: int, now: float) -> List[str]:
+        index = int(now // window)
+        return [f'{client}:{window}:{index}', f'{client}:{window}:{index - 1}']
+
+    @staticmethod
+    def _sliding_count(current: Optional[float], previous: Optional[float], window: int, now: float) -> float:
+        overlap = 1.0 - (now % window) / window
+        return (current or 0) + (previous or 0) * overlap
+
+    def check(self, client: str) -> Dict[str, Any]:
+        """Count a request from client if allowed; same result shape as SecurityValidator.check_rate_limit"""
+        with self.locks[hash(client) % LOCK_STRIPES]:
+            return self._check(client)
+
+    def _check(self, client: str) -> Dict[str, Any]:
+        now = self.clock()
+        minute_keys = self._window_keys(client, 60, now)
+        hour_keys = self._window_keys(client, 3600, now)
+        block_key = f'{client}:block'
+        blocked_until, minute, last_minute, hour, last_hour = self.backend.get_many(
+            [block_key] + minute_keys + hour_keys)
+
+        # Check if client is currently blocked
+        if blocked_until is not None and now < blocked_until:
+            return {
+                'allowed': False,
+                'reason': 'Rate limit exceeded. Please try again later.',
+                'retry_after': int(blocked_until - now)
+            }
+
+        if self._sliding_count(hour, last_hour, 3600, now) >= self.max_per_hour:
+            self.backend.set(block_key, now + self.block_seconds, self.block_seconds)
+            return {
+                'allowed': False,
+                'reason': 'Hourly rate limit exceeded',
+                'retry_after': self.block_seconds
+            }
+
+        if self._sliding_count(minute, last_minute, 60, now) >= self.max_per_minute:
+            return {
+                'allowed': False,
+                'reason': 'Per-minute rate limit exceeded',
+                'retry_after': 60
+            }
+
+        # Counters live for two windows so the previous window stays readable
+        self.backend.incr(minute_keys[0], 120)
+        self.backend.incr(hour_keys[0], 7200)
+        return {'allowed': True}